@@ -19,34 +19,13 @@ async def get_attractions(code: str):
     country = await _country_svc.get_country(code)
     if country is None:
         raise HTTPException(status_code=404, detail=f"国コード '{code}' は見つかりませんでした")
+    return await build_attractions(country)
 
-    async def _fetch_otm() -> list[dict]:
-        try:
-            coords = await _country_svc.get_coordinates(code)
-            if coords:
-                return await _otm_svc.get_attractions(
-                    lat=coords[0], lon=coords[1], country_code=country["code"]
-                )
-        except Exception:
-            pass
-        return []
-
-    async def _fetch_ai() -> dict:
-        try:
-            return await _ai_svc.generate_attractions(country["code"], country["name"])
-        except Exception:
-            return {"attractions": [], "best_season": None, "travel_tips": []}
-
-    async def _fetch_heritage() -> list[dict]:
-        try:
-            return await _heritage_svc.get_heritage_sites(
-                country["code"], country.get("name", "")
-            )
-        except Exception:
-            return []
 
+async def build_attractions(country: dict) -> dict:
+    """観光スポット（OpenTripMap・AI・世界遺産）を並列取得して統合する。"""
     otm_attractions, ai_data, heritage_sites = await asyncio.gather(
-        _fetch_otm(), _fetch_ai(), _fetch_heritage()
+        fetch_otm(country), fetch_ai(country), fetch_heritage(country)
     )
 
     return {
@@ -58,3 +37,33 @@ async def get_attractions(code: str):
         "best_season": ai_data.get("best_season"),
         "travel_tips": ai_data.get("travel_tips", []),
     }
+
+
+# ── 取得元ごとの組み立て（ストリーミングでは個別セクションとして送る） ─────
+
+async def fetch_otm(country: dict) -> list[dict]:
+    try:
+        coords = await _country_svc.get_coordinates(country["code"])
+        if coords:
+            return await _otm_svc.get_attractions(
+                lat=coords[0], lon=coords[1], country_code=country["code"]
+            )
+    except Exception:
+        pass
+    return []
+
+
+async def fetch_ai(country: dict) -> dict:
+    try:
+        return await _ai_svc.generate_attractions(country["code"], country["name"])
+    except Exception:
+        return {"attractions": [], "best_season": None, "travel_tips": []}
+
+
+async def fetch_heritage(country: dict) -> list[dict]:
+    try:
+        return await _heritage_svc.get_heritage_sites(
+            country["code"], country.get("name", "")
+        )
+    except Exception:
+        return []
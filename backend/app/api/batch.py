@@ -0,0 +1,115 @@
+"""複数国の一括取得 API
+
+地図表示・比較画面向けに、安全・為替・気候・経済を複数国分まとめて返す。
+国の解決は一覧インデックスの1回の参照で行い、キャッシュは名前空間ごとに
+一括で引いてから、残った国だけを同時実行数を制限して上流へ取りに行く。
+国ごとの失敗はその国の結果（available: False と error）に閉じ込める。
+"""
+from __future__ import annotations
+
+import asyncio
+from typing import Awaitable, Callable
+
+from fastapi import APIRouter, HTTPException, Query
+
+from app.api import countries, safety
+from app.core.config import settings
+from app.models.schemas import (
+    BatchClimateResponse,
+    BatchEconomicResponse,
+    BatchExchangeResponse,
+    BatchSafetyResponse,
+)
+
+router = APIRouter(prefix="/api/batch", tags=["batch"])
+
+_CODES_DESCRIPTION = "カンマ区切りの国コード（例: JP,FR,TH）"
+
+
+def parse_codes(codes: str) -> list[str]:
+    """国コード指定を大文字化・重複除去して検証する。"""
+    parsed = list(dict.fromkeys(c.strip().upper() for c in codes.split(",") if c.strip()))
+    if not parsed:
+        raise HTTPException(status_code=400, detail="codes を指定してください")
+    if len(parsed) > settings.batch_max_codes:
+        raise HTTPException(
+            status_code=400,
+            detail=f"一度に指定できる国は {settings.batch_max_codes} 件までです",
+        )
+    return parsed
+
+
+async def _resolve(codes: str) -> tuple[dict[str, dict], list[str]]:
+    found = await countries._svc.get_countries(parse_codes(codes))
+    resolved = {code: c for code, c in found.items() if c is not None}
+    return resolved, [code for code, c in found.items() if c is None]
+
+
+async def _bounded(items: dict[str, dict], fn: Callable[[str, dict], Awaitable[dict]]) -> dict:
+    """国ごとの取得を同時実行数を制限して実行する。失敗した国はエラーの結果にする。"""
+    sem = asyncio.Semaphore(settings.batch_concurrency)
+
+    async def _one(code: str, country: dict) -> dict:
+        async with sem:
+            try:
+                return await fn(code, country)
+            except Exception as e:
+                return {
+                    "country_code": country["code"],
+                    "available": False,
+                    "error": type(e).__name__,
+                }
+
+    results = await asyncio.gather(*[_one(code, item) for code, item in items.items()])
+    return dict(zip(items, results))
+
+
+def _iso2(resolved: dict[str, dict]) -> list[str]:
+    """解決済みの国の ISO2 コード（cca3 等で指定されても上流・キャッシュはこのコードで引く）。"""
+    return list(dict.fromkeys(country["code"] for country in resolved.values()))
+
+
+@router.get("/safety", response_model=BatchSafetyResponse)
+async def batch_safety(codes: str = Query(..., description=_CODES_DESCRIPTION)):
+    """複数国の安全情報（外務省 + 米国国務省）"""
+    resolved, not_found = await _resolve(codes)
+    await safety._mofa_svc.prefetch(_iso2(resolved))
+    states = await safety._state_svc.get_advisories(_iso2(resolved))
+    results = await _bounded(
+        resolved,
+        lambda _, country: safety.build_safety(
+            country["code"], state_result=states[country["code"].upper()]
+        ),
+    )
+    return {"results": results, "not_found": not_found}
+
+
+@router.get("/exchange", response_model=BatchExchangeResponse)
+async def batch_exchange(codes: str = Query(..., description=_CODES_DESCRIPTION)):
+    """複数国の為替レート（未キャッシュの通貨は1回の問い合わせでまとめて取得）"""
+    resolved, not_found = await _resolve(codes)
+    await countries._exchange_svc.prefetch({
+        country["code"]: [c["code"] for c in country.get("currencies", [])]
+        for country in resolved.values()
+    })
+    results = await _bounded(resolved, lambda _, country: countries.build_exchange(country))
+    return {"results": results, "not_found": not_found}
+
+
+@router.get("/climate", response_model=BatchClimateResponse)
+async def batch_climate(codes: str = Query(..., description=_CODES_DESCRIPTION)):
+    """複数国の月別気候（取得済みの平年値かグリッドのみ。未取得の国はスケジューラが埋める）"""
+    resolved, not_found = await _resolve(codes)
+    await countries._climate_svc.prefetch(_iso2(resolved))
+    results = await _bounded(
+        resolved, lambda _, country: countries.build_climate(country, fetch=False)
+    )
+    return {"results": results, "not_found": not_found}
+
+
+@router.get("/economic", response_model=BatchEconomicResponse)
+async def batch_economic(codes: str = Query(..., description=_CODES_DESCRIPTION)):
+    """複数国の経済指標（取り込み済みの指標の配列から返す）"""
+    resolved, not_found = await _resolve(codes)
+    results = await _bounded(resolved, lambda _, country: countries.build_economic(country))
+    return {"results": results, "not_found": not_found}
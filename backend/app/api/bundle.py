@@ -0,0 +1,269 @@
+"""国詳細ページ用の一括取得 API
+
+国詳細ページは国情報・安全・入国・Wiki・経済・気候・為替・ニュース・観光の
+9リクエストを個別に投げていた。bundle は国を1回だけ解決し、指定セクションを
+並列に組み立てて1つのドキュメントで返す。セクションごとに成否と所要時間を付ける。
+
+stream は同じセクションを完了した順に NDJSON 行または SSE イベントとして送る。
+観光は世界遺産・OpenTripMap・AI の3セクションに分け、遅い AI 生成を待たずに
+速いセクションから表示できるようにする。
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable
+
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from pydantic import TypeAdapter
+
+from app.api import attractions, countries, news, safety
+from app.models.schemas import (
+    AISummary,
+    BundleResponse,
+    ClimateInfo,
+    Country,
+    EconomicInfo,
+    EnrichedAttractionsResponse,
+    EntryRequirement,
+    ExchangeInfo,
+    HeritageSite,
+    NewsResponse,
+    OTMAttraction,
+    SafetyInfo,
+    WikiSummary,
+)
+
+router = APIRouter(prefix="/api/countries", tags=["bundle"])
+
+
+class RequestMemo:
+    """リクエスト内で同じ取得を1回にまとめるメモ"""
+
+    def __init__(self) -> None:
+        self._tasks: dict[str, asyncio.Task] = {}
+
+    async def get(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._tasks.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._tasks[key] = task
+        return await asyncio.shield(task)
+
+
+class SectionContext:
+    """セクション組み立てに渡す解決済みの国とメモ"""
+
+    def __init__(self, country: dict, memo: RequestMemo) -> None:
+        self.country = country
+        self.code = country["code"]
+        self.memo = memo
+
+    async def mofa(self) -> dict | Exception:
+        """MOFA の安全情報（国情報の safety_level と安全セクションで共用）。失敗時は例外を返す。"""
+
+        async def _fetch() -> dict | Exception:
+            try:
+                return await safety._mofa_svc.get_safety_info(self.code)
+            except Exception as e:
+                return e
+
+        return await self.memo.get("mofa", _fetch)
+
+
+SectionBuilder = Callable[[SectionContext], Awaitable[Any]]
+
+# セクション名 → (組み立て関数, レスポンス型の TypeAdapter)
+SECTIONS: dict[str, tuple[SectionBuilder, TypeAdapter]] = {}
+STREAM_SECTIONS: dict[str, tuple[SectionBuilder, TypeAdapter]] = {}
+
+
+def section(name: str, model: Any, bundle: bool = True, stream: bool = True):
+    """セクションを登録する（bundle / stream のどちらで使うかを指定）。"""
+
+    def decorator(fn: SectionBuilder) -> SectionBuilder:
+        entry = (fn, TypeAdapter(model))
+        if bundle:
+            SECTIONS[name] = entry
+        if stream:
+            STREAM_SECTIONS[name] = entry
+        return fn
+
+    return decorator
+
+
+@section("country", Country)
+async def _country_section(ctx: SectionContext) -> dict:
+    mofa = await ctx.mofa()
+    return countries.build_country(ctx.country, None if isinstance(mofa, Exception) else mofa)
+
+
+@section("safety", SafetyInfo)
+async def _safety_section(ctx: SectionContext) -> dict:
+    return await safety.build_safety(ctx.code, await ctx.mofa())
+
+
+@section("entry", EntryRequirement)
+async def _entry_section(ctx: SectionContext) -> dict:
+    return safety.build_entry(ctx.code)
+
+
+@section("wiki", WikiSummary)
+async def _wiki_section(ctx: SectionContext) -> dict:
+    return await countries.build_wiki(ctx.country)
+
+
+@section("economic", EconomicInfo)
+async def _economic_section(ctx: SectionContext) -> dict:
+    return await countries.build_economic(ctx.country)
+
+
+@section("climate", ClimateInfo)
+async def _climate_section(ctx: SectionContext) -> dict:
+    return await countries.build_climate(ctx.country)
+
+
+@section("exchange", ExchangeInfo)
+async def _exchange_section(ctx: SectionContext) -> dict:
+    return await countries.build_exchange(ctx.country)
+
+
+@section("news", NewsResponse)
+async def _news_section(ctx: SectionContext) -> dict:
+    return await news.build_news(ctx.country)
+
+
+@section("attractions", EnrichedAttractionsResponse, stream=False)
+async def _attractions_section(ctx: SectionContext) -> dict:
+    return await attractions.build_attractions(ctx.country)
+
+
+@section("heritage", list[HeritageSite], bundle=False)
+async def _heritage_section(ctx: SectionContext) -> list[dict]:
+    return await attractions.fetch_heritage(ctx.country)
+
+
+@section("otm", list[OTMAttraction], bundle=False)
+async def _otm_section(ctx: SectionContext) -> list[dict]:
+    return await attractions.fetch_otm(ctx.country)
+
+
+@section("ai", AISummary, bundle=False)
+async def _ai_section(ctx: SectionContext) -> dict:
+    return await attractions.fetch_ai(ctx.country)
+
+
+def parse_sections(sections: str | None, available: dict) -> list[str]:
+    """カンマ区切りのセクション指定を検証する。未指定なら全セクション。"""
+    if not sections:
+        return list(available)
+    names = list(dict.fromkeys(s.strip() for s in sections.split(",") if s.strip()))
+    unknown = [n for n in names if n not in available]
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"不明なセクション: {', '.join(unknown)}（指定可能: {', '.join(available)}）",
+        )
+    return names
+
+
+async def resolve_country(code: str) -> dict:
+    country = await countries._svc.get_country(code)
+    if country is None:
+        raise HTTPException(status_code=404, detail=f"国コード '{code}' は見つかりませんでした")
+    return country
+
+
+async def run_section(name: str, ctx: SectionContext, registry: dict = SECTIONS) -> dict:
+    """1セクションを組み立て、状態・所要時間付きの結果を返す。"""
+    fn, adapter = registry[name]
+    start = time.perf_counter()
+    try:
+        data = adapter.dump_python(adapter.validate_python(await fn(ctx)), mode="json")
+        result = {"status": "ok", "data": data, "error": None}
+    except Exception as e:
+        result = {"status": "error", "data": None, "error": type(e).__name__}
+    result["elapsed_ms"] = round((time.perf_counter() - start) * 1000, 1)
+    return result
+
+
+@router.get("/{code}/bundle", response_model=BundleResponse)
+async def get_bundle(
+    code: str,
+    sections: str | None = Query(
+        None, description=f"カンマ区切りのセクション（{', '.join(SECTIONS)}）。未指定なら全て"
+    ),
+):
+    """国詳細ページのデータを1リクエストでまとめて返す"""
+    names = parse_sections(sections, SECTIONS)
+    start = time.perf_counter()
+    country = await resolve_country(code)
+    ctx = SectionContext(country, RequestMemo())
+    results = await asyncio.gather(*[run_section(name, ctx) for name in names])
+    return {
+        "country_code": country["code"],
+        "sections": dict(zip(names, results)),
+        "elapsed_ms": round((time.perf_counter() - start) * 1000, 1),
+    }
+
+
+def _ndjson(name: str, payload: dict) -> bytes:
+    return (json.dumps({"section": name, **payload}, ensure_ascii=False) + "\n").encode("utf-8")
+
+
+def _sse(name: str, payload: dict) -> bytes:
+    body = json.dumps({"section": name, **payload}, ensure_ascii=False)
+    return f"event: {name}\ndata: {body}\n\n".encode("utf-8")
+
+
+async def stream_sections(
+    ctx: SectionContext, names: list[str], encode: Callable[[str, dict], bytes]
+) -> AsyncIterator[bytes]:
+    """完了したセクションから順に送り、最後に done を送る。"""
+    start = time.perf_counter()
+
+    async def _named(name: str) -> tuple[str, dict]:
+        return name, await run_section(name, ctx, STREAM_SECTIONS)
+
+    tasks = [asyncio.ensure_future(_named(name)) for name in names]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            name, result = await next_done
+            yield encode(name, result)
+        yield encode("done", {"elapsed_ms": round((time.perf_counter() - start) * 1000, 1)})
+    finally:
+        # クライアント切断時は残りの取得を止める
+        for task in tasks:
+            task.cancel()
+
+
+@router.get("/{code}/stream")
+async def stream_country(
+    request: Request,
+    code: str,
+    sections: str | None = Query(
+        None, description=f"カンマ区切りのセクション（{', '.join(STREAM_SECTIONS)}）。未指定なら全て"
+    ),
+    format: str | None = Query(None, description="ndjson または sse（未指定時は Accept で判定）"),
+):
+    """国詳細のセクションを取得できた順に NDJSON / SSE で送る"""
+    names = parse_sections(sections, STREAM_SECTIONS)
+    if format is None:
+        accept = request.headers.get("accept", "")
+        format = "sse" if "text/event-stream" in accept else "ndjson"
+    if format not in ("ndjson", "sse"):
+        raise HTTPException(status_code=400, detail="format は ndjson または sse を指定してください")
+    country = await resolve_country(code)
+    ctx = SectionContext(country, RequestMemo())
+    if format == "sse":
+        encode, media_type = _sse, "text/event-stream"
+    else:
+        encode, media_type = _ndjson, "application/x-ndjson"
+    return StreamingResponse(
+        stream_sections(ctx, names, encode),
+        media_type=media_type,
+        # プロキシ（Next.js rewrite・Cloud Run）でのバッファリングを避ける
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
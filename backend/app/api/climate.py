@@ -0,0 +1,27 @@
+"""地点の気候 API
+
+国の代表点に限らず、首都・世界遺産・観光スポット等の任意の緯度経度の月別平年値を返す。
+平年値グリッドがあればネットワークなしで答える。
+"""
+from fastapi import APIRouter, Query
+
+from app.api import countries
+from app.models.schemas import PointClimateInfo
+from app.services.climate_grid import climate_grid
+
+router = APIRouter(prefix="/api/climate", tags=["climate"])
+
+
+@router.get("", response_model=PointClimateInfo)
+async def get_point_climate(
+    lat: float = Query(..., ge=-90, le=90),
+    lon: float = Query(..., ge=-180, le=180),
+):
+    """任意の地点の月別平年値"""
+    return await countries._climate_svc.get_point_climate(lat, lon)
+
+
+@router.get("/grid", tags=["system"])
+async def grid_stats():
+    """平年値グリッドの読み込み状況と参照回数"""
+    return climate_grid.stats()
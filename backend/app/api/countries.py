@@ -1,21 +1,25 @@
-import asyncio
 import time
 from typing import Any
 
 from fastapi import APIRouter, HTTPException, Query
+from app.core.config import settings
 from app.models.schemas import (
     Country,
+    CountrySuggestion,
+    ExchangeHistory,
     ExchangeInfo,
     WikiSummary,
     ClimateInfo,
     EconomicInfo,
+    EconomicSeries,
 )
 from app.services.restcountries import RestCountriesService
 from app.services.mofa_service import MofaSafetyService
 from app.services.exchange_service import ExchangeService
+from app.services.fx_history import fx_history
 from app.services.wikipedia_service import WikipediaService
 from app.services.climate_service import ClimateService
-from app.services.worldbank_service import WorldBankService
+from app.services.worldbank_service import GDP_PER_CAPITA, WorldBankService
 
 router = APIRouter(prefix="/api/countries", tags=["countries"])
 _svc = RestCountriesService()
@@ -25,29 +29,15 @@ _wiki_svc = WikipediaService()
 _climate_svc = ClimateService()
 _wb_svc = WorldBankService()
 
-# safety_level キャッシュ（国コード → level）: MOFA 一括取得結果を保持
+# safety_level キャッシュ（国コード → level）: 定期リフレッシュ（app.jobs）が更新する
 _safety_cache: dict[str, int | None] = {}
 _safety_cache_ts: float = 0.0
-_SAFETY_CACHE_TTL = 6 * 3600  # 6時間
-_safety_task: asyncio.Task | None = None  # バックグラウンドタスク
-_safety_lock = asyncio.Lock()  # 重複起動防止
 
 
-async def _warm_safety_cache(codes: list[str]) -> None:
-    """全国の安全レベルをバックグラウンドで取得してキャッシュする"""
+def update_safety_levels(levels: dict[str, int | None]) -> None:
+    """一覧に付与する安全レベルを差し替える。"""
     global _safety_cache, _safety_cache_ts
-    sem = asyncio.Semaphore(20)
-
-    async def _fetch(code: str) -> tuple[str, int | None]:
-        async with sem:
-            try:
-                info = await _mofa_svc.get_safety_info(code)
-                return code, info.get("level")
-            except Exception:
-                return code, None
-
-    results = await asyncio.gather(*[_fetch(c) for c in codes])
-    _safety_cache = dict(results)
+    _safety_cache = dict(levels)
     _safety_cache_ts = time.time()
 
 
@@ -56,77 +46,148 @@ async def list_countries(
     q: str | None = Query(None, description="国名またはコードで検索"),
     region: str | None = Query(None, description="地域フィルタ"),
     safety_level: int | None = Query(None, description="危険度フィルタ (0-4)", ge=0, le=4),
+    limit: int | None = Query(None, description="最大件数", ge=1, le=250),
 ):
-    global _safety_task, _safety_cache_ts
-
     countries = await _svc.get_all_countries(query=q, region=region)
 
-    # キャッシュが有効なら即座に付与
-    if _safety_cache and time.time() - _safety_cache_ts < _SAFETY_CACHE_TTL:
-        for c in countries:
-            c["safety_level"] = _safety_cache.get(c["code"])
-    else:
-        # キャッシュなし/期限切れ: バックグラウンドで更新開始し、今は safety_level なしで返す
-        async with _safety_lock:
-            if _safety_task is None or _safety_task.done():
-                all_codes = [c["code"] for c in await _svc.get_all_countries()]
-                _safety_task = asyncio.create_task(_warm_safety_cache(all_codes))
-        # キャッシュに一部データがある場合はそれを使う
-        for c in countries:
-            c["safety_level"] = _safety_cache.get(c["code"])
+    # 定期リフレッシュ前（起動直後）は MOFA キャッシュにある分だけを付与する
+    levels = _safety_cache
+    if not levels:
+        levels = await _mofa_svc.get_cached_levels([c["code"] for c in countries])
+    # 一覧の要素はインデックス・キャッシュと共有なので、書き込まずに複製する
+    countries = [{**c, "safety_level": levels.get(c["code"])} for c in countries]
 
     # 危険度フィルタを適用
     if safety_level is not None:
         countries = [c for c in countries if c.get("safety_level") == safety_level]
+    if limit is not None:
+        countries = countries[:limit]
 
     return countries
 
 
+@router.get("/suggest", response_model=list[CountrySuggestion])
+async def suggest_countries(
+    prefix: str = Query("", description="入力中の国名・日本語名・国コード"),
+    limit: int = Query(8, description="最大件数", ge=1, le=10),
+):
+    """検索ボックスの入力補完（コード・国名・国旗のみの軽量レスポンス）"""
+    if not prefix.strip():
+        return []
+    return await _svc.suggest(prefix, limit)
+
+
 @router.get("/{code}", response_model=Country)
 async def get_country(code: str):
-    country = await _svc.get_country(code)
-    if country is None:
-        raise HTTPException(status_code=404, detail=f"国コード '{code}' は見つかりませんでした")
+    country = await _resolve(code)
     try:
         info = await _mofa_svc.get_safety_info(code)
-        country["safety_level"] = info.get("level")
     except Exception:
-        country["safety_level"] = None
-    return country
+        info = None
+    return build_country(country, info)
 
 
 @router.get("/{code}/exchange", response_model=ExchangeInfo)
 async def get_exchange(code: str):
-    country = await _svc.get_country(code)
-    if country is None:
-        raise HTTPException(status_code=404, detail=f"国コード '{code}' は見つかりませんでした")
-    currency_codes = [c["code"] for c in country.get("currencies", [])]
-    return await _exchange_svc.get_exchange_info(code, currency_codes)
+    return await build_exchange(await _resolve(code))
+
+
+@router.get("/{code}/exchange/history", response_model=ExchangeHistory)
+async def get_exchange_history(code: str, days: int = Query(365, ge=7, le=settings.fx_history_days)):
+    """為替レートの推移の要約（期間内の最小・最大・平均と、現在のレートの位置）"""
+    return await build_exchange_history(await _resolve(code), days)
 
 
 @router.get("/{code}/wiki", response_model=WikiSummary)
 async def get_wiki(code: str):
-    country = await _svc.get_country(code)
-    if country is None:
-        raise HTTPException(status_code=404, detail=f"国コード '{code}' は見つかりませんでした")
-    name_ja = country.get("name_ja") or country["name"]
-    name_en = country["name"]
-    return await _wiki_svc.get_summary(code, name_ja, name_en)
+    return await build_wiki(await _resolve(code))
 
 
 @router.get("/{code}/climate", response_model=ClimateInfo)
 async def get_climate(code: str):
-    country = await _svc.get_country(code)
-    if country is None:
-        raise HTTPException(status_code=404, detail=f"国コード '{code}' は見つかりませんでした")
-    lat = country.get("latitude")
-    lon = country.get("longitude")
-    return await _climate_svc.get_climate(code, lat, lon)
+    return await build_climate(await _resolve(code))
+
+
+@router.get("/{code}/economic/history", response_model=EconomicSeries)
+async def get_economic_history(
+    code: str,
+    indicator: str = Query(GDP_PER_CAPITA, description="World Bank の指標コード"),
+):
+    """経済指標の年次の推移"""
+    country = await _resolve(code)
+    return await _wb_svc.get_series(country["code"], check_indicator(indicator))
 
 
 @router.get("/{code}/economic", response_model=EconomicInfo)
 async def get_economic(code: str):
+    return await build_economic(await _resolve(code))
+
+
+async def _resolve(code: str) -> dict:
     country = await _svc.get_country(code)
     if country is None:
         raise HTTPException(status_code=404, detail=f"国コード '{code}' は見つかりませんでした")
-    return await _wb_svc.get_economic_info(code)
+    return country
+
+
+# ── セクション組み立て（個別エンドポイントと bundle で共用） ──────────────
+
+def build_country(country: dict, safety_info: dict | None) -> dict:
+    country = dict(country)
+    # 外務省の情報を取得できなかった場合の暫定レベルは一覧に出さない
+    if safety_info and safety_info.get("available", True):
+        country["safety_level"] = safety_info.get("level")
+    else:
+        country["safety_level"] = None
+    return country
+
+
+async def build_exchange(country: dict) -> dict:
+    currency_codes = [c["code"] for c in country.get("currencies", [])]
+    return await _exchange_svc.get_exchange_info(country["code"], currency_codes)
+
+
+async def build_exchange_history(country: dict, days: int = 365) -> dict:
+    """ローカルの日次履歴から集計する（取り込みはスケジューラの fx_history ジョブが行う）。"""
+    currency_codes = [c["code"] for c in country.get("currencies", [])]
+    non_jpy = [c for c in currency_codes if c != "JPY"]
+    # JPY の国は為替表示と同じく 1 USD → JPY で見る
+    base, quotes = ("JPY", non_jpy) if non_jpy or not currency_codes else ("USD", ["JPY"])
+    trends = [t for t in (fx_history.summary(base, q, days) for q in quotes) if t is not None]
+    return {
+        "country_code": country["code"],
+        "base": base,
+        "days": days,
+        "trends": trends,
+        "available": bool(trends),
+    }
+
+
+def wiki_names(country: dict) -> tuple[str, str, str]:
+    """Wikipedia の検索に使う (国コード, 日本語名, 英語名)。"""
+    return country["code"], country.get("name_ja") or country["name"], country["name"]
+
+
+async def build_wiki(country: dict) -> dict:
+    return await _wiki_svc.get_summary(*wiki_names(country))
+
+
+async def build_climate(country: dict, fetch: bool = True) -> dict:
+    """fetch=False なら上流へは行かず、取得済みの平年値かグリッドで答える。"""
+    return await _climate_svc.get_climate(
+        country["code"], country.get("latitude"), country.get("longitude"), fetch=fetch
+    )
+
+
+def check_indicator(indicator: str) -> str:
+    """取り込み対象の World Bank 指標かを検証する。"""
+    if indicator not in _wb_svc.indicators:
+        raise HTTPException(
+            status_code=400,
+            detail=f"未対応の指標です（対応: {', '.join(_wb_svc.indicators)}）",
+        )
+    return indicator
+
+
+async def build_economic(country: dict) -> dict:
+    return await _wb_svc.get_economic_info(country["code"])
@@ -0,0 +1,29 @@
+"""経済指標の比較 API
+
+取り込み済みの World Bank 指標（国×年×指標の配列）から、複数国の値を並べて返す。
+"""
+from fastapi import APIRouter, Query
+
+from app.api import batch, countries
+from app.models.schemas import EconomicComparison
+from app.services.worldbank_service import GDP_PER_CAPITA
+
+router = APIRouter(prefix="/api/economic", tags=["economic"])
+
+
+@router.get("/compare", response_model=EconomicComparison)
+async def compare(
+    indicator: str = Query(GDP_PER_CAPITA, description="World Bank の指標コード"),
+    codes: str | None = Query(None, description="カンマ区切りの国コード（省略時は全ての国）"),
+    year: int | None = Query(None, description="比較する年（省略時は国ごとの最新値）"),
+):
+    """複数国の指標を大きい順に並べる"""
+    countries.check_indicator(indicator)
+    if codes:
+        resolved, not_found = await batch._resolve(codes)
+        targets = batch._iso2(resolved)
+    else:
+        targets = [c["code"] for c in await countries._svc.get_all_countries()]
+        not_found = []
+    result = await countries._wb_svc.compare(targets, indicator, year)
+    return {**result, "not_found": not_found}
@@ -0,0 +1,30 @@
+"""為替換算 API
+
+国の為替表示と同じレート表から、任意の通貨ペアの金額換算をまとめて行う。
+"""
+from fastapi import APIRouter, HTTPException
+
+from app.api import countries
+from app.models.schemas import ConvertRequest, ConvertResponse
+
+router = APIRouter(prefix="/api/exchange", tags=["exchange"])
+
+
+@router.post("/convert", response_model=ConvertResponse)
+async def convert(request: ConvertRequest):
+    """複数の金額換算（例: 1000 JPY → EUR）を1回で行う"""
+    found = await countries._exchange_svc.get_matrix()
+    if found is None:
+        raise HTTPException(status_code=503, detail="為替レートを取得できません")
+    matrix, meta = found
+    results = []
+    for item in request.conversions:
+        base, quote = item.from_currency.upper(), item.to_currency.upper()
+        rate = matrix.rate(base, quote)
+        entry = {"amount": item.amount, "from": base, "to": quote}
+        if rate is None:
+            missing = base if base not in matrix else quote
+            results.append({**entry, "error": f"未対応の通貨です: {missing}"})
+        else:
+            results.append({**entry, "rate": rate, "result": matrix.convert(item.amount, base, quote)})
+    return {"date": matrix.date, "results": results, **meta}
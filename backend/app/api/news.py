@@ -13,6 +13,10 @@ async def get_news(code: str):
     country = await _country_svc.get_country(code)
     if country is None:
         raise HTTPException(status_code=404, detail=f"国コード '{code}' は見つかりませんでした")
+    return await build_news(country)
+
+
+async def build_news(country: dict) -> dict:
     return await _gnews_svc.get_news(
         country_code=country["code"],
         country_name=country["name"],
@@ -0,0 +1,42 @@
+"""おすすめ国 API
+
+国×月の特徴量配列から、指定した月に旅行しやすい国を一括でスコアリングして返す。
+"""
+from datetime import date
+
+from fastapi import APIRouter, Query
+
+from app.api import countries
+from app.models.schemas import RecommendationsResponse
+from app.services.recommendations import recommendation_index
+
+router = APIRouter(prefix="/api/recommendations", tags=["recommendations"])
+
+
+@router.get("", response_model=RecommendationsResponse)
+async def get_recommendations(
+    month: int | None = Query(None, ge=1, le=12, description="旅行する月（省略時は来月）"),
+    region: str | None = Query(None, description="地域フィルタ"),
+    max_level: int | None = Query(None, ge=0, le=4, description="許容する危険レベルの上限"),
+    limit: int = Query(20, ge=1, le=250),
+):
+    """気温・雨・安全レベル・物価の目安から、M月に行くのにおすすめの国を返す"""
+    if month is None:
+        month = date.today().month % 12 + 1
+    all_countries = await countries._svc.get_all_countries()
+    # 定期リフレッシュ前（起動直後）は MOFA キャッシュにある分だけを使う
+    levels = countries._safety_cache
+    if not levels:
+        levels = await countries._mofa_svc.get_cached_levels([c["code"] for c in all_countries])
+    matrix = await recommendation_index.get(
+        all_countries, levels, countries._climate_svc, countries._wb_svc
+    )
+    return {
+        "month": month,
+        "region": region,
+        "max_level": max_level,
+        "results": matrix.rank(month, region=region, max_level=max_level, limit=limit),
+        "countries": len(matrix),
+        "climate_coverage": matrix.climate_coverage,
+        "built_at": matrix.built_at,
+    }
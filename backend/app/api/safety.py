@@ -1,12 +1,20 @@
 import asyncio
+import json
+from typing import AsyncIterator
 
-from fastapi import APIRouter
-from app.models.schemas import SafetyInfo, EntryRequirement
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+
+from app.core.config import settings
+from app.core.pubsub import WILDCARD, SubscriberLimitError, Subscription
+from app.models.schemas import SafetyChange, SafetyChangesResponse, SafetyInfo, EntryRequirement
 from app.services.travel_advisory import TravelAdvisoryService
 from app.services.mofa_service import MofaSafetyService, LEVEL_LABELS, LEVEL_SUMMARIES, _level_to_severity
+from app.services.safety_history import safety_alerts, safety_history
 from app.services.state_dept_service import StateDeptService
 
 router = APIRouter(prefix="/api/countries", tags=["safety"])
+changes_router = APIRouter(prefix="/api/safety", tags=["safety"])
 _travel_svc = TravelAdvisoryService()
 _mofa_svc = MofaSafetyService()
 _state_svc = StateDeptService()
@@ -15,12 +23,129 @@ _state_svc = StateDeptService()
 @router.get("/{code}/safety", response_model=SafetyInfo)
 async def get_safety_info(code: str):
     """外務省 + 米国国務省の安全情報を統合して返す"""
-    mofa_task = _mofa_svc.get_safety_info(code)
-    state_task = _state_svc.get_advisory(code)
-    mofa_result, state_result = await asyncio.gather(
-        mofa_task, state_task, return_exceptions=True
+    return await build_safety(code)
+
+
+@router.get("/{code}/entry", response_model=EntryRequirement)
+async def get_entry_requirement(code: str):
+    """入国要件情報を返す"""
+    return build_entry(code)
+
+
+@changes_router.get("/changes", response_model=SafetyChangesResponse)
+async def get_safety_changes(
+    since: int = Query(0, ge=0, description="前回レスポンスの cursor"),
+    limit: int = Query(500, ge=1, le=1000),
+    country: str | None = Query(None, description="国コードで絞り込む"),
+):
+    """カーソル以降に検知した安全情報の変更だけを返す"""
+    return safety_history.changes(since=since, limit=limit, country_code=country)
+
+
+def _alert_sse(event: str, data: dict, event_id: int | None = None) -> bytes:
+    head = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{head}event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n".encode("utf-8")
+
+
+def _change_sse(change: dict) -> bytes:
+    """変更イベントを /changes と同じ SafetyChange の形（changed_at は ISO 形式）で送る。"""
+    data = SafetyChange.model_validate(change).model_dump(mode="json")
+    return _alert_sse("change", data, change["seq"])
+
+
+def alert_backlog(topics: set[str], since: int | None) -> tuple[list[dict], int]:
+    """接続時に先に送る変更と、送り終えた時点のカーソルを返す。
+
+    since がなければ再送はせず、現時点の最新の seq から始める。
+    """
+    if since is None:
+        return [], safety_history.stats()["latest_seq"]
+    page = safety_history.changes(since=since, limit=1000)
+    backlog = [c for c in page["changes"] if WILDCARD in topics or c["country_code"] in topics]
+    return backlog, page["cursor"]
+
+
+async def alert_events(
+    sub: Subscription, backlog: list[dict], heartbeat: float, cursor: int
+) -> AsyncIterator[bytes]:
+    """購読者へ変更イベントを送る。取りこぼし時は resync、無通信時はコメント行を送る。
+
+    cursor は backlog を送り終えた時点の位置（resync で返す値の起点）。
+    """
+    try:
+        for change in backlog:
+            yield _change_sse(change)
+        while not sub.closed:
+            change = await sub.get(timeout=heartbeat)
+            if sub.take_gap():
+                # キュー溢れで捨てた分は /api/safety/changes?since=cursor で取り直してもらう
+                yield _alert_sse("resync", {"cursor": cursor})
+            if change is None:
+                if not sub.closed:
+                    yield b": ping\n\n"
+                continue
+            if change["seq"] <= cursor:
+                continue  # 履歴の再送分と重複
+            cursor = change["seq"]
+            yield _change_sse(change)
+    finally:
+        sub.close()
+
+
+@changes_router.get("/subscribe")
+async def subscribe_safety_alerts(
+    request: Request,
+    codes: str = Query(..., description="購読する国コード（カンマ区切り、* で全て）"),
+    since: int | None = Query(None, ge=0, description="このカーソル以降の変更を先に送る"),
+):
+    """指定国の安全情報の変更（危険レベル・領事メール等）を SSE でプッシュする"""
+    topics = {c.strip().upper() for c in codes.split(",") if c.strip()}
+    if not topics:
+        raise HTTPException(status_code=400, detail="codes を指定してください")
+    if len(topics) > settings.batch_max_codes:
+        raise HTTPException(
+            status_code=400, detail=f"一度に購読できる国は {settings.batch_max_codes} 件までです"
+        )
+    # EventSource の再接続時は Last-Event-ID から続きを送る
+    last_id = request.headers.get("last-event-id")
+    if since is None and last_id and last_id.isdigit():
+        since = int(last_id)
+    try:
+        sub = safety_alerts.subscribe(topics)
+    except SubscriberLimitError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    backlog, cursor = alert_backlog(topics, since)
+    return StreamingResponse(
+        alert_events(sub, backlog, settings.alert_heartbeat_seconds, cursor),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
 
+
+async def build_safety(
+    code: str,
+    mofa_result: dict | Exception | None = None,
+    state_result: dict | Exception | None = None,
+) -> dict:
+    """安全情報を組み立てる。取得済みの MOFA / State Dept 結果（失敗時は例外）があれば再利用する。"""
+    pending = {}
+    if mofa_result is None:
+        pending["mofa"] = _mofa_svc.get_safety_info(code)
+    if state_result is None:
+        pending["state"] = _state_svc.get_advisory(code)
+    if pending:
+        fetched = dict(zip(pending, await asyncio.gather(*pending.values(), return_exceptions=True)))
+        mofa_result = fetched.get("mofa", mofa_result)
+        state_result = fetched.get("state", state_result)
+    return merge_safety(code, mofa_result, state_result)
+
+
+def build_entry(code: str) -> dict:
+    return _travel_svc.get_entry_requirement(code)
+
+
+def merge_safety(code: str, mofa_result: dict | Exception, state_result: dict | Exception) -> dict:
+    """MOFA と State Dept の結果を統合する（高い方のレベルを採用）。"""
     # MOFA フォールバック（通常は発生しない）
     if isinstance(mofa_result, Exception):
         mofa_result = {
@@ -33,6 +158,7 @@ async def get_safety_info(code: str):
             "mofa_url": None,
             "infection_level": 0,
             "safety_measure_url": None,
+            "available": False,
         }
 
     mofa_result = dict(mofa_result)
@@ -56,9 +182,3 @@ async def get_safety_info(code: str):
             })
 
     return mofa_result
-
-
-@router.get("/{code}/entry", response_model=EntryRequirement)
-async def get_entry_requirement(code: str):
-    """入国要件情報を返す"""
-    return _travel_svc.get_entry_requirement(code)
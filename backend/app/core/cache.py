@@ -0,0 +1,468 @@
+"""名前空間付き共通キャッシュ層
+
+各サービスが個別に持っていた TTL 付き dict を置き換える。
+名前空間ごとに TTL・最大件数・最大バイト数を設定でき、上限を超えると LRU で追い出す。
+ヒット/ミス/追い出し件数を名前空間ごとに計測する。
+ミス時の上流取得は get_or_fetch で single-flight 合流される。
+
+各エントリはソフト TTL（ttl）とハード TTL（hard_ttl）を持つ。
+ソフト TTL 切れ〜ハード TTL 切れの間は古い値を即座に返し、
+裏で重複排除された再取得タスクを走らせる（stale-while-revalidate）。
+
+persist=True の名前空間は、永続ストア（app.core.cache_store）が有効なら
+メモリの後段に2段目のキャッシュ層を持つ。書き込みは write-behind で反映され、
+メモリミス時はストアから読み戻す。
+
+shared=True の名前空間は、共有キャッシュ（app.core.shared_cache）が有効なら
+インスタンス間で値を共有する。メモリミス時は共有層→永続ストアの順に読み戻す。
+"""
+from __future__ import annotations
+
+import asyncio
+import sys
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from functools import wraps
+from typing import Any, Awaitable, Callable, Protocol
+
+from app.core.singleflight import SingleFlight
+
+_MISSING = object()
+
+# バックグラウンド再取得タスクの参照保持（GC による途中破棄を防ぐ）
+_background_tasks: set[asyncio.Task] = set()
+
+
+class CacheTier(Protocol):
+    """メモリの後段に置くキャッシュ層"""
+
+    async def get(self, namespace: str, key: str) -> tuple[Any, float] | None:
+        """(値, 保存時刻) を返す。なければ None。"""
+        ...
+
+    def put(
+        self, namespace: str, key: str, value: Any, stored_at: float, ttl: float | None = None
+    ) -> None:
+        """書き込みを予約する（ブロックしない）。ttl は名前空間のハード TTL。"""
+        ...
+
+
+# 永続ストア（起動時に attach_persistent_tier で設定）
+_persistent_tier: CacheTier | None = None
+# 共有キャッシュ（起動時に attach_shared_tier で設定）
+_shared_tier: CacheTier | None = None
+
+
+def _approx_size(value: Any) -> int:
+    """値のおおよそのメモリサイズ（バイト）を再帰的に見積もる。"""
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(
+            _approx_size(k) + _approx_size(v) for k, v in value.items()
+        )
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return sys.getsizeof(value) + sum(_approx_size(v) for v in value)
+    return sys.getsizeof(value)
+
+
+class CacheEntry:
+    __slots__ = ("value", "stored_at", "size")
+
+    def __init__(self, value: Any, stored_at: float, size: int) -> None:
+        self.value = value
+        self.stored_at = stored_at
+        self.size = size
+
+
+class CachedValue:
+    """キャッシュ値と取得時刻・鮮度のメタデータ"""
+
+    __slots__ = ("value", "fetched_at", "stale")
+
+    def __init__(self, value: Any, fetched_at: float, stale: bool) -> None:
+        self.value = value
+        self.fetched_at = fetched_at
+        self.stale = stale
+
+    def meta(self) -> dict:
+        """レスポンスに付与する fetched_at / stale を返す。"""
+        return {
+            "fetched_at": datetime.fromtimestamp(self.fetched_at, tz=timezone.utc),
+            "stale": self.stale,
+        }
+
+
+class CacheNamespace:
+    """TTL + LRU 追い出し付きのキャッシュ名前空間"""
+
+    def __init__(
+        self,
+        name: str,
+        ttl: float,
+        max_entries: int = 1000,
+        max_bytes: int | None = None,
+        hard_ttl: float | None = None,
+        persist: bool = False,
+        shared: bool = False,
+    ) -> None:
+        self.name = name
+        self.persist = persist
+        self.shared = shared
+        self.ttl = ttl
+        # ハード TTL 未指定時は stale 配信なし
+        self.hard_ttl = max(hard_ttl or ttl, ttl)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[str, CacheEntry] = OrderedDict()
+        self._bytes = 0
+        self._flight = SingleFlight(name)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.stale_hits = 0
+        self.refreshes = 0
+        self.refresh_failures = 0
+        self.tier_hits = 0
+        # 格納・削除のたびに増える（キャッシュから作る派生データの再計算の判定用）
+        self.version = 0
+
+    def _is_fresh(self, entry: CacheEntry, now: float) -> bool:
+        return now - entry.stored_at < self.ttl
+
+    def _lookup(self, key: str, now: float) -> CacheEntry | None:
+        """ハード TTL 内のエントリを返す。ハード TTL 切れは削除する。"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if now - entry.stored_at >= self.hard_ttl:
+            self._remove(key)
+            self.expirations += 1
+            return None
+        return entry
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """有効なキャッシュ値を返す。未登録・期限切れなら default。"""
+        now = time.time()
+        entry = self._lookup(key, now)
+        if entry is None or not self._is_fresh(entry, now):
+            self.misses += 1
+            return default
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry.value
+
+    def set(self, key: str, value: Any) -> None:
+        """値を保存し、上限を超えた分を古い順に追い出す。"""
+        stored_at = time.time()
+        self.restore(key, value, stored_at)
+        for tier in self._tiers():
+            tier.put(self.name, key, value, stored_at, ttl=self.hard_ttl)
+
+    def _tiers(self) -> list[CacheTier]:
+        """メモリの後段にある層を読み戻し順に返す。"""
+        tiers = []
+        if self.shared and _shared_tier is not None:
+            tiers.append(_shared_tier)
+        if self.persist and _persistent_tier is not None:
+            tiers.append(_persistent_tier)
+        return tiers
+
+    def restore(self, key: str, value: Any, stored_at: float) -> None:
+        """保存時刻を指定してメモリにだけ格納する（永続ストアからの読み戻し用）。"""
+        if key in self._entries:
+            self._remove(key)
+        entry = CacheEntry(value, stored_at, _approx_size(value))
+        self._entries[key] = entry
+        self._bytes += entry.size
+        self.version += 1
+        self._evict()
+
+    async def _read_through(self, key: str, now: float) -> bool:
+        """後段の層から値を読み戻す。ハード TTL 内の値があれば True。"""
+        for tier in self._tiers():
+            try:
+                found = await tier.get(self.name, key)
+            except Exception:
+                continue
+            if found is None:
+                continue
+            value, stored_at = found
+            if now - stored_at >= self.hard_ttl:
+                continue
+            self.restore(key, value, stored_at)
+            self.tier_hits += 1
+            return True
+        return False
+
+    async def get_many(self, keys: list[str]) -> dict[str, CachedValue]:
+        """複数キーをまとめて引く。見つかったキーだけを返す（上流へは取りに行かない）。
+
+        メモリにないキーは後段の層から一括で読み戻す（共有キャッシュでは1回の MGET）。
+        ソフト TTL 切れの値も stale=True として返す。
+        """
+        now = time.time()
+        found: dict[str, CachedValue] = {}
+        missing: list[str] = []
+        for key in keys:
+            entry = self._lookup(key, now)
+            if entry is None:
+                missing.append(key)
+                continue
+            fresh = self._is_fresh(entry, now)
+            if fresh:
+                self.hits += 1
+            else:
+                self.stale_hits += 1
+            found[key] = CachedValue(entry.value, entry.stored_at, not fresh)
+
+        for tier in self._tiers():
+            if not missing:
+                break
+            try:
+                if hasattr(tier, "get_many"):
+                    loaded = await tier.get_many(self.name, missing)
+                else:
+                    loaded = {}
+                    for key in missing:
+                        item = await tier.get(self.name, key)
+                        if item is not None:
+                            loaded[key] = item
+            except Exception:
+                continue
+            for key, (value, stored_at) in loaded.items():
+                if now - stored_at >= self.hard_ttl:
+                    continue
+                self.restore(key, value, stored_at)
+                self.tier_hits += 1
+                found[key] = CachedValue(value, stored_at, not now - stored_at < self.ttl)
+            missing = [k for k in missing if k not in found]
+        self.misses += len(missing)
+        return found
+
+    async def fetch_entry(
+        self,
+        key: str,
+        fetcher: Callable[[], Awaitable[Any]],
+        fetch_on_miss: bool = True,
+    ) -> CachedValue | None:
+        """キャッシュをメタデータ付きで返し、ミス時は fetcher で取得して保存する。
+
+        同じキーの同時ミスは、後段の層の読み戻しも含めて1回の呼び出しに合流する。
+        fetcher が None を返した場合・例外を送出した場合は保存しない。
+        ソフト TTL 切れの値はそのまま返し、裏で再取得する。
+        fetch_on_miss=False ならミス時は後段の層だけを見て、fetcher は呼ばずに None を返す。
+        """
+        now = time.time()
+        cv = self._serve(key, fetcher, now)
+        if cv is not None:
+            return cv
+
+        self.misses += 1
+        # 取得しない呼び出しが取得する呼び出しの結果（None）を共有しないよう合流先を分ける
+        flight_key = key if fetch_on_miss else f"{key}\x00cached"
+        result = await self._flight.do(flight_key, self._load_from(key, fetcher, fetch_on_miss))
+        if result is None:
+            return None
+        now = time.time()
+        entry = self._lookup(key, now)
+        if entry is None or entry.value is not result:
+            return CachedValue(result, now, False)
+        fresh = self._is_fresh(entry, now)
+        if not fresh:
+            self._schedule_refresh(key, fetcher)
+        return CachedValue(entry.value, entry.stored_at, not fresh)
+
+    def _load_from(
+        self, key: str, fetcher: Callable[[], Awaitable[Any]], fetch_on_miss: bool
+    ) -> Callable[[], Awaitable[Any]]:
+        async def _load() -> Any:
+            if await self._read_through(key, time.time()):
+                return self._entries[key].value
+            if not fetch_on_miss:
+                return None
+            return await self._store_from(key, fetcher)()
+
+        return _load
+
+    def _serve(
+        self, key: str, fetcher: Callable[[], Awaitable[Any]], now: float
+    ) -> CachedValue | None:
+        entry = self._lookup(key, now)
+        if entry is None:
+            return None
+        self._entries.move_to_end(key)
+        if self._is_fresh(entry, now):
+            self.hits += 1
+            return CachedValue(entry.value, entry.stored_at, False)
+        self.stale_hits += 1
+        self._schedule_refresh(key, fetcher)
+        return CachedValue(entry.value, entry.stored_at, True)
+
+    def items(self) -> list[tuple[str, Any, float]]:
+        """(キー, 値, 保存時刻) の一覧を返す。"""
+        return [(k, e.value, e.stored_at) for k, e in self._entries.items()]
+
+    async def get_or_fetch(self, key: str, fetcher: Callable[[], Awaitable[Any]]) -> Any:
+        """fetch_entry の値のみを返す版。"""
+        cv = await self.fetch_entry(key, fetcher)
+        return cv.value if cv is not None else None
+
+    async def refresh(self, key: str, fetcher: Callable[[], Awaitable[Any]]) -> Any:
+        """鮮度に関わらず再取得して保存する（実行中の取得があれば合流）。"""
+        self.refreshes += 1
+        return await self._flight.do(key, self._store_from(key, fetcher))
+
+    def _store_from(
+        self, key: str, fetcher: Callable[[], Awaitable[Any]]
+    ) -> Callable[[], Awaitable[Any]]:
+        async def _fetch_and_store() -> Any:
+            result = await fetcher()
+            if result is not None:
+                self.set(key, result)
+            return result
+
+        return _fetch_and_store
+
+    def _schedule_refresh(self, key: str, fetcher: Callable[[], Awaitable[Any]]) -> None:
+        if self._flight.in_flight(key):
+            return
+
+        async def _run() -> None:
+            try:
+                await self.refresh(key, fetcher)
+            except Exception:
+                # 失敗時は古い値をハード TTL まで使い続ける
+                self.refresh_failures += 1
+
+        task = asyncio.get_running_loop().create_task(_run())
+        _background_tasks.add(task)
+        task.add_done_callback(_background_tasks.discard)
+
+    def pop(self, key: str, default: Any = None) -> Any:
+        entry = self._entries.get(key)
+        if entry is None:
+            return default
+        self._remove(key)
+        return entry.value
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._bytes = 0
+        self.version += 1
+
+    def __contains__(self, key: str) -> bool:
+        now = time.time()
+        entry = self._lookup(key, now)
+        return entry is not None and self._is_fresh(entry, now)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
+        self.version += 1
+
+    def _evict(self) -> None:
+        while self._entries and (
+            len(self._entries) > self.max_entries
+            or (self.max_bytes is not None and self._bytes > self.max_bytes)
+        ):
+            key = next(iter(self._entries))
+            self._remove(key)
+            self.evictions += 1
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "ttl_seconds": self.ttl,
+            "hard_ttl_seconds": self.hard_ttl,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "stale_hits": self.stale_hits,
+            "refreshes": self.refreshes,
+            "refresh_failures": self.refresh_failures,
+            "persist": self.persist,
+            "shared": self.shared,
+            "tier_hits": self.tier_hits,
+            "coalesced": self._flight.coalesced,
+            "in_flight": self._flight.stats()["in_flight"],
+        }
+
+
+_namespaces: dict[str, CacheNamespace] = {}
+
+
+def get_cache(
+    name: str,
+    ttl: float,
+    max_entries: int = 1000,
+    max_bytes: int | None = None,
+    hard_ttl: float | None = None,
+    persist: bool = False,
+    shared: bool = False,
+) -> CacheNamespace:
+    """名前空間を取得する。未登録なら指定設定で生成する。"""
+    ns = _namespaces.get(name)
+    if ns is None:
+        ns = CacheNamespace(
+            name,
+            ttl,
+            max_entries=max_entries,
+            max_bytes=max_bytes,
+            hard_ttl=hard_ttl,
+            persist=persist,
+            shared=shared,
+        )
+        _namespaces[name] = ns
+    return ns
+
+
+def get_namespaces() -> dict[str, CacheNamespace]:
+    return dict(_namespaces)
+
+
+def attach_persistent_tier(tier: CacheTier | None) -> None:
+    """persist=True の名前空間の後段に永続ストアを接続する（None で切断）。"""
+    global _persistent_tier
+    _persistent_tier = tier
+
+
+def attach_shared_tier(tier: CacheTier | None) -> None:
+    """shared=True の名前空間の後段に共有キャッシュを接続する（None で切断）。"""
+    global _shared_tier
+    _shared_tier = tier
+
+
+def cache_stats() -> dict[str, dict]:
+    """全名前空間の統計を返す。"""
+    return {name: ns.stats() for name, ns in sorted(_namespaces.items())}
+
+
+def cached(
+    namespace: CacheNamespace, key: Callable[..., str]
+) -> Callable[[Callable[..., Awaitable[Any]]], Callable[..., Awaitable[Any]]]:
+    """async 関数の戻り値を namespace にキャッシュするデコレータ。
+
+    key は関数と同じ引数を受け取りキャッシュキーを返す。
+    同じキーの同時呼び出しは1回の実行に合流する。
+    """
+
+    def decorator(func: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]:
+        @wraps(func)
+        async def wrapper(*args: Any, **kwargs: Any) -> Any:
+            return await namespace.get_or_fetch(
+                key(*args, **kwargs), lambda: func(*args, **kwargs)
+            )
+
+        return wrapper
+
+    return decorator
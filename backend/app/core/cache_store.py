@@ -0,0 +1,269 @@
+"""SQLite による永続キャッシュ層
+
+Cloud Run のコールドスタート後も温まったキャッシュで応答できるよう、
+persist=True の名前空間の内容をローカル SQLite ファイルに保存する。
+
+- 値は JSON + zlib で圧縮して保存（array.array は base64 で埋め込み）
+- 書き込みは write-behind: set 時はメモリ上に予約し、一定間隔でまとめて書き出す
+- 起動時（lifespan）に全件を一括でメモリへ読み込む
+- ファイルサイズが上限を超えたら保存時刻の古い順に削除する
+"""
+from __future__ import annotations
+
+import array
+import asyncio
+import base64
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Any
+
+from app.core import cache
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache_entries (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value BLOB NOT NULL,
+    stored_at REAL NOT NULL,
+    PRIMARY KEY (namespace, key)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_cache_entries_stored_at ON cache_entries (stored_at);
+"""
+
+
+def _json_default(obj: Any) -> Any:
+    if isinstance(obj, array.array):
+        return {"__array__": obj.typecode, "b64": base64.b64encode(obj.tobytes()).decode("ascii")}
+    if isinstance(obj, (set, frozenset)):
+        return sorted(obj)
+    raise TypeError(f"{type(obj).__name__} は保存できません")
+
+
+def _json_object_hook(obj: dict) -> Any:
+    if "__array__" in obj and "b64" in obj:
+        arr = array.array(obj["__array__"])
+        arr.frombytes(base64.b64decode(obj["b64"]))
+        return arr
+    return obj
+
+
+def encode_value(value: Any) -> bytes:
+    """キャッシュ値をコンパクトなバイト列に変換する。"""
+    raw = json.dumps(value, ensure_ascii=False, separators=(",", ":"), default=_json_default)
+    return zlib.compress(raw.encode("utf-8"), 6)
+
+
+def decode_value(blob: bytes) -> Any:
+    return json.loads(zlib.decompress(blob).decode("utf-8"), object_hook=_json_object_hook)
+
+
+class SqliteCacheStore:
+    """キャッシュ名前空間の後段に置く SQLite ストア"""
+
+    def __init__(self, path: str, max_bytes: int = 64 * 1024 * 1024) -> None:
+        self.path = path
+        self.max_bytes = max_bytes
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(_SCHEMA)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._lock = threading.Lock()
+        self._pending: dict[tuple[str, str], tuple[Any, float]] = {}
+        self.reads = 0
+        self.writes = 0
+        self.flushes = 0
+        self.pruned = 0
+        self.encode_errors = 0
+
+    # ── CacheTier ─────────────────────────────────────────────
+
+    async def get(self, namespace: str, key: str) -> tuple[Any, float] | None:
+        pending = self._pending.get((namespace, key))
+        if pending is not None:
+            return pending
+        return await asyncio.to_thread(self._read, namespace, key)
+
+    def put(
+        self, namespace: str, key: str, value: Any, stored_at: float, ttl: float | None = None
+    ) -> None:
+        self._pending[(namespace, key)] = (value, stored_at)
+
+    # ── 同期処理（スレッドで実行） ───────────────────────────────
+
+    def _read(self, namespace: str, key: str) -> tuple[Any, float] | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, stored_at FROM cache_entries WHERE namespace = ? AND key = ?",
+                (namespace, key),
+            ).fetchone()
+        self.reads += 1
+        if row is None:
+            return None
+        try:
+            return decode_value(row[0]), row[1]
+        except Exception:
+            return None
+
+    def load_all(self) -> list[tuple[str, str, Any, float]]:
+        """全エントリを (名前空間, キー, 値, 保存時刻) で返す。"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT namespace, key, value, stored_at FROM cache_entries ORDER BY stored_at"
+            ).fetchall()
+        result = []
+        for namespace, key, blob, stored_at in rows:
+            try:
+                result.append((namespace, key, decode_value(blob), stored_at))
+            except Exception:
+                continue
+        return result
+
+    def _write(self, items: dict[tuple[str, str], tuple[Any, float]]) -> None:
+        rows = []
+        for (namespace, key), (value, stored_at) in items.items():
+            try:
+                rows.append((namespace, key, encode_value(value), stored_at))
+            except (TypeError, ValueError):
+                self.encode_errors += 1
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO cache_entries (namespace, key, value, stored_at) "
+                "VALUES (?, ?, ?, ?)",
+                rows,
+            )
+        self.writes += len(rows)
+        self._prune()
+
+    def _prune(self) -> None:
+        """合計サイズが上限を超えていれば古い順に削除する。"""
+        with self._lock:
+            total = self._conn.execute(
+                "SELECT COALESCE(SUM(LENGTH(value)), 0) FROM cache_entries"
+            ).fetchone()[0]
+            if total <= self.max_bytes:
+                return
+            # 上限の 90% まで削って頻繁な削除を避ける
+            target = total - int(self.max_bytes * 0.9)
+            victims = []
+            for namespace, key, size in self._conn.execute(
+                "SELECT namespace, key, LENGTH(value) FROM cache_entries ORDER BY stored_at"
+            ):
+                victims.append((namespace, key))
+                target -= size
+                if target <= 0:
+                    break
+            with self._conn:
+                self._conn.executemany(
+                    "DELETE FROM cache_entries WHERE namespace = ? AND key = ?", victims
+                )
+        self.pruned += len(victims)
+
+    def delete_expired(self, namespace: str, older_than: float) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "DELETE FROM cache_entries WHERE namespace = ? AND stored_at < ?",
+                (namespace, older_than),
+            )
+
+    # ── 非同期 API ───────────────────────────────────────────
+
+    async def flush(self) -> int:
+        """予約済みの書き込みをまとめて反映する。"""
+        if not self._pending:
+            return 0
+        items, self._pending = self._pending, {}
+        await asyncio.to_thread(self._write, items)
+        self.flushes += 1
+        return len(items)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def stats(self) -> dict:
+        with self._lock:
+            rows, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(LENGTH(value)), 0) FROM cache_entries"
+            ).fetchone()
+        return {
+            "path": self.path,
+            "rows": rows,
+            "bytes": size,
+            "max_bytes": self.max_bytes,
+            "pending": len(self._pending),
+            "reads": self.reads,
+            "writes": self.writes,
+            "flushes": self.flushes,
+            "pruned": self.pruned,
+            "encode_errors": self.encode_errors,
+        }
+
+
+def warm_from_store(store: SqliteCacheStore) -> int:
+    """ストアの内容を persist=True の名前空間へ一括で読み込む。読み込み件数を返す。"""
+    namespaces = {
+        name: ns for name, ns in cache.get_namespaces().items() if ns.persist
+    }
+    now = time.time()
+    loaded = 0
+    for namespace, key, value, stored_at in store.load_all():
+        ns = namespaces.get(namespace)
+        if ns is None or now - stored_at >= ns.hard_ttl:
+            continue
+        ns.restore(key, value, stored_at)
+        loaded += 1
+    for name, ns in namespaces.items():
+        store.delete_expired(name, now - ns.hard_ttl)
+    return loaded
+
+
+# ── ライフサイクル（main.lifespan から呼ぶ） ───────────────────────
+
+_store: SqliteCacheStore | None = None
+_flush_task: asyncio.Task | None = None
+
+
+async def _flush_loop(store: SqliteCacheStore, interval: float) -> None:
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await store.flush()
+        except Exception:
+            continue
+
+
+async def start_persistent_cache(
+    path: str, max_bytes: int, flush_interval: float
+) -> SqliteCacheStore:
+    """ストアを開いて一括ロードし、write-behind のフラッシュを開始する。"""
+    global _store, _flush_task
+    store = await asyncio.to_thread(SqliteCacheStore, path, max_bytes)
+    await asyncio.to_thread(warm_from_store, store)
+    cache.attach_persistent_tier(store)
+    _store = store
+    _flush_task = asyncio.create_task(_flush_loop(store, flush_interval))
+    return store
+
+
+async def stop_persistent_cache() -> None:
+    """フラッシュを止め、未反映の書き込みを保存してクローズする。"""
+    global _store, _flush_task
+    if _flush_task is not None:
+        _flush_task.cancel()
+        _flush_task = None
+    if _store is not None:
+        cache.attach_persistent_tier(None)
+        await _store.flush()
+        _store.close()
+        _store = None
+
+
+def persistent_cache_stats() -> dict | None:
+    return _store.stats() if _store is not None else None
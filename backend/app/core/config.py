@@ -11,6 +11,46 @@ class Settings(BaseSettings):
     otm_api_key: str = ""
     news_cache_ttl_minutes: int = 30
     cors_origins: str = "http://localhost:3000"
+    # 永続データ（キャッシュDB等）の保存先。空の場合は永続化しない
+    data_dir: str = ""
+    cache_db_max_mb: int = 64
+    cache_flush_interval_seconds: float = 5.0
+    # インスタンス間共有キャッシュ（redis://host:port/db）。空の場合は使わない
+    redis_url: str = ""
+    redis_timeout_seconds: float = 0.5
+    # 一括取得 API の上流同時アクセス数と1回あたりの最大国数
+    batch_concurrency: int = 8
+    batch_max_codes: int = 100
+    # 定期リフレッシュ（lifespan で起動）
+    scheduler_enabled: bool = True
+    refresh_concurrency: int = 8
+    news_refresh_top_n: int = 20
+    # 気候の平年値に使う年数（直近の完了した年まで）
+    climate_normal_years: int = 10
+    # 事前ビルドした平年値グリッド（.npy）。空の場合は上流（Open-Meteo）だけを使う
+    climate_grid_path: str = ""
+    # グリッドで答えた国について、上流の平年値を裏で取得して置き換える
+    climate_refine_upstream: bool = True
+    # 任意の地点（/api/climate）の平年値を裏で取得するか（地点は 0.5° 単位で無数にあるので既定は無効。
+    # 無効なら地点はグリッドだけで答える）
+    climate_refine_points: bool = False
+    # 裏で同時に走らせる精緻化の上限
+    climate_refine_concurrency: int = 2
+    # 定期ジョブで1回に取得する国の平年値の数（上流のレート制限に収めるため少しずつ埋める）
+    climate_refresh_batch: int = 40
+    # World Bank から一括で取り込む指標（カンマ区切り）と年数
+    worldbank_indicators: str = "NY.GDP.PCAP.CD,FP.CPI.TOTL.ZG,PA.NUS.PPP,PA.NUS.PPPC.RF,ST.INT.ARVL"
+    worldbank_years: int = 15
+    # 為替レートの日次履歴を保持する日数
+    fx_history_days: int = 730
+    # XML 解析プール（thread / process）。この大きさ未満の入力はその場で解析する
+    parse_executor: str = "thread"
+    parse_workers: int = 2
+    parse_inline_max_bytes: int = 16 * 1024
+    # 安全情報の変更プッシュ（SSE）
+    alert_max_subscribers: int = 1000
+    alert_queue_size: int = 100
+    alert_heartbeat_seconds: float = 15.0
     gnews_api_key: str = ""
     otm_api_key: str = ""
 
@@ -2,13 +2,27 @@
 
 全サービスで同一のコネクションプールを共有し、
 リクエスト毎のTCP接続確立/破棄のオーバーヘッドを削減する。
+
+conditional_get() は URL ごとに ETag / Last-Modified と解析済みの結果を保持し、
+再取得時に If-None-Match / If-Modified-Since を送る。304 が返れば
+本文の再ダウンロード・再解析をせず前回の解析結果をそのまま返す。
 """
 from __future__ import annotations
 
+import inspect
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, TypeVar
+from urllib.parse import urlencode
+
 import httpx
 
+T = TypeVar("T")
+
 _client: httpx.AsyncClient | None = None
 
+# 検証子を保持する URL 数の上限（MOFA 約190件 + RSS 等を想定）
+_VALIDATOR_MAX_ENTRIES = 2048
+
 
 def get_http_client() -> httpx.AsyncClient:
     """共有 httpx.AsyncClient を返す。未初期化なら自動生成。"""
@@ -31,3 +45,92 @@ async def close_http_client() -> None:
     if _client is not None:
         await _client.aclose()
         _client = None
+
+
+class _Validator:
+    """URL ごとの検証子と、その応答から作った解析結果"""
+
+    __slots__ = ("etag", "last_modified", "parsed")
+
+    def __init__(self, etag: str | None, last_modified: str | None, parsed: Any) -> None:
+        self.etag = etag
+        self.last_modified = last_modified
+        self.parsed = parsed
+
+    def headers(self) -> dict[str, str]:
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+_validators: OrderedDict[str, _Validator] = OrderedDict()
+_stats = {"requests": 0, "not_modified": 0}
+
+
+def _validator_key(url: str, params: dict | None) -> str:
+    if not params:
+        return url
+    return f"{url}?{urlencode(sorted(params.items()))}"
+
+
+def _header(resp: httpx.Response, name: str) -> str | None:
+    value = resp.headers.get(name)
+    return value if isinstance(value, str) and value else None
+
+
+async def conditional_get(
+    client: httpx.AsyncClient,
+    url: str,
+    parse: Callable[[httpx.Response], T | Awaitable[T]],
+    *,
+    params: dict | None = None,
+    headers: dict[str, str] | None = None,
+) -> T:
+    """検証子付きで GET し、parse(resp) の結果を返す。304 なら前回の結果を返す。
+
+    parse はステータス確認を含めて応答を解析する（コルーチン関数でもよい）。例外は呼び出し元へ送出し、
+    その場合は検証子を更新しない。
+    """
+    key = _validator_key(url, params)
+    cached = _validators.get(key)
+    request_headers = dict(headers or {})
+    if cached is not None:
+        request_headers.update(cached.headers())
+
+    kwargs: dict[str, Any] = {}
+    if params is not None:
+        kwargs["params"] = params
+    if request_headers:
+        kwargs["headers"] = request_headers
+    _stats["requests"] += 1
+    resp = await client.get(url, **kwargs)
+
+    if cached is not None and resp.status_code == 304:
+        _stats["not_modified"] += 1
+        _validators.move_to_end(key)
+        return cached.parsed
+
+    parsed = parse(resp)
+    if inspect.isawaitable(parsed):
+        parsed = await parsed
+    etag = _header(resp, "etag")
+    last_modified = _header(resp, "last-modified")
+    if etag or last_modified:
+        _validators[key] = _Validator(etag, last_modified, parsed)
+        _validators.move_to_end(key)
+        while len(_validators) > _VALIDATOR_MAX_ENTRIES:
+            _validators.popitem(last=False)
+    else:
+        _validators.pop(key, None)
+    return parsed
+
+
+def clear_validators() -> None:
+    _validators.clear()
+
+
+def conditional_stats() -> dict:
+    return {**_stats, "validators": len(_validators)}
@@ -0,0 +1,90 @@
+"""XML などの CPU 負荷の高い解析をイベントループ外で実行するプール
+
+MOFA の全件リフレッシュのように解析が集中する間も、他のリクエストの
+応答が遅れないよう、一定サイズ以上の入力はスレッド（またはプロセス）プールで解析する。
+
+- 入力が parse_inline_max_bytes 未満なら切り替えのコストの方が大きいのでその場で解析する
+- parse_executor=process の場合、解析関数と引数は pickle 可能である必要がある
+- 解析時間・実行中件数・待ち件数を parse_stats() で返す
+"""
+from __future__ import annotations
+
+import asyncio
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, TypeVar
+
+from app.core.config import settings
+
+T = TypeVar("T")
+
+_executor: Executor | None = None
+_stats = {
+    "inline": 0,
+    "offloaded": 0,
+    "inline_seconds": 0.0,
+    "offloaded_seconds": 0.0,
+    "max_seconds": 0.0,
+}
+_in_flight = 0
+
+
+def _get_executor() -> Executor:
+    global _executor
+    if _executor is None:
+        workers = settings.parse_workers
+        if settings.parse_executor == "process":
+            _executor = ProcessPoolExecutor(max_workers=workers)
+        else:
+            _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="parse")
+    return _executor
+
+
+def _timed(fn: Callable[..., T], *args: Any) -> tuple[T, float]:
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def _record(kind: str, elapsed: float) -> None:
+    _stats[kind] += 1
+    _stats[f"{kind}_seconds"] += elapsed
+    _stats["max_seconds"] = max(_stats["max_seconds"], elapsed)
+
+
+async def run_parse(fn: Callable[..., T], payload: bytes | str, *args: Any) -> T:
+    """fn(payload, *args) を実行する。大きな入力はプールへ回し、イベントループを塞がない。"""
+    global _in_flight
+    if len(payload) < settings.parse_inline_max_bytes:
+        result, elapsed = _timed(fn, payload, *args)
+        _record("inline", elapsed)
+        return result
+    loop = asyncio.get_running_loop()
+    _in_flight += 1
+    try:
+        result, elapsed = await loop.run_in_executor(
+            _get_executor(), _timed, fn, payload, *args
+        )
+    finally:
+        _in_flight -= 1
+    _record("offloaded", elapsed)
+    return result
+
+
+def shutdown_parse_pool() -> None:
+    """lifespan 終了時にプールを止める。"""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+def parse_stats() -> dict:
+    return {
+        "executor": settings.parse_executor,
+        "workers": settings.parse_workers,
+        "inline_max_bytes": settings.parse_inline_max_bytes,
+        "in_flight": _in_flight,
+        "queue_depth": max(0, _in_flight - settings.parse_workers),
+        **{k: round(v, 4) if isinstance(v, float) else v for k, v in _stats.items()},
+    }
@@ -0,0 +1,133 @@
+"""プロセス内の publish/subscribe ハブ
+
+購読者ごとに上限付きのキューを持ち、トピック（国コードなど）単位で配信する。
+
+- publish は同期関数で、待たずに各購読者のキューへ積む（イベントループ上で呼ぶ）
+- キューが満杯の購読者は古いイベントから捨て、gap フラグで取りこぼしを知らせる
+- 取りこぼしが続く購読者は切断し、遅いクライアントがメモリを占有しないようにする
+- "*" を購読すると全トピックを受け取る
+"""
+from __future__ import annotations
+
+import asyncio
+from typing import Any
+
+WILDCARD = "*"
+_CLOSED = object()
+
+
+class SubscriberLimitError(Exception):
+    """購読者数が上限に達している"""
+
+
+class Subscription:
+    """1購読者分の上限付きキュー"""
+
+    def __init__(self, hub: Hub, topics: frozenset[str], maxsize: int, max_dropped: int) -> None:
+        self.hub = hub
+        self.topics = topics
+        self.max_dropped = max_dropped
+        self._queue: asyncio.Queue[Any] = asyncio.Queue(maxsize=maxsize)
+        self.delivered = 0
+        self.dropped = 0
+        self.gap = False  # 前回の get 以降に取りこぼしがあった
+        self.closed = False
+
+    def offer(self, event: Any) -> None:
+        if self.closed:
+            return
+        if self._queue.full():
+            # バックプレッシャー: 最も古いイベントを捨てる
+            self._queue.get_nowait()
+            self.dropped += 1
+            self.gap = True
+            if self.dropped > self.max_dropped:
+                self.close()
+                return
+        self._queue.put_nowait(event)
+
+    async def get(self, timeout: float | None = None) -> Any | None:
+        """次のイベントを返す。timeout までに届かない・切断された場合は None。"""
+        try:
+            event = await asyncio.wait_for(self._queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        if event is _CLOSED:
+            return None
+        self.delivered += 1
+        return event
+
+    def take_gap(self) -> bool:
+        gap, self.gap = self.gap, False
+        return gap
+
+    @property
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        self.closed = True
+        self.hub._remove(self)
+        # get で待っている側を起こす
+        while not self._queue.empty():
+            self._queue.get_nowait()
+        self._queue.put_nowait(_CLOSED)
+
+    def __enter__(self) -> Subscription:
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+
+class Hub:
+    """トピック単位で購読者へイベントを配る"""
+
+    def __init__(
+        self, max_subscribers: int = 1000, queue_size: int = 100, max_dropped: int = 1000
+    ) -> None:
+        self.max_subscribers = max_subscribers
+        self.queue_size = queue_size
+        self.max_dropped = max_dropped
+        self._by_topic: dict[str, set[Subscription]] = {}
+        self._count = 0
+        self.published = 0
+        self.disconnected = 0
+
+    def subscribe(self, topics: list[str] | set[str]) -> Subscription:
+        if self._count >= self.max_subscribers:
+            raise SubscriberLimitError(f"購読者数が上限（{self.max_subscribers}）に達しています")
+        sub = Subscription(self, frozenset(topics), self.queue_size, self.max_dropped)
+        for topic in sub.topics:
+            self._by_topic.setdefault(topic, set()).add(sub)
+        self._count += 1
+        return sub
+
+    def publish(self, topic: str, event: Any) -> int:
+        """イベントを配信し、積んだ購読者数を返す。"""
+        self.published += 1
+        targets = self._by_topic.get(topic, set()) | self._by_topic.get(WILDCARD, set())
+        for sub in targets:
+            sub.offer(event)
+        return len(targets)
+
+    def _remove(self, sub: Subscription) -> None:
+        for topic in sub.topics:
+            subs = self._by_topic.get(topic)
+            if subs is not None:
+                subs.discard(sub)
+                if not subs:
+                    del self._by_topic[topic]
+        self._count -= 1
+        if sub.dropped > sub.max_dropped:
+            self.disconnected += 1
+
+    def stats(self) -> dict:
+        return {
+            "subscribers": self._count,
+            "topics": len(self._by_topic),
+            "published": self.published,
+            "disconnected_slow": self.disconnected,
+        }
@@ -0,0 +1,249 @@
+"""Redis プロトコル（RESP2）の最小クライアントとローカル代替サーバー
+
+共有キャッシュ層が使う GET / SET EX / MGET / DEL / PING だけを実装する。
+外部依存を増やさないため asyncio のストリームで直接話す。
+LocalRespServer はテスト・ベンチマーク用のプロセス内サーバーで、同じコマンドに応答する。
+"""
+from __future__ import annotations
+
+import asyncio
+import time
+from urllib.parse import urlparse
+
+
+class RespError(Exception):
+    """サーバーがエラー応答を返した"""
+
+
+def _encode_command(*args: bytes | str | int | float) -> bytes:
+    parts = [b"*%d\r\n" % len(args)]
+    for arg in args:
+        if isinstance(arg, str):
+            arg = arg.encode("utf-8")
+        elif isinstance(arg, (int, float)):
+            arg = str(arg).encode("ascii")
+        parts.append(b"$%d\r\n%s\r\n" % (len(arg), arg))
+    return b"".join(parts)
+
+
+async def _read_reply(reader: asyncio.StreamReader):
+    line = await reader.readline()
+    if not line:
+        raise ConnectionError("接続が閉じられました")
+    prefix, body = line[:1], line[1:-2]
+    if prefix == b"+":
+        return body.decode("utf-8")
+    if prefix == b"-":
+        return RespError(body.decode("utf-8"))
+    if prefix == b":":
+        return int(body)
+    if prefix == b"$":
+        length = int(body)
+        if length < 0:
+            return None
+        data = await reader.readexactly(length + 2)
+        return data[:-2]
+    if prefix == b"*":
+        count = int(body)
+        if count < 0:
+            return None
+        return [await _read_reply(reader) for _ in range(count)]
+    raise RespError(f"不明な応答: {line!r}")
+
+
+class RespClient:
+    """単一コネクションを使い回す RESP2 クライアント
+
+    コマンドはロックで直列化し、pipeline で複数コマンドを1往復で送る。
+    通信エラー時は接続を破棄し、次回呼び出しで再接続する。
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 6379, db: int = 0,
+                 password: str | None = None, timeout: float = 0.5) -> None:
+        self.host = host
+        self.port = port
+        self.db = db
+        self.password = password
+        self.timeout = timeout
+        self._reader: asyncio.StreamReader | None = None
+        self._writer: asyncio.StreamWriter | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._lock: asyncio.Lock | None = None
+
+    @classmethod
+    def from_url(cls, url: str, timeout: float = 0.5) -> "RespClient":
+        """redis://[:password@]host:port/db 形式の URL から生成する。"""
+        parsed = urlparse(url)
+        db = int(parsed.path.lstrip("/") or 0)
+        return cls(
+            host=parsed.hostname or "127.0.0.1",
+            port=parsed.port or 6379,
+            db=db,
+            password=parsed.password,
+            timeout=timeout,
+        )
+
+    async def _connect(self) -> None:
+        self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+        setup = []
+        if self.password:
+            setup.append(("AUTH", self.password))
+        if self.db:
+            setup.append(("SELECT", self.db))
+        if setup:
+            for reply in await self._roundtrip(setup):
+                if isinstance(reply, RespError):
+                    raise reply
+
+    def _ensure_loop(self) -> asyncio.Lock:
+        # イベントループが変わった（テストクライアント等）場合は接続を作り直す
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._lock = asyncio.Lock()
+            self._reader = self._writer = None
+        return self._lock
+
+    async def _roundtrip(self, commands: list[tuple]) -> list:
+        assert self._writer is not None and self._reader is not None
+        self._writer.write(b"".join(_encode_command(*c) for c in commands))
+        await self._writer.drain()
+        return [await _read_reply(self._reader) for _ in commands]
+
+    async def pipeline(self, commands: list[tuple]) -> list:
+        """複数コマンドを1往復で実行し、応答をコマンド順に返す。"""
+        if not commands:
+            return []
+        async with self._ensure_loop():
+            try:
+                async with asyncio.timeout(self.timeout):
+                    if self._writer is None:
+                        await self._connect()
+                    return await self._roundtrip(commands)
+            except BaseException:
+                self._discard()
+                raise
+
+    async def execute(self, *args):
+        reply = (await self.pipeline([args]))[0]
+        if isinstance(reply, RespError):
+            raise reply
+        return reply
+
+    async def ping(self) -> bool:
+        return await self.execute("PING") == "PONG"
+
+    async def get(self, key: str) -> bytes | None:
+        return await self.execute("GET", key)
+
+    async def set(self, key: str, value: bytes, ex: int | None = None) -> None:
+        if ex:
+            await self.execute("SET", key, value, "EX", int(ex))
+        else:
+            await self.execute("SET", key, value)
+
+    async def mget(self, keys: list[str]) -> list[bytes | None]:
+        if not keys:
+            return []
+        return await self.execute("MGET", *keys)
+
+    def _discard(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+        self._reader = self._writer = None
+
+    async def close(self) -> None:
+        writer = self._writer
+        self._discard()
+        if writer is not None:
+            try:
+                await writer.wait_closed()
+            except Exception:
+                pass
+
+
+class LocalRespServer:
+    """テスト・ベンチマーク用のプロセス内 RESP サーバー（データはメモリ上の dict）"""
+
+    def __init__(self) -> None:
+        self._data: dict[bytes, tuple[bytes, float | None]] = {}
+        self._server: asyncio.AbstractServer | None = None
+        self.port = 0
+        self.commands = 0
+
+    @property
+    def url(self) -> str:
+        return f"redis://127.0.0.1:{self.port}/0"
+
+    async def start(self) -> "LocalRespServer":
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def __aenter__(self) -> "LocalRespServer":
+        return await self.start()
+
+    async def __aexit__(self, *exc) -> None:
+        await self.stop()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                request = await _read_reply(reader)
+                if not isinstance(request, list) or not request:
+                    writer.write(b"-ERR protocol error\r\n")
+                    continue
+                self.commands += 1
+                writer.write(self._dispatch(request))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    def _lookup(self, key: bytes) -> bytes | None:
+        item = self._data.get(key)
+        if item is None:
+            return None
+        value, expires_at = item
+        if expires_at is not None and time.time() >= expires_at:
+            del self._data[key]
+            return None
+        return value
+
+    def _dispatch(self, request: list[bytes]) -> bytes:
+        command = request[0].upper()
+        args = request[1:]
+        if command == b"PING":
+            return b"+PONG\r\n"
+        if command in (b"AUTH", b"SELECT"):
+            return b"+OK\r\n"
+        if command == b"GET" and len(args) == 1:
+            return _bulk(self._lookup(args[0]))
+        if command == b"MGET" and args:
+            return b"*%d\r\n" % len(args) + b"".join(_bulk(self._lookup(k)) for k in args)
+        if command == b"SET" and len(args) >= 2:
+            expires_at = None
+            if len(args) == 4 and args[2].upper() == b"EX":
+                expires_at = time.time() + int(args[3])
+            self._data[args[0]] = (args[1], expires_at)
+            return b"+OK\r\n"
+        if command == b"DEL":
+            removed = sum(1 for k in args if self._data.pop(k, None) is not None)
+            return b":%d\r\n" % removed
+        if command == b"FLUSHDB":
+            self._data.clear()
+            return b"+OK\r\n"
+        return b"-ERR unknown command\r\n"
+
+
+def _bulk(value: bytes | None) -> bytes:
+    if value is None:
+        return b"$-1\r\n"
+    return b"$%d\r\n%s\r\n" % (len(value), value)
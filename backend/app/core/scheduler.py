@@ -0,0 +1,174 @@
+"""定期リフレッシュのジョブスケジューラ
+
+リクエスト処理中に温め直すのではなく、lifespan で起動したスケジューラが
+キャッシュを定期的に更新する。リクエスト側は温まったデータを読むだけにする。
+
+- ジョブごとに実行間隔とゆらぎ（jitter）を指定できる
+- 同時に走るジョブ数を制限し、同じジョブは重複実行しない
+- 直近にリクエストされた国を RecentCountries で記録し、国単位のジョブで優先する
+- 実行回数・失敗回数・所要時間などの状態を stats() で返す
+"""
+from __future__ import annotations
+
+import asyncio
+import random
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable
+
+
+class RecentCountries:
+    """直近にリクエストされた国コードを新しい順に保持する"""
+
+    def __init__(self, max_size: int = 256) -> None:
+        self.max_size = max_size
+        self._codes: OrderedDict[str, float] = OrderedDict()
+
+    def touch(self, code: str) -> None:
+        code = code.upper()
+        self._codes.pop(code, None)
+        self._codes[code] = time.time()
+        while len(self._codes) > self.max_size:
+            self._codes.popitem(last=False)
+
+    def recent(self, limit: int | None = None) -> list[str]:
+        """新しい順の国コード。"""
+        codes = list(reversed(self._codes))
+        return codes[:limit] if limit is not None else codes
+
+    def prioritize(self, codes: list[str]) -> list[str]:
+        """直近にリクエストされた国を先頭に並べ替える（残りは元の順）。"""
+        wanted = {c.upper() for c in codes}
+        head = [c for c in self.recent() if c in wanted]
+        seen = set(head)
+        return head + [c for c in codes if c.upper() not in seen]
+
+
+recent_countries = RecentCountries()
+
+
+class Job:
+    """一定間隔で実行する非同期ジョブとその状態"""
+
+    def __init__(
+        self,
+        name: str,
+        fn: Callable[[], Awaitable[object]],
+        interval: float,
+        jitter: float = 0.1,
+        initial_delay: float = 0.0,
+    ) -> None:
+        self.name = name
+        self.fn = fn
+        self.interval = interval
+        self.jitter = jitter  # 間隔に対する割合
+        self.next_run = time.time() + initial_delay
+        self.running = False
+        self.runs = 0
+        self.failures = 0
+        self.last_started: float | None = None
+        self.last_duration: float | None = None
+        self.last_error: str | None = None
+        self.last_result: object = None
+
+    def schedule_next(self, now: float) -> None:
+        spread = self.interval * self.jitter
+        self.next_run = now + self.interval + random.uniform(-spread, spread)
+
+    def stats(self) -> dict:
+        return {
+            "interval_seconds": self.interval,
+            "running": self.running,
+            "runs": self.runs,
+            "failures": self.failures,
+            "last_started": self.last_started,
+            "last_duration_seconds": (
+                round(self.last_duration, 3) if self.last_duration is not None else None
+            ),
+            "last_error": self.last_error,
+            "last_result": self.last_result,
+            "next_run": round(self.next_run, 3),
+        }
+
+
+class Scheduler:
+    """ジョブを間隔どおりに起動するスケジューラ"""
+
+    def __init__(self, max_concurrent: int = 2, tick: float = 1.0) -> None:
+        self.max_concurrent = max_concurrent
+        self.tick = tick
+        self._jobs: dict[str, Job] = {}
+        self._loop_task: asyncio.Task | None = None
+        self._running: set[asyncio.Task] = set()
+        self._sem: asyncio.Semaphore | None = None
+
+    def add_job(
+        self,
+        name: str,
+        fn: Callable[[], Awaitable[object]],
+        interval: float,
+        jitter: float = 0.1,
+        initial_delay: float = 0.0,
+    ) -> Job:
+        job = Job(name, fn, interval, jitter=jitter, initial_delay=initial_delay)
+        self._jobs[name] = job
+        return job
+
+    def get_job(self, name: str) -> Job | None:
+        return self._jobs.get(name)
+
+    async def run_job(self, name: str) -> None:
+        """ジョブを1回実行する（同時実行数の制限内で）。"""
+        job = self._jobs[name]
+        if job.running:
+            return
+        job.running = True
+        if self._sem is None:
+            self._sem = asyncio.Semaphore(self.max_concurrent)
+        try:
+            async with self._sem:
+                start = time.time()
+                job.last_started = start
+                try:
+                    job.last_result = await job.fn()
+                    job.last_error = None
+                except Exception as e:
+                    job.failures += 1
+                    job.last_error = f"{type(e).__name__}: {e}"
+                job.runs += 1
+                job.last_duration = time.time() - start
+                job.schedule_next(time.time())
+        finally:
+            job.running = False
+
+    def run_due(self) -> None:
+        """実行時刻を過ぎたジョブを起動する。"""
+        now = time.time()
+        for job in self._jobs.values():
+            if job.running or job.next_run > now:
+                continue
+            task = asyncio.get_running_loop().create_task(self.run_job(job.name))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _loop(self) -> None:
+        while True:
+            self.run_due()
+            await asyncio.sleep(self.tick)
+
+    def start(self) -> None:
+        self._sem = asyncio.Semaphore(self.max_concurrent)
+        self._loop_task = asyncio.get_running_loop().create_task(self._loop())
+
+    async def stop(self) -> None:
+        tasks = [t for t in (self._loop_task, *self._running) if t is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._loop_task = None
+
+    def stats(self) -> dict[str, dict]:
+        return {name: job.stats() for name, job in sorted(self._jobs.items())}
+
+
+scheduler = Scheduler()
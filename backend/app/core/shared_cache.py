@@ -0,0 +1,220 @@
+"""インスタンス間で共有するキャッシュ層（Redis プロトコル）
+
+複数ワーカー・複数インスタンスで MOFA / State Dept / ニュース / AI の結果を共有し、
+上流へのアクセスと Anthropic API の利用量がインスタンス数倍になるのを防ぐ。
+
+- shared=True の名前空間のメモリミス時に読み戻し、set 時に書き込む
+- 書き込みは予約してまとめて pipeline で送る
+- 値は cache_store と同じ JSON + zlib 形式で圧縮
+- 連続して失敗したら一定時間アクセスを止め（サーキットブレーカー）、ローカルキャッシュのみで動作する
+"""
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import Any
+
+from app.core import cache
+from app.core.cache_store import decode_value, encode_value
+from app.core.resp import RespClient, RespError
+
+
+class CircuitBreaker:
+    """連続失敗回数で開閉する単純なサーキットブレーカー"""
+
+    def __init__(self, threshold: int = 3, cooldown: float = 30.0) -> None:
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at: float | None = None
+        self.trips = 0
+
+    def allow(self) -> bool:
+        """呼び出してよければ True。クールダウン経過後は1回だけ試行を許す。"""
+        if self.opened_at is None:
+            return True
+        if time.time() - self.opened_at >= self.cooldown:
+            self.opened_at = time.time()  # 試行中は他の呼び出しを止める
+            return True
+        return False
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.failures >= self.threshold:
+            if self.opened_at is None:
+                self.trips += 1
+            self.opened_at = time.time()
+
+    @property
+    def state(self) -> str:
+        return "closed" if self.opened_at is None else "open"
+
+
+class SharedCacheBackend:
+    """RESP クライアントを CacheTier として使うアダプタ"""
+
+    def __init__(
+        self,
+        client: RespClient,
+        prefix: str = "kanta:",
+        breaker: CircuitBreaker | None = None,
+    ) -> None:
+        self.client = client
+        self.prefix = prefix
+        self.breaker = breaker or CircuitBreaker()
+        self._pending: dict[str, tuple[bytes, int]] = {}
+        self._flush_task: asyncio.Task | None = None
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.errors = 0
+        self.skipped = 0
+
+    def _key(self, namespace: str, key: str) -> str:
+        return f"{self.prefix}{namespace}:{key}"
+
+    async def _call(self, coro_fn):
+        if not self.breaker.allow():
+            self.skipped += 1
+            return None, False
+        try:
+            result = await coro_fn()
+        except (OSError, ConnectionError, RespError, asyncio.TimeoutError,
+                asyncio.IncompleteReadError):
+            self.errors += 1
+            self.breaker.record_failure()
+            return None, False
+        self.breaker.record_success()
+        return result, True
+
+    @staticmethod
+    def _decode(blob: bytes | None) -> tuple[Any, float] | None:
+        if blob is None:
+            return None
+        try:
+            payload = decode_value(blob)
+            return payload["v"], payload["t"]
+        except Exception:
+            return None
+
+    # ── CacheTier ─────────────────────────────────────────────
+
+    async def get(self, namespace: str, key: str) -> tuple[Any, float] | None:
+        found = await self.get_many(namespace, [key])
+        return found.get(key)
+
+    def put(
+        self, namespace: str, key: str, value: Any, stored_at: float, ttl: float | None = None
+    ) -> None:
+        try:
+            blob = encode_value({"v": value, "t": stored_at})
+        except (TypeError, ValueError):
+            return
+        # 失効はソフト TTL 後も stale 配信できるようハード TTL に合わせる
+        self._pending[self._key(namespace, key)] = (blob, max(int(ttl or 0), 1))
+        self._schedule_flush()
+
+    # ── 一括取得 ───────────────────────────────────────────────
+
+    async def get_many(self, namespace: str, keys: list[str]) -> dict[str, tuple[Any, float]]:
+        """複数キーを1回の MGET で取得する。見つかったものだけを返す。"""
+        result: dict[str, tuple[Any, float]] = {}
+        remote: list[str] = []
+        for key in keys:
+            pending = self._pending.get(self._key(namespace, key))
+            if pending is not None:
+                decoded = self._decode(pending[0])
+                if decoded is not None:
+                    result[key] = decoded
+                    continue
+            remote.append(key)
+        if not remote:
+            return result
+        blobs, ok = await self._call(
+            lambda: self.client.mget([self._key(namespace, k) for k in remote])
+        )
+        if not ok:
+            return result
+        for key, blob in zip(remote, blobs):
+            decoded = self._decode(blob)
+            if decoded is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                result[key] = decoded
+        return result
+
+    # ── 書き込み ───────────────────────────────────────────────
+
+    def _schedule_flush(self) -> None:
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return  # ループ外の set は次回の flush でまとめて送る
+        if self._flush_task is not None and not self._flush_task.done():
+            if self._flush_task.get_loop() is loop:
+                return
+        self._flush_task = loop.create_task(self.flush())
+
+    async def flush(self) -> int:
+        """予約済みの書き込みを pipeline でまとめて送る。"""
+        await asyncio.sleep(0)  # 同じティック内の set をまとめる
+        if not self._pending:
+            return 0
+        items, self._pending = self._pending, {}
+        commands = [("SET", k, blob, "EX", ex) for k, (blob, ex) in items.items()]
+        _, ok = await self._call(lambda: self.client.pipeline(commands))
+        if ok:
+            self.writes += len(commands)
+            return len(commands)
+        return 0
+
+    async def close(self) -> None:
+        if self._flush_task is not None and not self._flush_task.done():
+            try:
+                await self._flush_task
+            except Exception:
+                pass
+        await self.flush()
+        await self.client.close()
+
+    def stats(self) -> dict:
+        return {
+            "state": self.breaker.state,
+            "hits": self.hits,
+            "misses": self.misses,
+            "writes": self.writes,
+            "pending": len(self._pending),
+            "errors": self.errors,
+            "skipped": self.skipped,
+            "trips": self.breaker.trips,
+        }
+
+
+# ── ライフサイクル（main.lifespan から呼ぶ） ───────────────────────
+
+_backend: SharedCacheBackend | None = None
+
+
+def start_shared_cache(url: str, timeout: float = 0.5) -> SharedCacheBackend:
+    """共有キャッシュを shared=True の名前空間に接続する（接続は初回アクセス時）。"""
+    global _backend
+    _backend = SharedCacheBackend(RespClient.from_url(url, timeout=timeout))
+    cache.attach_shared_tier(_backend)
+    return _backend
+
+
+async def stop_shared_cache() -> None:
+    global _backend
+    if _backend is not None:
+        cache.attach_shared_tier(None)
+        await _backend.close()
+        _backend = None
+
+
+def shared_cache_stats() -> dict | None:
+    return _backend.stats() if _backend is not None else None
@@ -0,0 +1,60 @@
+"""キー単位のリクエスト合流（single-flight）
+
+同じキーの取得が同時に走った場合、最初の1件だけが実際に上流へアクセスし、
+残りの呼び出しはその結果を待って共有する。
+"""
+from __future__ import annotations
+
+import asyncio
+from typing import Any, Awaitable, Callable
+
+
+class SingleFlight:
+    """キーごとに実行中タスクを1つに保つ合流グループ"""
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self._inflight: dict[str, asyncio.Task] = {}
+        self.calls = 0
+        self.executions = 0
+        self.coalesced = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """key の取得を実行する。実行中なら同じ結果を待つ。"""
+        self.calls += 1
+        loop = asyncio.get_running_loop()
+        task = self._inflight.get(key)
+        # 別イベントループ（テストクライアント等）で作られた残骸は無視する
+        if task is not None and not task.done() and task.get_loop() is loop:
+            self.coalesced += 1
+        else:
+            self.executions += 1
+            task = loop.create_task(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t, k=key: self._forget(k, t))
+        # 待機側がキャンセルされても共有タスクは止めない
+        return await asyncio.shield(task)
+
+    def in_flight(self, key: str) -> bool:
+        task = self._inflight.get(key)
+        if task is None or task.done():
+            return False
+        try:
+            return task.get_loop() is asyncio.get_running_loop()
+        except RuntimeError:
+            return True
+
+    def _forget(self, key: str, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # 待機者が全員キャンセルされた場合の未回収例外警告を防ぐ
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> dict:
+        return {
+            "calls": self.calls,
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+            "in_flight": sum(1 for t in self._inflight.values() if not t.done()),
+        }
@@ -0,0 +1,120 @@
+"""定期リフレッシュジョブの定義
+
+各ジョブの間隔は対象キャッシュのソフト TTL より短くし、
+リクエスト時には常に鮮度内の値が読めるようにする。
+"""
+from __future__ import annotations
+
+import asyncio
+
+from app.api import countries, news, safety
+from app.core.config import settings
+from app.core.scheduler import Scheduler, recent_countries
+from app.services.fx_history import fx_history
+
+
+async def _bounded(codes: list[str], fn) -> tuple[dict[str, object], int]:
+    """国ごとの処理を同時実行数を制限して実行する。(成功結果, 失敗件数) を返す。"""
+    sem = asyncio.Semaphore(settings.refresh_concurrency)
+
+    async def _one(code: str):
+        async with sem:
+            try:
+                return code, await fn(code)
+            except Exception:
+                return code, None
+
+    results = await asyncio.gather(*[_one(c) for c in codes])
+    ok = {code: value for code, value in results if value is not None}
+    return ok, len(results) - len(ok)
+
+
+async def refresh_countries() -> dict:
+    return {"countries": await countries._svc.refresh_all()}
+
+
+async def refresh_mofa() -> dict:
+    """全国の MOFA 安全情報を再取得し、一覧用の安全レベルを更新する。"""
+    all_codes = [c["code"] for c in await countries._svc.get_all_countries()]
+    codes = recent_countries.prioritize(all_codes)
+    results, failed = await _bounded(codes, safety._mofa_svc.refresh)
+    levels = dict(countries._safety_cache)
+    levels.update({code: info.get("level") for code, info in results.items()})
+    countries.update_safety_levels(levels)
+    return {"refreshed": len(results), "failed": failed}
+
+
+async def refresh_state_dept() -> dict:
+    return {"advisories": await safety._state_svc.refresh_all()}
+
+
+async def refresh_exchange() -> dict:
+    return {"refreshed": await countries._exchange_svc.refresh_cached()}
+
+
+async def refresh_fx_history() -> dict:
+    return {"added_days": await fx_history.update(), "days": len(fx_history)}
+
+
+async def refresh_worldbank() -> dict:
+    return {"countries": await countries._wb_svc.refresh_all()}
+
+
+async def refresh_climate() -> dict:
+    """上流の平年値が未取得・期限切れの国を少しずつ取得する（おすすめの気候データを埋める）。"""
+    targets = await countries._climate_svc.stale_countries(
+        await countries._svc.get_all_countries()
+    )
+    by_code = {c["code"]: c for c in targets}
+    codes = recent_countries.prioritize(list(by_code))[: settings.climate_refresh_batch]
+    results, failed = await _bounded(
+        codes, lambda code: countries._climate_svc.refresh(by_code[code])
+    )
+    return {"refreshed": len(results), "failed": failed, "remaining": len(by_code) - len(results)}
+
+
+async def refresh_wikipedia() -> dict:
+    """未取得・期限切れの国の概要を、複数の国名をまとめた問い合わせで取り込む。"""
+    names = [countries.wiki_names(c) for c in await countries._svc.get_all_countries()]
+    return {"fetched": await countries._wiki_svc.prefetch(names)}
+
+
+async def refresh_news() -> dict:
+    """直近にリクエストされた上位の国のニュースを再取得する。"""
+    codes = recent_countries.recent(settings.news_refresh_top_n)
+    resolved = await countries._svc.get_countries(codes)
+
+    async def _refresh(code: str):
+        country = resolved.get(code)
+        if country is None:
+            return None
+        return await news._gnews_svc.refresh(country["code"], country["name"])
+
+    results, failed = await _bounded(codes, _refresh)
+    return {"refreshed": len(results), "failed": failed}
+
+
+def register_jobs(scheduler: Scheduler) -> None:
+    # 国一覧はソフト TTL（既定24時間）の半分ごと
+    scheduler.add_job(
+        "restcountries", refresh_countries, interval=settings.cache_ttl_hours * 1800
+    )
+    # MOFA・State Dept はソフト TTL 6時間に対して5時間ごと
+    scheduler.add_job("mofa", refresh_mofa, interval=5 * 3600, initial_delay=5)
+    scheduler.add_job("state_dept", refresh_state_dept, interval=5 * 3600, initial_delay=5)
+    # 為替・ニュースはソフト TTL 1時間に対して50分ごと
+    scheduler.add_job("exchange", refresh_exchange, interval=50 * 60, initial_delay=60)
+    scheduler.add_job("news", refresh_news, interval=50 * 60, initial_delay=120)
+    # 日次レートは1日1回更新されるので6時間ごとに差分だけ取り込む
+    scheduler.add_job("fx_history", refresh_fx_history, interval=6 * 3600, initial_delay=30)
+    # 年次の経済指標は1日1回、全ての国・指標をまとめて取り込み直す（未取り込みなら起動直後に）
+    scheduler.add_job(
+        "worldbank",
+        refresh_worldbank,
+        interval=24 * 3600,
+        initial_delay=60 if len(countries._wb_svc.store) else 5,
+    )
+    # 国の気候平年値（ソフト TTL 30日）は6時間ごとに climate_refresh_batch 件ずつ埋める
+    scheduler.add_job("climate", refresh_climate, interval=6 * 3600, initial_delay=150)
+    # Wikipedia の概要（ソフト TTL 7日）は1日1回、期限切れの国だけまとめて取り込む
+    scheduler.add_job("wikipedia", refresh_wikipedia, interval=24 * 3600, initial_delay=90)
@@ -1,20 +1,78 @@
+import os
 from contextlib import asynccontextmanager
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Query
 from fastapi.middleware.cors import CORSMiddleware
 
-from app.api import countries, safety, attractions, news, x_posts
+from app.api import (
+    attractions,
+    batch,
+    bundle,
+    climate,
+    countries,
+    economic,
+    exchange,
+    news,
+    recommendations,
+    safety,
+    x_posts,
+)
+from app.core.cache import cache_stats
+from app.core.cache_store import (
+    persistent_cache_stats,
+    start_persistent_cache,
+    stop_persistent_cache,
+)
 from app.core.config import settings
-from app.core.http_client import get_http_client, close_http_client
+from app.core.shared_cache import (
+    shared_cache_stats,
+    start_shared_cache,
+    stop_shared_cache,
+)
+from app.core.http_client import close_http_client, conditional_stats, get_http_client
+from app.core.parse_pool import parse_stats, shutdown_parse_pool
+from app.core.scheduler import scheduler
+from app.jobs import register_jobs
+from app.services.restcountries import RestCountriesService
+from app.services.fx_history import fx_history
+from app.services.safety_history import safety_history
+from app.services.worldbank_service import worldbank_store
+
+_search_svc = RestCountriesService()
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # 起動時: httpx コネクションプール初期化
     get_http_client()
+    # 永続キャッシュを読み込み、コールドスタート直後から温まった状態で応答する
+    if settings.data_dir:
+        await start_persistent_cache(
+            os.path.join(settings.data_dir, "cache.sqlite3"),
+            max_bytes=settings.cache_db_max_mb * 1024 * 1024,
+            flush_interval=settings.cache_flush_interval_seconds,
+        )
+    # 安全情報の変更履歴はファイルに残し、再起動後も差分フィードを続ける
+    if settings.data_dir:
+        safety_history.open(os.path.join(settings.data_dir, "safety_history.sqlite3"))
+        fx_history.load(os.path.join(settings.data_dir, "fx_history.npz"))
+        worldbank_store.load(os.path.join(settings.data_dir, "worldbank.npz"))
+    # インスタンス間で MOFA・ニュース・AI 等の結果を共有する
+    if settings.redis_url:
+        start_shared_cache(settings.redis_url, timeout=settings.redis_timeout_seconds)
+    # 定期リフレッシュ: リクエスト処理中にキャッシュを温め直さない
+    if settings.scheduler_enabled:
+        register_jobs(scheduler)
+        scheduler.start()
     yield
-    # 終了時: httpx クライアントクローズ
+    # 終了時: 未保存のキャッシュを書き出し、httpx クライアントクローズ
+    await scheduler.stop()
+    await stop_shared_cache()
+    await stop_persistent_cache()
+    if settings.data_dir:
+        safety_history.close()
     await close_http_client()
+    shutdown_parse_pool()
 
 
 app = FastAPI(
@@ -35,7 +93,14 @@ app.add_middleware(
 
 # ルーター登録
 app.include_router(countries.router)
+app.include_router(bundle.router)
+app.include_router(batch.router)
+app.include_router(exchange.router)
+app.include_router(climate.router)
+app.include_router(recommendations.router)
+app.include_router(economic.router)
 app.include_router(safety.router)
+app.include_router(safety.changes_router)
 app.include_router(attractions.router)
 app.include_router(news.router)
 app.include_router(x_posts.router)
@@ -46,8 +111,30 @@ async def health_check():
     return {"status": "ok", "version": "0.1.0"}
 
 
+@app.get("/api/system/cache", tags=["system"])
+async def cache_status():
+    """キャッシュ名前空間ごとの件数・サイズ・ヒット率を返す"""
+    return {
+        "namespaces": cache_stats(),
+        "persistent": persistent_cache_stats(),
+        "shared": shared_cache_stats(),
+        "conditional_get": conditional_stats(),
+    }
+
+
+@app.get("/api/system/parse", tags=["system"])
+async def parse_status():
+    """XML 解析プールの処理件数・解析時間・待ち件数を返す"""
+    return parse_stats()
+
+
+@app.get("/api/system/jobs", tags=["system"])
+async def job_status():
+    """定期リフレッシュジョブの実行状況を返す"""
+    return scheduler.stats()
+
+
 @app.get("/api/search", tags=["search"])
-async def search(q: str = ""):
-    from app.services.restcountries import RestCountriesService
-    svc = RestCountriesService()
-    return await svc.get_all_countries(query=q)
+async def search(q: str = "", limit: int = Query(20, ge=1, le=250)):
+    """国名・日本語名・首都・国コードで関連度順に検索する"""
+    return await _search_svc.get_all_countries(query=q, limit=limit)
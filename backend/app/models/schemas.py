@@ -1,6 +1,7 @@
 from __future__ import annotations
 from datetime import datetime
-from pydantic import BaseModel
+from typing import Any
+from pydantic import BaseModel, ConfigDict, Field
 
 
 class Currency(BaseModel):
@@ -28,6 +29,13 @@ class Country(BaseModel):
     timezones: list[str] = []
 
 
+class CountrySuggestion(BaseModel):
+    code: str
+    name: str
+    name_ja: str | None = None
+    flag_emoji: str = ""
+
+
 class SafetyDetail(BaseModel):
     category: str
     description: str
@@ -52,6 +60,26 @@ class SafetyInfo(BaseModel):
     safety_measure_url: str | None = None
     regional_risks: list[RegionalRisk] = []
     risk_map_url: str | None = None
+    available: bool = True  # False: 外務省の情報を取得できず、level は暫定値
+    fetched_at: datetime | None = None
+    stale: bool = False
+
+
+class SafetyChange(BaseModel):
+    seq: int
+    changed_at: datetime
+    country_code: str
+    source: str  # "mofa" | "state_dept"
+    field: str  # level / infection_level / regional_risks / mail
+    old: Any = None
+    new: Any = None
+
+
+class SafetyChangesResponse(BaseModel):
+    cursor: int  # 次回の since に渡す値
+    changes: list[SafetyChange]
+    has_more: bool = False
+    truncated: bool = False  # True なら since 以降の一部が削除済み（全件を取り直す）
 
 
 class EntryRequirement(BaseModel):
@@ -90,6 +118,8 @@ class NewsResponse(BaseModel):
     country_code: str
     articles: list[NewsArticle]
     total: int
+    fetched_at: datetime | None = None
+    stale: bool = False
 
 
 class OTMAttraction(BaseModel):
@@ -127,12 +157,60 @@ class ExchangeRate(BaseModel):
     rate: float  # 1 JPY = rate 外貨
 
 
+class CurrencyTrend(BaseModel):
+    currency_code: str
+    latest: float
+    min: float
+    max: float
+    mean: float
+    percentile: float  # 期間内で最新レート以下だった日の割合（高いほど円高＝現地通貨が割安）
+    change_pct: float  # 期間の初日からの変化率
+    samples: int
+    start_date: str
+    end_date: str
+
+
+class ExchangeHistory(BaseModel):
+    country_code: str
+    base: str = "JPY"
+    days: int
+    trends: list[CurrencyTrend]
+    available: bool = True
+
+
+class Conversion(BaseModel):
+    model_config = ConfigDict(populate_by_name=True)
+
+    amount: float
+    from_currency: str = Field(alias="from")
+    to_currency: str = Field(alias="to")
+
+
+class ConvertRequest(BaseModel):
+    conversions: list[Conversion] = Field(min_length=1, max_length=500)
+
+
+class ConversionResult(Conversion):
+    rate: float | None = None  # 1 from = rate to
+    result: float | None = None
+    error: str | None = None
+
+
+class ConvertResponse(BaseModel):
+    date: str | None = None
+    results: list[ConversionResult]
+    fetched_at: datetime | None = None
+    stale: bool = False
+
+
 class ExchangeInfo(BaseModel):
     country_code: str
     base: str = "JPY"
     rates: list[ExchangeRate]
     date: str | None = None
     available: bool = True
+    fetched_at: datetime | None = None
+    stale: bool = False
 
 
 class WikiSummary(BaseModel):
@@ -141,6 +219,8 @@ class WikiSummary(BaseModel):
     summary: str
     url: str | None = None
     available: bool = True
+    fetched_at: datetime | None = None
+    stale: bool = False
 
 
 class MonthlyClimate(BaseModel):
@@ -148,12 +228,68 @@ class MonthlyClimate(BaseModel):
     temp_max: float | None = None
     temp_min: float | None = None
     precipitation: float | None = None
+    rainy_days: float | None = None  # 日降水量 1mm 以上の日数
+    temp_max_p90: float | None = None  # 日最高気温の90パーセンタイル
+    temp_min_p10: float | None = None  # 日最低気温の10パーセンタイル
+    precipitation_p10: float | None = None  # 月降水量の年ごとのばらつき
+    precipitation_p90: float | None = None
 
 
 class ClimateInfo(BaseModel):
     country_code: str
     monthly: list[MonthlyClimate]
     available: bool = True
+    source: str | None = None  # archive: Open-Meteo の日次データから計算 / grid: 平年値グリッド
+    period_start: int | None = None  # 平年値の集計期間（年）
+    period_end: int | None = None
+    years: int | None = None  # 集計に使えた年数
+    fetched_at: datetime | None = None
+    stale: bool = False
+
+
+class PointClimateInfo(BaseModel):
+    latitude: float
+    longitude: float
+    monthly: list[MonthlyClimate]
+    available: bool = True
+    source: str | None = None
+    period_start: int | None = None
+    period_end: int | None = None
+    years: int | None = None
+    fetched_at: datetime | None = None
+    stale: bool = False
+
+
+class Recommendation(BaseModel):
+    code: str
+    name: str
+    name_ja: str | None = None
+    region: str | None = None
+    flag_emoji: str | None = None
+    score: float  # 0〜100
+    temp_max: float | None = None
+    temp_min: float | None = None
+    precipitation: float | None = None
+    rainy_days: float | None = None
+    safety_level: int | None = None
+    price_level: float | None = None  # 一人当たりGDPの順位（0: 安い〜1: 高い）
+
+
+class RecommendationsResponse(BaseModel):
+    month: int
+    region: str | None = None
+    max_level: int | None = None
+    results: list[Recommendation]
+    countries: int  # 対象にした国の数
+    climate_coverage: int  # 気候データのある国の数
+    built_at: datetime | None = None
+
+
+class EconomicIndicator(BaseModel):
+    indicator: str  # World Bank の指標コード
+    label: str | None = None
+    value: float
+    year: int
 
 
 class EconomicInfo(BaseModel):
@@ -161,6 +297,40 @@ class EconomicInfo(BaseModel):
     gdp_per_capita: float | None = None
     gdp_year: int | None = None
     available: bool = True
+    indicators: list[EconomicIndicator] = []  # 取り込んでいる各指標の最新値
+    fetched_at: datetime | None = None
+    stale: bool = False
+
+
+class EconomicPoint(BaseModel):
+    year: int
+    value: float
+
+
+class EconomicSeries(BaseModel):
+    country_code: str
+    indicator: str
+    label: str | None = None
+    points: list[EconomicPoint]
+    available: bool = True
+    fetched_at: datetime | None = None
+    stale: bool = False
+
+
+class EconomicComparisonEntry(BaseModel):
+    country_code: str
+    value: float
+    year: int
+
+
+class EconomicComparison(BaseModel):
+    indicator: str
+    label: str | None = None
+    year: int | None = None  # 省略時は国ごとの最新値
+    results: list[EconomicComparisonEntry]
+    not_found: list[str] = []
+    fetched_at: datetime | None = None
+    stale: bool = False
 
 
 class XPost(BaseModel):
@@ -171,3 +341,50 @@ class XPost(BaseModel):
     media_url: str | None = None
     like_count: int = 0
     retweet_count: int = 0
+
+
+class AISummary(BaseModel):
+    attractions: list[Attraction] = []
+    best_season: str | None = None
+    travel_tips: list[str] = []
+
+
+class BundleSection(BaseModel):
+    status: str  # "ok" | "error"
+    data: Any = None
+    error: str | None = None
+    elapsed_ms: float
+
+
+class BundleResponse(BaseModel):
+    country_code: str
+    sections: dict[str, BundleSection]
+    elapsed_ms: float
+
+
+class BatchItemError(BaseModel):
+    """一括取得で、その国だけ組み立てに失敗した場合の結果"""
+
+    country_code: str
+    available: bool = False
+    error: str
+
+
+class BatchSafetyResponse(BaseModel):
+    results: dict[str, SafetyInfo | BatchItemError]
+    not_found: list[str] = []
+
+
+class BatchExchangeResponse(BaseModel):
+    results: dict[str, ExchangeInfo | BatchItemError]
+    not_found: list[str] = []
+
+
+class BatchClimateResponse(BaseModel):
+    results: dict[str, ClimateInfo | BatchItemError]
+    not_found: list[str] = []
+
+
+class BatchEconomicResponse(BaseModel):
+    results: dict[str, EconomicInfo | BatchItemError]
+    not_found: list[str] = []
@@ -3,10 +3,19 @@ from __future__ import annotations
 import json
 import re
 
+from app.core.cache import cached, get_cache
 from app.core.config import settings
 
 # インメモリキャッシュ（観光情報は頻繁に変わらないため長めにキャッシュ）
-_attractions_cache: dict[str, dict] = {}
+_attractions_cache = get_cache(
+    "ai_attractions",
+    ttl=30 * 24 * 3600,
+    max_entries=512,
+    max_bytes=16 * 1024 * 1024,
+    hard_ttl=90 * 24 * 3600,
+    persist=True,
+    shared=True,
+)
 
 # 国別の静的観光情報データ（Claude APIが使えない場合のフォールバック）
 _STATIC_DATA: dict[str, dict] = {
@@ -112,22 +121,16 @@ class AIService:
                 self._client = None
         return self._client
 
+    @cached(_attractions_cache, key=lambda self, country_code, country_name: country_code.upper())
     async def generate_attractions(self, country_code: str, country_name: str) -> dict:
-        cache_key = country_code.upper()
-        if cache_key in _attractions_cache:
-            return _attractions_cache[cache_key]
-
         # Anthropic APIが利用可能な場合はAI生成を試みる
         if self.client:
             result = await self._generate_with_ai(country_code, country_name)
             if result:
-                _attractions_cache[cache_key] = result
                 return result
 
         # 静的データを使用
-        result = self._get_static_data(country_code, country_name)
-        _attractions_cache[cache_key] = result
-        return result
+        return self._get_static_data(country_code, country_name)
 
     async def _generate_with_ai(self, country_code: str, country_name: str) -> dict | None:
         """Claude AIで観光情報を生成する。失敗時はNoneを返す。"""
@@ -0,0 +1,180 @@
+"""全球の月別気候平年値グリッド（メモリマップで参照）
+
+事前にビルドした .npy（緯度×経度×12か月×項目、float16）を np.load(mmap_mode="r") で開き、
+任意の緯度経度の平年値をネットワークなしで返す。ファイルは OS のページキャッシュに載るだけで、
+プロセスごとに読み込むことはない。
+
+- 解像度は配列の形から決まる（0.5° なら 360×720、約 25MB）
+- セルの中心は南西端 (-90, -180) から解像度の半分ずれた位置
+- 海上などデータのないセルは NaN。沿岸の首都などは近くのデータのあるセルを使う
+- ビルド: python -m app.services.climate_grid input.csv output.npy --resolution 0.5
+  （入力は lat,lon,month,temp_max,temp_min,precipitation[,rainy_days] の CSV。
+  CRU・WorldClim・ERA5 等の平年値をこの形に書き出して使う）
+"""
+from __future__ import annotations
+
+import argparse
+import csv
+import math
+import os
+from typing import Iterable
+
+import numpy as np
+
+from app.core.config import settings
+
+GRID_FIELDS = ("temp_max", "temp_min", "precipitation", "rainy_days")
+_SEARCH_RADIUS = 2  # データのないセルでは周囲この数のセルまで探す
+
+
+def _cell(value: float, origin: float, resolution: float, size: int) -> int:
+    return min(max(int(math.floor((value - origin) / resolution)), 0), size - 1)
+
+
+class ClimateGrid:
+    """メモリマップした平年値グリッド"""
+
+    def __init__(self, path: str = "") -> None:
+        self.path = path
+        self._data: np.ndarray | None = None
+        self._failed = False
+        self.lookups = 0
+        self.misses = 0
+
+    def _grid(self) -> np.ndarray | None:
+        if self._data is None and self.path and not self._failed:
+            try:
+                data = np.load(self.path, mmap_mode="r")
+            except (OSError, ValueError):
+                self._failed = True
+                return None
+            if data.ndim != 4 or data.shape[2] != 12 or data.shape[1] != 2 * data.shape[0]:
+                self._failed = True
+                return None
+            self._data = data
+        return self._data
+
+    def open(self, path: str) -> None:
+        """参照するファイルを切り替える（次の参照時に開く）。"""
+        self.path = path
+        self._data = None
+        self._failed = False
+
+    @property
+    def available(self) -> bool:
+        return self._grid() is not None
+
+    @property
+    def resolution(self) -> float | None:
+        grid = self._grid()
+        return None if grid is None else 180.0 / grid.shape[0]
+
+    def lookup(self, lat: float, lon: float) -> np.ndarray | None:
+        """(12, len(GRID_FIELDS)) の平年値を返す。グリッドがない・近くにデータがなければ None。"""
+        grid = self._grid()
+        if grid is None:
+            return None
+        self.lookups += 1
+        rows, cols = grid.shape[:2]
+        res = 180.0 / rows
+        i = _cell(lat, -90.0, res, rows)
+        j = _cell(((lon + 180.0) % 360.0) - 180.0, -180.0, res, cols)
+        values = grid[i, j]
+        if not np.isnan(values[:, 0]).all():
+            return values.astype(np.float32)
+        # 周囲のセルから、データがあって中心が最も近いものを選ぶ（経度は日付変更線で折り返す）
+        di = np.arange(-_SEARCH_RADIUS, _SEARCH_RADIUS + 1)
+        ii = np.clip(i + di, 0, rows - 1)
+        jj = (j + di) % cols
+        window = grid[np.ix_(ii, jj)][:, :, :, 0]
+        has_data = ~np.isnan(window).all(axis=2)
+        if not has_data.any():
+            self.misses += 1
+            return None
+        distance = di[:, None] ** 2 + (di[None, :] * math.cos(math.radians(lat))) ** 2
+        distance = np.where(has_data, distance, np.inf)
+        a, b = np.unravel_index(np.argmin(distance), distance.shape)
+        return grid[ii[a], jj[b]].astype(np.float32)
+
+    def monthly(self, lat: float, lon: float) -> list[dict] | None:
+        values = self.lookup(lat, lon)
+        if values is None:
+            return None
+        return [
+            {
+                "month": m + 1,
+                **{
+                    field: None if math.isnan(values[m, k]) else round(float(values[m, k]), 1)
+                    for k, field in enumerate(GRID_FIELDS)
+                },
+            }
+            for m in range(12)
+        ]
+
+    def stats(self) -> dict:
+        grid = self._grid()
+        return {
+            "path": self.path or None,
+            "available": grid is not None,
+            "resolution": self.resolution,
+            "bytes": int(grid.nbytes) if grid is not None else 0,
+            "lookups": self.lookups,
+            "misses": self.misses,
+        }
+
+
+def build_grid(rows: Iterable[tuple], path: str, resolution: float = 0.5) -> int:
+    """(lat, lon, month, temp_max, temp_min, precipitation[, rainy_days]) の並びからグリッドを作り、
+    データのあるセル数を返す。同じセルに複数の点があれば平均する。
+    """
+    n_lat = int(round(180 / resolution))
+    n_lon = 2 * n_lat
+    total = np.zeros((n_lat, n_lon, 12, len(GRID_FIELDS)), dtype=np.float64)
+    count = np.zeros_like(total, dtype=np.uint16)
+    for row in rows:
+        lat, lon, month, *values = row
+        i = _cell(float(lat), -90.0, resolution, n_lat)
+        j = _cell(((float(lon) + 180.0) % 360.0) - 180.0, -180.0, resolution, n_lon)
+        for k, value in enumerate(values[: len(GRID_FIELDS)]):
+            if value is not None and not math.isnan(value):
+                total[i, j, int(month) - 1, k] += value
+                count[i, j, int(month) - 1, k] += 1
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp = f"{path}.tmp.npy"
+    out = np.lib.format.open_memmap(tmp, mode="w+", dtype=np.float16, shape=total.shape)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        out[:] = (total / count).astype(np.float16)
+    out.flush()
+    del out
+    os.replace(tmp, path)
+    return int(np.count_nonzero(count[:, :, :, 0].any(axis=2)))
+
+
+def read_csv(path: str) -> Iterable[tuple]:
+    """ビルド用の CSV（ヘッダー行あり）を読む。空欄は欠測として扱う。"""
+    columns = ("lat", "lon", "month", *GRID_FIELDS)
+    with open(path, newline="", encoding="utf-8") as f:
+        for record in csv.DictReader(f):
+            yield tuple(
+                float(record[c]) if record.get(c) not in (None, "") else None for c in columns
+            )
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="月別気候平年値のグリッドファイルをビルドする")
+    parser.add_argument("input", help="lat,lon,month,temp_max,temp_min,precipitation[,rainy_days] の CSV")
+    parser.add_argument("output", help="出力する .npy ファイル")
+    parser.add_argument("--resolution", type=float, default=0.5, help="グリッドの解像度（度）")
+    args = parser.parse_args(argv)
+    cells = build_grid(read_csv(args.input), args.output, args.resolution)
+    print(f"{args.output}: {cells} cells")
+
+
+climate_grid = ClimateGrid(settings.climate_grid_path)
+
+
+if __name__ == "__main__":
+    main()
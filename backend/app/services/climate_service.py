@@ -1,52 +1,297 @@
 """Open-Meteo Archive API を使った気候情報サービス（キー不要）
-daily データを取得して月次集計する。
+直近 climate_normal_years 年分の daily データを1回で取得し、NumPy で月別の平年値を計算する。
+
+- 年×月ごとに集計してから年をまたいで平均するので、欠測の多い年があっても残りの年で計算できる
+- 降水量は月合計の平年値、雨の日は日降水量 1mm 以上の日数
+- 幅として日最高気温の90パーセンタイル・日最低気温の10パーセンタイル・月降水量の10/90パーセンタイルも返す
+- キャッシュには月×項目の平年値を array('f') 1本で保存し、応答時に展開する
+- 平年値グリッド（climate_grid）があれば、まだ取得していない国・任意の地点にも即座に答え、
+  上流の取得は裏で行う精緻化として扱う
+- 任意の地点はリクエスト中に上流へは行かない（取得済みの値・グリッドのみ）
 """
 from __future__ import annotations
-import time
-from typing import Any
 
+import asyncio
+import math
+import warnings
+from array import array
+from datetime import date
+
+import numpy as np
+
+from app.core.cache import CacheNamespace, get_cache
+from app.core.config import settings
 from app.core.http_client import get_http_client
+from app.services.climate_grid import GRID_FIELDS, climate_grid
+
+_TTL = 30 * 24 * 3600  # 30日間（過去の年のデータは不変）
+_cache = get_cache(
+    "climate",
+    ttl=_TTL,
+    max_entries=512,
+    hard_ttl=90 * 24 * 3600,
+    persist=True,
+)
+# 任意の地点の平年値。誰でも座標を指定できるので、国の平年値を追い出さないよう
+# 別の小さな名前空間に置き、永続化もしない
+_point_cache = get_cache(
+    "climate_points",
+    ttl=_TTL,
+    max_entries=128,
+    hard_ttl=90 * 24 * 3600,
+)
+
+# 平年値の項目（キャッシュの配列は月ごとにこの順で並ぶ。先頭はグリッドの項目と同じ）
+FIELDS = (
+    "temp_max",
+    "temp_min",
+    "precipitation",
+    "rainy_days",
+    "temp_max_p90",
+    "temp_min_p10",
+    "precipitation_p10",
+    "precipitation_p90",
+)
+_RAINY_DAY_MM = 1.0
+_MIN_COVERAGE = 0.8  # 年×月の集計に必要な日数の割合（これ未満の月はその年を除外）
+
+
+# 上流での精緻化を裏で走らせているタスク（GC されないよう参照を持つ）
+_refine_tasks: set[asyncio.Task] = set()
+_refining: set[str] = set()
+
+
+def _key(country_code: str) -> str:
+    return f"climate_normals_{country_code}"
+
+
+def _point_key(lat: float, lon: float) -> str:
+    # 0.5° 単位にまとめ、近い地点同士で上流の取得を共有する
+    return f"climate_point_{round(lat * 2) / 2:g}_{round(lon * 2) / 2:g}"
+
+
+def _unavailable(country_code: str) -> dict:
+    return {"country_code": country_code, "monthly": [], "available": False}
+
+
+def _from_normals(value: dict) -> dict:
+    return {
+        "monthly": expand_normals(value["normals"]),
+        "available": True,
+        "source": "archive",
+        "period_start": value["period_start"],
+        "period_end": value["period_end"],
+        "years": value["years"],
+    }
+
+
+def _from_grid(lat: float, lon: float) -> dict | None:
+    monthly = climate_grid.monthly(lat, lon)
+    if monthly is None:
+        return None
+    return {"monthly": monthly, "available": True, "source": "grid"}
+
+
+def _column(daily: dict, name: str, length: int) -> np.ndarray:
+    """日次の値を float64 配列にする（null・欠けた要素は NaN）。"""
+    values = daily.get(name) or []
+    column = np.full(length, np.nan)
+    if values:
+        column[: len(values)] = np.array(values[:length], dtype=np.float64)
+    return column
+
+
+def _by_year_month(slot: np.ndarray, values: np.ndarray, slots: int, days_in_slot: np.ndarray):
+    """年×月ごとの (平均, 有効日数の割合) を返す。"""
+    valid = ~np.isnan(values)
+    count = np.bincount(slot[valid], minlength=slots)
+    total = np.bincount(slot[valid], weights=values[valid], minlength=slots)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = total / count
+    coverage = count / days_in_slot
+    mean[coverage < _MIN_COVERAGE] = np.nan
+    return mean, coverage
+
 
-_cache: dict[str, tuple[Any, float]] = {}
-_TTL = 30 * 24 * 3600  # 30日間（年間データは不変）
+def compute_normals(times: list[str], daily: dict) -> tuple[np.ndarray, int] | None:
+    """日次データから (12×len(FIELDS) の平年値, 集計に使えた年数) を計算する。"""
+    if not times:
+        return None
+    days = np.array(times, dtype="datetime64[D]")
+    n = len(days)
+    temp_max = _column(daily, "temperature_2m_max", n)
+    temp_min = _column(daily, "temperature_2m_min", n)
+    precip = _column(daily, "precipitation_sum", n)
 
+    months = days.astype("datetime64[M]")
+    first = months.min()
+    slot = (months - first).astype(np.int64)  # 期間の先頭月からの通し番号（年×月）
+    slots = int(slot.max()) + 1
+    month_starts = first + np.arange(slots)
+    next_starts = (month_starts + 1).astype("datetime64[D]")
+    days_in_slot = (next_starts - month_starts.astype("datetime64[D]")).astype(np.float64)
+    month_of_slot = month_starts.astype(np.int64) % 12
+    month_of_day = months.astype(np.int64) % 12
 
-def _monthly_aggregate(times: list[str], values: list[float | None], agg: str) -> dict[int, float | None]:
-    """日次データを月ごとに集計する。agg: 'avg' or 'sum'"""
-    buckets: dict[int, list[float]] = {m: [] for m in range(1, 13)}
-    for t, v in zip(times, values):
-        if v is not None:
-            month = int(t.split("-")[1])
-            buckets[month].append(v)
-    result: dict[int, float | None] = {}
-    for m, vals in buckets.items():
-        if not vals:
-            result[m] = None
-        elif agg == "sum":
-            result[m] = round(sum(vals), 1)
-        else:
-            result[m] = round(sum(vals) / len(vals), 1)
-    return result
+    max_mean, _ = _by_year_month(slot, temp_max, slots, days_in_slot)
+    min_mean, _ = _by_year_month(slot, temp_min, slots, days_in_slot)
+    # 降水量・雨の日は欠測日の分を月の日数に合わせて補正する
+    precip_mean, coverage = _by_year_month(slot, precip, slots, days_in_slot)
+    precip_total = precip_mean * days_in_slot
+    with np.errstate(invalid="ignore", divide="ignore"):
+        rainy = np.bincount(slot[precip >= _RAINY_DAY_MM], minlength=slots) / coverage
+    rainy[np.isnan(precip_total)] = np.nan
+
+    normals = np.full((12, len(FIELDS)), np.nan)
+    with warnings.catch_warnings():
+        # 全年欠測の月は NaN のままにする（nanmean 等の警告は不要）
+        warnings.simplefilter("ignore", RuntimeWarning)
+        for m in range(12):
+            in_month = month_of_slot == m
+            days_in_month = month_of_day == m
+            normals[m] = (
+                np.nanmean(max_mean[in_month]),
+                np.nanmean(min_mean[in_month]),
+                np.nanmean(precip_total[in_month]),
+                np.nanmean(rainy[in_month]),
+                np.nanpercentile(temp_max[days_in_month], 90),
+                np.nanpercentile(temp_min[days_in_month], 10),
+                np.nanpercentile(precip_total[in_month], 10),
+                np.nanpercentile(precip_total[in_month], 90),
+            )
+    if np.isnan(normals[:, 0]).all():
+        return None
+    year_of_slot = month_starts.astype("datetime64[Y]").astype(np.int64)
+    years = len(np.unique(year_of_slot[~np.isnan(max_mean)]))
+    return normals, years
+
+
+def _round(value: float) -> float | None:
+    return None if math.isnan(value) else round(value, 1)
+
+
+def expand_normals(normals: array) -> list[dict]:
+    """キャッシュの平年値配列を月ごとの dict に展開する。"""
+    width = len(FIELDS)
+    return [
+        {
+            "month": m + 1,
+            **{field: _round(normals[m * width + i]) for i, field in enumerate(FIELDS)},
+        }
+        for m in range(12)
+    ]
 
 
 class ClimateService:
     BASE_URL = "https://archive-api.open-meteo.com/v1/archive"
 
-    async def get_climate(self, country_code: str, lat: float | None, lon: float | None) -> dict:
+    async def get_climate(
+        self, country_code: str, lat: float | None, lon: float | None, fetch: bool = True
+    ) -> dict:
         if lat is None or lon is None:
-            return {"country_code": country_code, "monthly": [], "available": False}
+            return _unavailable(country_code)
+        result = await self._lookup(
+            _cache, _key(country_code), lat, lon, settings.climate_refine_upstream, fetch=fetch
+        )
+        if result is None:
+            return _unavailable(country_code)
+        return {"country_code": country_code, **result}
+
+    async def get_point_climate(self, lat: float, lon: float) -> dict:
+        """任意の地点（首都・世界遺産・観光スポット等）の平年値。
+
+        リクエスト中に上流へは行かず、取得済みの値かグリッドで答える。
+        """
+        result = await self._lookup(
+            _point_cache, _point_key(lat, lon), lat, lon, settings.climate_refine_points, fetch=False
+        )
+        if result is None:
+            return {"latitude": lat, "longitude": lon, "monthly": [], "available": False}
+        return {"latitude": lat, "longitude": lon, **result}
+
+    async def _lookup(
+        self, cache: CacheNamespace, key: str, lat: float, lon: float, refine: bool, fetch: bool
+    ) -> dict | None:
+        """取得済みの上流の平年値 → グリッド → 上流の取得の順に探す。
+
+        ソフト TTL 切れでもハード TTL 内の上流の値があればそれを返し、裏で取り直す。
+        上流の取得は fetch が真で、グリッドでも答えられない場合だけ行う。
+        """
+        gridded = _from_grid(lat, lon)
+        fetch_now = fetch and gridded is None
+        cv = await cache.fetch_entry(
+            key, lambda: self._fetch(lat, lon), fetch_on_miss=fetch_now
+        )
+        if cv is not None:
+            return {**_from_normals(cv.value), **cv.meta()}
+        if refine and not fetch_now:
+            self._refine(cache, key, lat, lon)
+        return gridded
+
+    def _refine(self, cache: CacheNamespace, key: str, lat: float, lon: float) -> None:
+        """上流の平年値を裏で取得し、次回以降の応答を置き換える。
 
-        cache_key = f"climate_{country_code}"
-        if cache_key in _cache:
-            data, ts = _cache[cache_key]
-            if time.time() - ts < _TTL:
-                return data
+        同時に走らせる数は climate_refine_concurrency まで（超えた分は次のリクエストに任せる）。
+        """
+        if key in _refining or len(_refining) >= settings.climate_refine_concurrency:
+            return
+        _refining.add(key)
+        task = asyncio.get_running_loop().create_task(
+            cache.fetch_entry(key, lambda: self._fetch(lat, lon))
+        )
+        _refine_tasks.add(task)
+        task.add_done_callback(_refine_tasks.discard)
+        task.add_done_callback(lambda _: _refining.discard(key))
 
+    async def prefetch(self, country_codes: list[str]) -> None:
+        """永続ストア等にある分をまとめてメモリへ読み戻す（上流へはアクセスしない）。"""
+        await _cache.get_many([_key(c) for c in country_codes])
+
+    async def stale_countries(self, countries: list[dict]) -> list[dict]:
+        """座標があり、上流の平年値が未取得かソフト TTL 切れの国を返す。"""
+        located = [
+            c for c in countries if c.get("latitude") is not None and c.get("longitude") is not None
+        ]
+        found = await _cache.get_many([_key(c["code"]) for c in located])
+        return [c for c in located if (cv := found.get(_key(c["code"]))) is None or cv.stale]
+
+    async def refresh(self, country: dict) -> dict | None:
+        """国の平年値を上流から取得し直す（スケジューラ用）。失敗時は None。"""
+        return await _cache.refresh(
+            _key(country["code"]), lambda: self._fetch(country["latitude"], country["longitude"])
+        )
+
+    @property
+    def cache_version(self) -> int:
+        return _cache.version
+
+    async def monthly_matrix(self, countries: list[dict]) -> np.ndarray:
+        """国ごとの月別平年値（GRID_FIELDS の項目）を (国数, 12, 項目) にまとめる。
+
+        取得済みの上流の平年値を優先し、なければグリッド、どちらもなければ NaN（上流へはアクセスしない）。
+        """
+        found = await _cache.get_many([_key(c["code"]) for c in countries])
+        matrix = np.full((len(countries), 12, len(GRID_FIELDS)), np.nan, dtype=np.float32)
+        for i, country in enumerate(countries):
+            cv = found.get(_key(country["code"]))
+            if cv is not None:
+                normals = np.frombuffer(cv.value["normals"], dtype=np.float32)
+                matrix[i] = normals.reshape(12, len(FIELDS))[:, : len(GRID_FIELDS)]
+            elif country.get("latitude") is not None and country.get("longitude") is not None:
+                values = climate_grid.lookup(country["latitude"], country["longitude"])
+                if values is not None:
+                    matrix[i] = values
+        return matrix
+
+    async def _fetch(self, lat: float, lon: float) -> dict | None:
+        """Open-Meteo から直近の完了した年までの日次データを取得して平年値を計算する。失敗時は None。"""
+        end_year = date.today().year - 1
+        start_year = end_year - settings.climate_normal_years + 1
         params = {
             "latitude": lat,
             "longitude": lon,
-            "start_date": "2023-01-01",
-            "end_date": "2023-12-31",
+            "start_date": f"{start_year}-01-01",
+            "end_date": f"{end_year}-12-31",
             "daily": "temperature_2m_max,temperature_2m_min,precipitation_sum",
             "timezone": "auto",
         }
@@ -56,34 +301,19 @@ class ClimateService:
             resp.raise_for_status()
             raw = resp.json()
         except Exception:
-            return {"country_code": country_code, "monthly": [], "available": False}
+            return None
 
         if raw.get("error"):
-            return {"country_code": country_code, "monthly": [], "available": False}
+            return None
 
         daily = raw.get("daily", {})
-        times: list[str] = daily.get("time", [])
-        temp_max_daily: list[float | None] = daily.get("temperature_2m_max", [])
-        temp_min_daily: list[float | None] = daily.get("temperature_2m_min", [])
-        precip_daily: list[float | None] = daily.get("precipitation_sum", [])
-
-        if not times:
-            return {"country_code": country_code, "monthly": [], "available": False}
-
-        max_by_month = _monthly_aggregate(times, temp_max_daily, "avg")
-        min_by_month = _monthly_aggregate(times, temp_min_daily, "avg")
-        precip_by_month = _monthly_aggregate(times, precip_daily, "sum")
-
-        monthly = [
-            {
-                "month": m,
-                "temp_max": max_by_month[m],
-                "temp_min": min_by_month[m],
-                "precipitation": precip_by_month[m],
-            }
-            for m in range(1, 13)
-        ]
-
-        result = {"country_code": country_code, "monthly": monthly, "available": True}
-        _cache[cache_key] = (result, time.time())
-        return result
+        computed = compute_normals(daily.get("time", []), daily)
+        if computed is None:
+            return None
+        normals, years = computed
+        return {
+            "normals": array("f", normals.astype(np.float32).tobytes()),
+            "period_start": start_year,
+            "period_end": end_year,
+            "years": years,
+        }
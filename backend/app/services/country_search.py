@@ -0,0 +1,259 @@
+"""国名検索インデックス
+
+国一覧の読み込み時に1度だけ構築し、検索ボックスの入力ごとの問い合わせに
+線形走査なしで応答する。入力補完（suggest）は CountryTrie が受け持つ。
+
+- 英語名・日本語名（NAME_JA_MAP）・首都・ISO コード（cca2/cca3）が対象
+- NFKC 正規化・小文字化・ひらがな→カタカナ・発音記号除去で表記ゆれを吸収
+- 完全一致 > 前方一致 > 単語の前方一致 > 部分一致 > あいまい一致の順で順位付け
+  （あいまい一致は trigram で候補を絞り、Dice 係数または編集距離で判定）
+"""
+from __future__ import annotations
+
+import re
+import unicodedata
+from collections import defaultdict
+
+# フィールドごとの重み（同じ一致種別なら国名 > コード > 首都）
+_FIELD_WEIGHTS = {"name": 1.0, "name_ja": 1.0, "code": 0.95, "capital": 0.6}
+
+# 一致種別ごとの基本スコア
+_EXACT = 100.0
+_PREFIX = 80.0
+_WORD_PREFIX = 65.0
+_SUBSTRING = 45.0
+_FUZZY = 30.0
+
+# あいまい一致とみなす trigram 類似度（Dice 係数）の下限
+_FUZZY_THRESHOLD = 0.45
+_FUZZY_MIN_LENGTH = 4
+
+_SEPARATORS = re.compile(r"[\s\-‐・･'’.,()（）&]+")
+
+
+def normalize(text: str) -> str:
+    """検索用に正規化する（区切り記号は空白1つにまとめる）。"""
+    text = unicodedata.normalize("NFKC", text).lower()
+    # 発音記号（é, ç 等）だけを除去する。濁点・半濁点は残す
+    decomposed = unicodedata.normalize("NFD", text)
+    text = unicodedata.normalize(
+        "NFC", "".join(c for c in decomposed if not 0x300 <= ord(c) <= 0x36F)
+    )
+    # ひらがな → カタカナ
+    text = "".join(chr(ord(c) + 0x60) if "ぁ" <= c <= "ゖ" else c for c in text)
+    return _SEPARATORS.sub(" ", text).strip()
+
+
+def _trigrams(term: str) -> set[str]:
+    padded = f"  {term} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _ngrams(term: str) -> set[str]:
+    """長さ1〜3の部分文字列（部分一致の候補絞り込み用）。"""
+    grams = set()
+    for n in (1, 2, 3):
+        for i in range(len(term) - n + 1):
+            grams.add(term[i:i + n])
+    return grams
+
+
+class CountrySearchIndex:
+    """国一覧から構築する検索インデックス"""
+
+    def __init__(self, countries: list[dict]) -> None:
+        self.countries = countries
+        # (正規化語, 国の位置, 重み, 単語一覧)
+        self._terms: list[tuple[str, int, float, tuple[str, ...]]] = []
+        self._exact: dict[str, list[int]] = defaultdict(list)
+        self._prefix: dict[str, set[int]] = defaultdict(set)
+        self._ngram: dict[str, set[int]] = defaultdict(set)
+        self._trigram: dict[str, set[int]] = defaultdict(set)
+        self._trigram_counts: list[int] = []
+
+        for idx, country in enumerate(countries):
+            fields = [
+                ("name", country.get("name")),
+                ("name_ja", country.get("name_ja")),
+                ("code", country.get("code")),
+                ("code", country.get("cca3")),
+                ("capital", country.get("capital")),
+            ]
+            for field, raw in fields:
+                if not raw:
+                    continue
+                words = tuple(normalize(raw).split())
+                term = "".join(words)
+                if not term:
+                    continue
+                term_id = len(self._terms)
+                self._terms.append((term, idx, _FIELD_WEIGHTS[field], words))
+                self._exact[term].append(term_id)
+                for word in {term, *words}:
+                    for end in range(1, len(word) + 1):
+                        self._prefix[word[:end]].add(term_id)
+                for gram in _ngrams(term):
+                    self._ngram[gram].add(term_id)
+                grams = _trigrams(term)
+                self._trigram_counts.append(len(grams))
+                for gram in grams:
+                    self._trigram[gram].add(term_id)
+
+    def search(self, query: str, limit: int | None = 20) -> list[dict]:
+        """関連度順に国を返す。"""
+        words = normalize(query).split()
+        q = "".join(words)
+        if not q:
+            return []
+
+        scores: dict[int, float] = {}
+
+        def add(term_id: int, base: float) -> None:
+            term, idx, weight, _ = self._terms[term_id]
+            # 短い語ほど一致の割合が高いので少しだけ優先する
+            score = base * weight + len(q) / max(len(term), 1)
+            if score > scores.get(idx, 0.0):
+                scores[idx] = score
+
+        for term_id in self._exact.get(q, ()):
+            add(term_id, _EXACT)
+        for term_id in self._prefix.get(q, ()):
+            add(term_id, _PREFIX if self._terms[term_id][0].startswith(q) else _WORD_PREFIX)
+        if len(words) > 1:
+            # 複数語の問い合わせは各語が単語の前方一致するものを拾う
+            for term_id in set.intersection(*(self._prefix.get(w, set()) for w in words)):
+                add(term_id, _WORD_PREFIX)
+        # 1文字の部分一致はほぼ全件に当たるため前方一致のみとする
+        if len(q) > 1:
+            for term_id in self._substring_candidates(q):
+                if q in self._terms[term_id][0]:
+                    add(term_id, _SUBSTRING)
+        # あいまい一致は結果が足りない場合のみ（上限なしなら1件もない場合のみ）
+        wanted = limit if limit is not None else 1
+        if len(q) >= _FUZZY_MIN_LENGTH and len(scores) < wanted:
+            self._add_fuzzy(q, scores, add, wanted)
+
+        ranked = sorted(
+            scores.items(),
+            key=lambda item: (
+                -item[1],
+                -(self.countries[item[0]].get("population") or 0),
+                self.countries[item[0]].get("name", ""),
+            ),
+        )
+        if limit is not None:
+            ranked = ranked[:limit]
+        return [self.countries[idx] for idx, _ in ranked]
+
+    def _substring_candidates(self, q: str) -> set[int]:
+        if len(q) <= 3:
+            return self._ngram.get(q, set())
+        grams = [self._ngram.get(q[i:i + 3], set()) for i in range(len(q) - 2)]
+        return set.intersection(*grams) if grams else set()
+
+    def _add_fuzzy(self, q: str, scores: dict[int, float], add, wanted: int) -> None:
+        q_grams = _trigrams(q)
+        overlap: dict[int, int] = defaultdict(int)
+        for gram in q_grams:
+            for term_id in self._trigram.get(gram, ()):
+                overlap[term_id] += 1
+        # 共有 trigram の多い候補から判定し、件数が揃ったら打ち切る
+        for term_id, shared in sorted(overlap.items(), key=lambda item: -item[1]):
+            if len(scores) >= wanted:
+                break
+            term, idx, _, _ = self._terms[term_id]
+            if idx in scores:
+                continue  # より強い一致で既に拾った国
+            # 単語の途中まで入力された場合に備え、問い合わせと同じ長さの先頭でも比較する
+            similarity = 2 * shared / (len(q_grams) + self._trigram_counts[term_id])
+            if similarity < _FUZZY_THRESHOLD and len(term) > len(q):
+                similarity = _dice(q_grams, _trigrams(term[:len(q)]))
+            if similarity < _FUZZY_THRESHOLD and shared >= 2:
+                # 入れ替え・脱字など1〜2文字の誤りは編集距離で拾う
+                max_distance = 1 if len(q) < 6 else 2
+                distance = _edit_distance(q, term[:len(q) + max_distance], max_distance)
+                if distance <= max_distance:
+                    similarity = 1 - distance / len(q)
+            if similarity >= _FUZZY_THRESHOLD:
+                add(term_id, _FUZZY * similarity)
+
+
+def _dice(a: set[str], b: set[str]) -> float:
+    if not a or not b:
+        return 0.0
+    return 2 * len(a & b) / (len(a) + len(b))
+
+
+def _edit_distance(a: str, b: str, limit: int) -> int:
+    """a を b の先頭部分に一致させる最小編集距離（隣接文字の入れ替えは1）。
+
+    limit を超えることが確定した時点で limit + 1 を返す。
+    """
+    prev2: list[int] = []
+    prev = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        cur = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                cur[j] = min(cur[j], prev2[j - 2] + 1)
+        if min(cur) > limit:
+            return limit + 1
+        prev2, prev = prev, cur
+    # b は末尾を入力途中とみなし、どの位置で終わってもよい
+    return min(prev)
+
+
+class CountryTrie:
+    """入力補完用の前方一致トライ
+
+    各ノードに人口順の上位候補を事前計算して持たせ、問い合わせは
+    接頭辞の長さ分だけノードをたどれば済むようにする。
+    """
+
+    def __init__(self, countries: list[dict], top_n: int = 10) -> None:
+        self.countries = countries
+        self.top_n = top_n
+        # ノード: (子ノード, 上位候補, この位置で終わる語の国)
+        self._root: tuple[dict, list[int], list[int]] = ({}, [], [])
+        candidates: dict[int, set[int]] = defaultdict(set)
+        nodes: list[tuple[dict, list[int], list[int]]] = [self._root]
+
+        for idx, country in enumerate(countries):
+            for raw in (country.get("name"), country.get("name_ja"),
+                        country.get("code"), country.get("cca3")):
+                if not raw:
+                    continue
+                words = normalize(raw).split()
+                for key in {"".join(words), *words}:
+                    node = self._root
+                    for ch in key:
+                        child = node[0].get(ch)
+                        if child is None:
+                            child = ({}, [], [])
+                            node[0][ch] = child
+                            nodes.append(child)
+                        node = child
+                        candidates[id(node)].add(idx)
+                    if idx not in node[2]:
+                        node[2].append(idx)
+
+        def rank(idx: int) -> tuple:
+            c = countries[idx]
+            return (-(c.get("population") or 0), c.get("name", ""))
+
+        for node in nodes:
+            node[1].extend(sorted(candidates.get(id(node), ()), key=rank)[:top_n])
+
+    def suggest(self, prefix: str, limit: int = 10) -> list[dict]:
+        """接頭辞に一致する国を最大 limit 件返す（完全一致の語を優先）。"""
+        node = self._root
+        for ch in "".join(normalize(prefix).split()):
+            node = node[0].get(ch)
+            if node is None:
+                return []
+        if node is self._root:
+            return []
+        ordered = list(dict.fromkeys([*node[2], *node[1]]))
+        return [self.countries[idx] for idx in ordered[:min(limit, self.top_n)]]
@@ -1,12 +1,95 @@
-"""Frankfurter API を使った為替レートサービス（キー不要）"""
+"""Frankfurter API を使った為替レートサービス（キー不要）
+
+/latest を基準通貨（EUR）で1回だけ取得して全通貨のレート表（ExchangeMatrix）を作り、
+国ごとの表示や任意の通貨ペアの換算はすべてこの表から導出する。
+"""
 from __future__ import annotations
-import time
-from typing import Any
 
-from app.core.http_client import get_http_client
+from array import array
+
+import httpx
+
+from app.core.cache import get_cache
+from app.core.http_client import conditional_get, get_http_client
 
-_cache: dict[str, tuple[Any, float]] = {}
 _TTL = 3600  # 1時間
+_cache = get_cache("exchange", ttl=_TTL, max_entries=256, hard_ttl=6 * 3600)
+
+_MATRIX_KEY = "matrix"
+
+
+def _round_rate(value: float) -> float:
+    """導出したレートを有効数字6桁に丸める（浮動小数点の端数を表示に出さない）。"""
+    return float(f"{value:.6g}")
+
+
+class ExchangeMatrix:
+    """基準通貨に対する全通貨のレートを array('d') で保持し、任意の通貨ペアを導出する"""
+
+    __slots__ = ("date", "currencies", "_index", "_rates")
+
+    def __init__(self, date: str | None, currencies: list[str], rates: array) -> None:
+        self.date = date
+        self.currencies = currencies
+        self._index = {code: i for i, code in enumerate(currencies)}
+        self._rates = rates
+
+    @classmethod
+    def from_payload(cls, raw: dict) -> ExchangeMatrix:
+        """Frankfurter /latest の応答から作る。基準通貨自身は 1.0 として含める。"""
+        base = raw.get("base", "EUR")
+        rates = {base: 1.0, **raw.get("rates", {})}
+        currencies = sorted(rates)
+        return cls(raw.get("date"), currencies, array("d", (rates[c] for c in currencies)))
+
+    @classmethod
+    def from_value(cls, value: dict) -> ExchangeMatrix:
+        return cls(value["date"], value["currencies"], value["rates"])
+
+    def to_value(self) -> dict:
+        """キャッシュ保存用のコンパクトな表現。"""
+        return {"date": self.date, "currencies": self.currencies, "rates": self._rates}
+
+    def __contains__(self, code: str) -> bool:
+        return code in self._index
+
+    def __len__(self) -> int:
+        return len(self.currencies)
+
+    def rate(self, base: str, quote: str) -> float | None:
+        """1 base = 何 quote か。どちらかが未対応なら None。"""
+        i = self._index.get(base)
+        j = self._index.get(quote)
+        if i is None or j is None:
+            return None
+        return _round_rate(self._rates[j] / self._rates[i])
+
+    def convert(self, amount: float, base: str, quote: str) -> float | None:
+        i = self._index.get(base)
+        j = self._index.get(quote)
+        if i is None or j is None:
+            return None
+        return round(amount * self._rates[j] / self._rates[i], 6)
+
+
+# キャッシュ値ごとに組み立て済みの表を使い回す
+_matrix_memo: tuple[dict, ExchangeMatrix] | None = None
+
+
+def _as_matrix(value: dict) -> ExchangeMatrix:
+    global _matrix_memo
+    if _matrix_memo is None or _matrix_memo[0] is not value:
+        _matrix_memo = (value, ExchangeMatrix.from_value(value))
+    return _matrix_memo[1]
+
+
+def _parse_matrix(resp: httpx.Response) -> ExchangeMatrix:
+    resp.raise_for_status()
+    return ExchangeMatrix.from_payload(resp.json())
+
+
+def _unavailable(country_code: str, base: str = "JPY") -> dict:
+    return {"country_code": country_code, "base": base, "rates": [], "date": None, "available": False}
 
 
 class ExchangeService:
@@ -14,68 +97,60 @@ class ExchangeService:
 
     async def get_exchange_info(self, country_code: str, currency_codes: list[str]) -> dict:
         if not currency_codes:
-            return {"country_code": country_code, "base": "JPY", "rates": [], "date": None, "available": False}
+            return _unavailable(country_code)
 
         # JPYが対象通貨の場合は逆方向（1 USD → X JPY）で表示
         non_jpy = [c for c in currency_codes if c != "JPY"]
-        if not non_jpy:
-            return await self._fetch_reverse_jpy(country_code)
-
-        cache_key = f"exchange_{','.join(sorted(non_jpy))}"
-        if cache_key in _cache:
-            data, ts = _cache[cache_key]
-            if time.time() - ts < _TTL:
-                return {**data, "country_code": country_code}
+        found = await self.get_matrix()
+        if found is None:
+            return _unavailable(country_code, "JPY" if non_jpy else "USD")
+        matrix, meta = found
 
-        symbols = ",".join(non_jpy)
-        try:
-            client = get_http_client()
-            resp = await client.get(
-                f"{self.BASE_URL}/latest",
-                params={"base": "JPY", "symbols": symbols},
-            )
-            resp.raise_for_status()
-            raw = resp.json()
-        except Exception:
-            return {"country_code": country_code, "base": "JPY", "rates": [], "date": None, "available": False}
-
-        rates = [{"currency_code": k, "rate": v} for k, v in raw.get("rates", {}).items()]
-        result = {
+        if not non_jpy:
+            usd_jpy = matrix.rate("USD", "JPY")
+            rates = [] if usd_jpy is None else [{"currency_code": "JPY", "rate": usd_jpy}]
+            base = "USD"
+        else:
+            rates = [
+                {"currency_code": c, "rate": matrix.rate("JPY", c)} for c in non_jpy if c in matrix
+            ]
+            base = "JPY"
+        return {
             "country_code": country_code,
-            "base": "JPY",
+            "base": base,
             "rates": rates,
-            "date": raw.get("date"),
+            "date": matrix.date,
             "available": bool(rates),
+            **meta,
         }
-        _cache[cache_key] = (result, time.time())
-        return result
-
-    async def _fetch_reverse_jpy(self, country_code: str) -> dict:
-        """JPYが国の通貨の場合: 1 USD → X JPY で表示"""
-        cache_key = "exchange_USD_to_JPY"
-        if cache_key in _cache:
-            data, ts = _cache[cache_key]
-            if time.time() - ts < _TTL:
-                return {**data, "country_code": country_code}
+
+    async def get_matrix(self) -> tuple[ExchangeMatrix, dict] | None:
+        """レート表と鮮度メタデータを返す。取得できなければ None。"""
+        cv = await _cache.fetch_entry(_MATRIX_KEY, self._fetch_matrix)
+        if cv is None:
+            return None
+        return _as_matrix(cv.value), cv.meta()
+
+    async def prefetch(self, currencies_by_country: dict[str, list[str]]) -> None:
+        """複数国分の表示に先立ってレート表を読み込む（全通貨が1回の取得で揃う）。"""
+        if any(currencies_by_country.values()):
+            await self.get_matrix()
+
+    async def refresh_cached(self) -> int:
+        """レート表を再取得する（スケジューラ用）。"""
+        value = await _cache.refresh(_MATRIX_KEY, self._fetch_matrix)
+        if value is None:
+            raise RuntimeError("為替レートを取得できませんでした")
+        return len(value["currencies"])
+
+    async def _fetch_matrix(self) -> dict | None:
+        """全通貨のレートを1回で取得する。未更新（304）なら前回の表を使う。失敗時は None。"""
         try:
-            client = get_http_client()
-            resp = await client.get(
-                f"{self.BASE_URL}/latest",
-                params={"base": "USD", "symbols": "JPY"},
+            matrix = await conditional_get(
+                get_http_client(), f"{self.BASE_URL}/latest", _parse_matrix
             )
-            resp.raise_for_status()
-            raw = resp.json()
-            jpy_rate = raw.get("rates", {}).get("JPY")
-            if jpy_rate is None:
-                return {"country_code": country_code, "base": "USD", "rates": [], "date": None, "available": False}
-            result = {
-                "country_code": country_code,
-                "base": "USD",
-                "rates": [{"currency_code": "JPY", "rate": jpy_rate}],
-                "date": raw.get("date"),
-                "available": True,
-            }
-            _cache[cache_key] = (result, time.time())
-            return result
         except Exception:
-            return {"country_code": country_code, "base": "USD", "rates": [], "date": None, "available": False}
+            return None
+        if len(matrix) <= 1:
+            return None
+        return matrix.to_value()
@@ -0,0 +1,173 @@
+"""為替レートの日次履歴ストア
+
+Frankfurter の時系列 API（/{開始日}..）から対EURの日次レートを取り込み、
+日付軸（array('q')、日付の序数）と通貨ごとの array('d') に追記していく。
+前回の最終日より後だけを取得するので、更新1回あたりの転送量は数日分で済む。
+
+- 集計は NumPy で配列のビューに対してまとめて行い、リクエストごとに上流へは行かない
+- 通貨ペアのレートは対EURレートの比から導出する
+- data_dir 設定時は .npz に保存し、再起動後は続きから取り込む
+"""
+from __future__ import annotations
+
+import asyncio
+import os
+import time
+from array import array
+from bisect import bisect_left
+from datetime import date, timedelta
+
+import numpy as np
+
+from app.core.config import settings
+from app.core.http_client import get_http_client
+
+_BASE_URL = "https://api.frankfurter.app"
+_BASE = "EUR"
+
+
+class FxHistory:
+    """日次の対EURレートを通貨ごとの配列で保持する"""
+
+    def __init__(self, max_days: int = 730) -> None:
+        self.max_days = max_days
+        self.days = array("q")  # date.toordinal()
+        self.rates: dict[str, array] = {}  # 日付軸と同じ長さ、欠損は NaN
+        self.path: str | None = None
+        self.updated_at: float | None = None
+        self._lock: asyncio.Lock | None = None
+
+    def __len__(self) -> int:
+        return len(self.days)
+
+    @property
+    def last_day(self) -> date | None:
+        return date.fromordinal(self.days[-1]) if self.days else None
+
+    def append(self, payload: dict) -> int:
+        """時系列 API の応答を取り込み、追加した日数を返す（取り込み済みの日は無視）。"""
+        last = self.days[-1] if self.days else 0
+        added = 0
+        for day_str in sorted(payload.get("rates", {})):
+            ordinal = date.fromisoformat(day_str).toordinal()
+            if ordinal <= last:
+                continue
+            day_rates = {**payload["rates"][day_str], _BASE: 1.0}
+            for code in day_rates.keys() - self.rates.keys():
+                # 新しい通貨はそれまでの日を欠損として埋める
+                self.rates[code] = array("d", [float("nan")]) * len(self.days)
+            self.days.append(ordinal)
+            for code, values in self.rates.items():
+                values.append(float(day_rates.get(code, float("nan"))))
+            last = ordinal
+            added += 1
+        self._trim()
+        return added
+
+    def _trim(self) -> None:
+        if not self.days:
+            return
+        start = bisect_left(self.days, self.days[-1] - self.max_days + 1)
+        if start > 0:
+            del self.days[:start]
+            for values in self.rates.values():
+                del values[:start]
+
+    def window(self, base: str, quote: str, days: int) -> tuple[np.ndarray, np.ndarray] | None:
+        """直近 days 日の (日付序数, 1 base あたりの quote) を欠損を除いて返す。"""
+        if not self.days or base not in self.rates or quote not in self.rates:
+            return None
+        start = bisect_left(self.days, self.days[-1] - days + 1)
+        # array はバッファを共有するのでコピーせずにビューを作れる
+        b = np.frombuffer(self.rates[base], dtype=np.float64)[start:]
+        q = np.frombuffer(self.rates[quote], dtype=np.float64)[start:]
+        ordinals = np.frombuffer(self.days, dtype=np.int64)[start:]
+        values = q / b
+        mask = ~np.isnan(values)
+        return ordinals[mask], values[mask]
+
+    def summary(self, base: str, quote: str, days: int) -> dict | None:
+        """期間内の最小・最大・平均と、最新レートのパーセンタイル・変化率を返す。"""
+        found = self.window(base, quote, days)
+        if found is None or len(found[1]) == 0:
+            return None
+        ordinals, values = found
+        latest = values[-1]
+        return {
+            "currency_code": quote,
+            "latest": _round(latest),
+            "min": _round(values.min()),
+            "max": _round(values.max()),
+            "mean": _round(values.mean()),
+            # 期間内で最新レート以下だった日の割合（高いほど base 側が強い）
+            "percentile": round(float(np.count_nonzero(values <= latest) / len(values) * 100), 1),
+            "change_pct": round(float((latest / values[0] - 1) * 100), 2),
+            "samples": int(len(values)),
+            "start_date": date.fromordinal(int(ordinals[0])).isoformat(),
+            "end_date": date.fromordinal(int(ordinals[-1])).isoformat(),
+        }
+
+    # ── 取り込み ─────────────────────────────────────────────
+
+    async def update(self) -> int:
+        """前回の最終日以降の日次レートを取得して追記する。追加した日数を返す。"""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            today = date.today()
+            last = self.last_day
+            start = last + timedelta(days=1) if last else today - timedelta(days=self.max_days)
+            if start > today:
+                return 0
+            resp = await get_http_client().get(f"{_BASE_URL}/{start.isoformat()}..")
+            if resp.status_code == 404:
+                return 0  # 休日などで新しい営業日がない
+            resp.raise_for_status()
+            added = self.append(resp.json())
+            self.updated_at = time.time()
+            if added and self.path:
+                await asyncio.to_thread(self.save, self.path)
+            return added
+
+    # ── 永続化 ───────────────────────────────────────────────
+
+    def save(self, path: str) -> None:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        codes = sorted(self.rates)
+        matrix = np.array([np.frombuffer(self.rates[c], dtype=np.float64) for c in codes])
+        tmp = f"{path}.tmp.npz"
+        np.savez_compressed(
+            tmp,
+            days=np.frombuffer(self.days, dtype=np.int64),
+            codes=np.array(codes),
+            rates=matrix.reshape(len(codes), len(self.days)),
+        )
+        os.replace(tmp, path)
+
+    def load(self, path: str) -> None:
+        """保存済みの履歴を読み込み、以降の保存先にする（ファイルがなければ空のまま）。"""
+        self.path = path
+        if not os.path.exists(path):
+            return
+        with np.load(path) as data:
+            self.days = _to_array("q", data["days"].astype(np.int64))
+            self.rates = {
+                str(code): _to_array("d", row.astype(np.float64))
+                for code, row in zip(data["codes"], data["rates"])
+            }
+        self._trim()
+
+
+def _to_array(typecode: str, values: np.ndarray) -> array:
+    result = array(typecode)
+    result.frombytes(values.tobytes())
+    return result
+
+
+def _round(value: float) -> float:
+    return float(f"{float(value):.6g}")
+
+
+fx_history = FxHistory(max_days=settings.fx_history_days)
@@ -1,49 +1,69 @@
 """ニュース取得サービス（Google News RSS 利用、APIキー不要）"""
 from __future__ import annotations
 import re
-import time
 import xml.etree.ElementTree as ET
-from typing import Any
 
+import httpx
+
+from app.core.cache import get_cache
 from app.core.config import settings
-from app.core.http_client import get_http_client
+from app.core.http_client import conditional_get, get_http_client
+from app.core.parse_pool import run_parse
 
 _GNEWS_BASE = "https://gnews.io/api/v4"
 _GOOGLE_NEWS_RSS = "https://news.google.com/rss/search"
 
 # インメモリキャッシュ（ニュースは1時間で更新）
-_news_cache: dict[str, tuple[Any, float]] = {}
 _NEWS_CACHE_TTL_HOURS = 1
-
-
-def _is_expired(ts: float) -> bool:
-    return time.time() - ts > _NEWS_CACHE_TTL_HOURS * 3600
+_news_cache = get_cache(
+    "gnews",
+    ttl=_NEWS_CACHE_TTL_HOURS * 3600,
+    max_entries=512,
+    max_bytes=8 * 1024 * 1024,
+    hard_ttl=6 * 3600,
+    shared=True,
+)
 
 
 class GNewsService:
     async def get_news(self, country_code: str, country_name: str, max_results: int = 10) -> dict:
         """国のニュースを取得する。GNews APIキーがあればそちらを優先、なければGoogle News RSSを使用。"""
-        cache_key = country_code.upper()
-        if cache_key in _news_cache:
-            data, ts = _news_cache[cache_key]
-            if not _is_expired(ts):
-                return data
+        cv = await _news_cache.fetch_entry(
+            country_code.upper(),
+            lambda: self._fetch_news(country_code, country_name, max_results),
+        )
+        if cv is None:
+            # 全ての取得元が失敗し前回値もない: キャッシュせずに空で返す
+            return {"country_code": country_code.upper(), "articles": [], "total": 0}
+        return {**cv.value, **cv.meta()}
+
+    async def refresh(self, country_code: str, country_name: str, max_results: int = 10) -> dict:
+        """鮮度に関わらず再取得してキャッシュを更新する（スケジューラ用）。"""
+        return await _news_cache.refresh(
+            country_code.upper(),
+            lambda: self._fetch_news(country_code, country_name, max_results),
+        )
 
+    async def _fetch_news(
+        self, country_code: str, country_name: str, max_results: int
+    ) -> dict | None:
+        """全ての取得元が失敗した場合は None（前回のキャッシュを残す）。"""
         if settings.gnews_api_key:
             articles = await self._fetch_from_gnews(country_name, max_results)
         else:
             articles = await self._fetch_from_google_rss(country_code, country_name, max_results)
+        if articles is None:
+            return None
 
-        result = {
+        return {
             "country_code": country_code.upper(),
             "articles": articles,
             "total": len(articles),
         }
-        _news_cache[cache_key] = (result, time.time())
-        return result
 
-    async def _fetch_from_gnews(self, country_name: str, max_results: int) -> list[dict]:
-        """GNews APIからニュース記事を取得する。"""
+    async def _fetch_from_gnews(self, country_name: str, max_results: int) -> list[dict] | None:
+        """GNews APIからニュース記事を取得する。全ての言語で失敗した場合は None。"""
+        succeeded = False
         for lang in ("ja", "en"):
             try:
                 client = get_http_client()
@@ -61,18 +81,19 @@ class GNewsService:
                     break
                 resp.raise_for_status()
                 data = resp.json()
+                succeeded = True
                 raw_articles = data.get("articles", [])
                 if raw_articles:
                     return [_parse_gnews_article(a) for a in raw_articles]
             except Exception:
                 continue
-        return []
+        return [] if succeeded else None
 
     async def _fetch_from_google_rss(
         self, country_code: str, country_name: str, max_results: int
-    ) -> list[dict]:
-        """Google News RSSからニュースを取得する（APIキー不要）。"""
-        articles: list[dict] = []
+    ) -> list[dict] | None:
+        """Google News RSSからニュースを取得する（APIキー不要）。全てのクエリが失敗した場合は None。"""
+        articles: list[dict] | None = None
 
         # 日本語ニュースを試みる（国コードに基づいて言語を設定）
         query_sets = [
@@ -83,34 +104,37 @@ class GNewsService:
         for query, hl_lang, gl_country in query_sets:
             try:
                 fetched = await self._fetch_rss(query, hl_lang, gl_country, max_results)
-                if fetched:
-                    articles = fetched
-                    break
             except Exception:
                 continue
+            articles = fetched
+            if fetched:
+                break
 
-        return articles[:max_results]
+        return articles[:max_results] if articles is not None else None
 
     async def _fetch_rss(
         self, query: str, hl: str, gl: str, limit: int
     ) -> list[dict]:
         ceid = f"{gl}:{hl}"
-        client = get_http_client()
-        resp = await client.get(
+        # 未更新（304）なら前回の解析結果を使うため、件数で切らずに全件を解析しておく
+        articles = await conditional_get(
+            get_http_client(),
             _GOOGLE_NEWS_RSS,
+            _parse_rss_response,
             params={"q": query, "hl": hl, "gl": gl, "ceid": ceid},
             headers={"User-Agent": "Mozilla/5.0 (compatible; TravelApp/1.0)"},
         )
-        resp.raise_for_status()
-        return _parse_rss(resp.text, limit)
+        return articles[:limit]
 
 
-def _parse_rss(xml_text: str, limit: int) -> list[dict]:
-    """Google News RSS XMLを解析して記事リストに変換する。"""
-    try:
-        root = ET.fromstring(xml_text)
-    except ET.ParseError:
-        return []
+async def _parse_rss_response(resp: httpx.Response) -> list[dict]:
+    resp.raise_for_status()
+    return await run_parse(_parse_rss, resp.text)
+
+
+def _parse_rss(xml_text: str, limit: int | None = None) -> list[dict]:
+    """Google News RSS XMLを解析して記事リストに変換する。壊れた XML は ParseError を送出する。"""
+    root = ET.fromstring(xml_text)
 
     channel = root.find("channel")
     if channel is None:
@@ -1,17 +1,18 @@
 """UNESCO 世界遺産サービス（Wikipedia Category API 利用・APIキー不要）"""
 from __future__ import annotations
-import time
-from typing import Any
 
+from app.core.cache import get_cache
 from app.core.config import settings
 from app.core.http_client import get_http_client
 
 # インメモリキャッシュ（24時間）
-_heritage_cache: dict[str, tuple[Any, float]] = {}
-
-
-def _is_expired(ts: float) -> bool:
-    return time.time() - ts > settings.cache_ttl_hours * 3600
+_heritage_cache = get_cache(
+    "heritage",
+    ttl=settings.cache_ttl_hours * 3600,
+    max_entries=512,
+    hard_ttl=7 * 24 * 3600,
+    persist=True,
+)
 
 
 class HeritageService:
@@ -105,16 +106,18 @@ class HeritageService:
     ) -> list[dict]:
         """国コードと国名から Wikipedia を使い UNESCO 世界遺産一覧を取得する。"""
         iso = country_code.upper()
-        cache_key = f"heritage_{iso}"
-        if cache_key in _heritage_cache:
-            data, ts = _heritage_cache[cache_key]
-            if not _is_expired(ts):
-                return data
-
         if not country_name:
-            _heritage_cache[cache_key] = ([], time.time())
             return []
 
+        try:
+            return await _heritage_cache.get_or_fetch(
+                f"heritage_{iso}", lambda: self._fetch_sites(country_name)
+            )
+        except Exception:
+            return []
+
+    async def _fetch_sites(self, country_name: str) -> list[dict]:
+        """カテゴリ検索 → ページ詳細取得。通信エラーは呼び出し元へ送出する。"""
         # "the" が必要な国名を処理（United States, United Kingdom など）
         name = country_name
         candidates = [
@@ -122,21 +125,14 @@ class HeritageService:
             f"World Heritage Sites in the {name}",
         ]
 
-        try:
-            client = get_http_client()
-            titles: list[str] = []
-            for cat in candidates:
-                titles = await self._get_category_members(cat, client)
-                if titles:
-                    break
-
-            if not titles:
-                _heritage_cache[cache_key] = ([], time.time())
-                return []
-
-            sites = await self._get_page_details(titles, client)
-            _heritage_cache[cache_key] = (sites, time.time())
-            return sites
+        client = get_http_client()
+        titles: list[str] = []
+        for cat in candidates:
+            titles = await self._get_category_members(cat, client)
+            if titles:
+                break
 
-        except Exception:
+        if not titles:
             return []
+
+        return await self._get_page_details(titles, client)
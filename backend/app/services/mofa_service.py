@@ -5,10 +5,14 @@ URL: https://www.ezairyu.mofa.go.jp/opendata/country/{4桁電話コード}A.xml
 from __future__ import annotations
 
 import re
-import time
 import xml.etree.ElementTree as ET
 
-from app.core.http_client import get_http_client
+import httpx
+
+from app.core.cache import get_cache
+from app.core.http_client import conditional_get, get_http_client
+from app.core.parse_pool import run_parse
+from app.services.safety_history import mofa_snapshot, safety_history
 
 # 危険レベルラベル
 LEVEL_LABELS = {
@@ -94,13 +98,20 @@ ISO_TO_MOFA_XML: dict[str, str] = {
 MOFA_XML_BASE_URL = "https://www.ezairyu.mofa.go.jp/opendata/country/{code}A.xml"
 CACHE_TTL = 6 * 3600  # 6時間
 
-_cache: dict[str, tuple[dict, float]] = {}
+STALE_TTL = 24 * 3600  # 再取得失敗時も24時間までは前回値を返す
 
+_cache = get_cache(
+    "mofa",
+    ttl=CACHE_TTL,
+    max_entries=512,
+    hard_ttl=STALE_TTL,
+    persist=True,
+    shared=True,
+)
 
-def _get_text(root: ET.Element, tag: str) -> str:
-    """XMLタグのテキストを安全に取得する"""
-    el = root.find(tag)
-    return el.text.strip() if el is not None and el.text else ""
+FAILURE_TTL = 5 * 60  # 取得に失敗した国は5分間、上流へ取りに行かない
+# 取得失敗の記録（前回値のない国への再試行を短時間抑える）
+_failures = get_cache("mofa_failures", ttl=FAILURE_TTL, max_entries=512)
 
 
 # 全角→半角数字変換テーブル
@@ -159,29 +170,113 @@ def _parse_regional_risks(text: str) -> list[dict]:
     return results
 
 
+# ルート直下で参照するタグ（ElementTree.find と同じく最初の出現のみ使う）
+_ROOT_TAGS = frozenset({
+    "riskLevel1", "riskLevel2", "riskLevel3", "riskLevel4",
+    "infectionLevel1", "infectionLevel2", "infectionLevel3", "infectionLevel4",
+    "riskTitle", "riskLead", "riskUrl", "safetyMeasureUrl", "riskSubText", "riskMapUrl",
+})
+_SPOT_TAGS = ("typeCd", "title", "lead")
+_MAIL_TAGS = ("title", "lead", "leaveDate")
+# details は最大8件なので、重複を除いた広域情報は8件あれば足りる
+_MAX_SPOTS = 8
+_MAX_MAILS = 6
+# パーサーへ一度に渡すバイト数
+_FEED_CHUNK = 16 * 1024
+
+
+def _child_texts(elem: ET.Element, tags: tuple[str, ...]) -> dict[str, str]:
+    """直下の子要素のうち指定タグの最初のテキストを返す（strip 済み）。"""
+    texts: dict[str, str] = {}
+    for child in elem:
+        if child.tag in tags and child.tag not in texts:
+            texts[child.tag] = child.text.strip() if child.text else ""
+    return texts
+
+
+def _scan_xml(xml_bytes: bytes) -> tuple[dict[str, str], list[dict], list[dict]]:
+    """XMLを1回だけ走査し、(ルート直下の値, 広域情報, 領事メール) を返す。
+
+    入力を少しずつパーサーへ渡し、必要な値がそろった時点で読み込みを打ち切る。
+    処理済みの要素は順次解放し、ツリー全体を保持しない。
+    """
+    fields: dict[str, str] = {}
+    spots: list[dict] = []
+    spot_titles: set[str] = set()
+    mails: list[dict] = []
+    root: ET.Element | None = None
+    depth = 0
+    open_items = 0  # 子要素の値をまだ読む wideareaSpot / mail の数
+    n_root_tags = len(_ROOT_TAGS)
+
+    parser = ET.XMLPullParser(events=("start", "end"))
+    view = memoryview(xml_bytes)
+    for offset in [*range(0, len(view), _FEED_CHUNK), None]:
+        if offset is None:
+            parser.close()  # 不完全な文書はここで ParseError
+        else:
+            parser.feed(view[offset:offset + _FEED_CHUNK])
+        for event, elem in parser.read_events():
+            if event == "start":
+                depth += 1
+                if root is None:
+                    root = elem
+                elif elem.tag == "wideareaSpot" or elem.tag == "mail":
+                    open_items += 1
+                continue
+
+            depth -= 1
+            tag = elem.tag
+            collected = False
+            if depth == 1 and tag in _ROOT_TAGS and tag not in fields:
+                fields[tag] = elem.text.strip() if elem.text else ""
+                collected = True
+            if tag == "wideareaSpot":
+                open_items -= 1
+                if len(spots) < _MAX_SPOTS:
+                    spot = _child_texts(elem, _SPOT_TAGS)
+                    title = spot.get("title", "")
+                    if title and title not in spot_titles:
+                        spot_titles.add(title)
+                        spots.append(spot)
+                        collected = True
+            elif tag == "mail":
+                open_items -= 1
+                if len(mails) < _MAX_MAILS:
+                    mails.append(_child_texts(elem, _MAIL_TAGS))
+                    collected = True
+
+            if open_items == 0 and depth > 0:
+                elem.clear()
+                if depth == 1:
+                    del root[:]
+            if (
+                collected
+                and len(fields) == n_root_tags
+                and len(spots) >= _MAX_SPOTS
+                and len(mails) >= _MAX_MAILS
+            ):
+                return fields, spots, mails
+    return fields, spots, mails
+
+
 def _parse_xml(xml_bytes: bytes) -> dict:
-    """外務省XMLオープンデータから安全情報を詳細に抽出する。"""
-    try:
-        root = ET.fromstring(xml_bytes)
-    except ET.ParseError:
-        return {
-            "level": 1, "summary": LEVEL_SUMMARIES[1],
-            "details": [], "mofa_url": None,
-            "infection_level": 0, "safety_measure_url": None,
-            "regional_risks": [],
-        }
+    """外務省XMLオープンデータから安全情報を詳細に抽出する。
+
+    途中で切れた文書などは ET.ParseError を送出する（呼び出し側で前回値を使う）。
+    """
+    fields, spots, mails = _scan_xml(xml_bytes)
 
     # --- 危険レベル ---
     level = 0
     for lvl in [4, 3, 2, 1]:
-        el = root.find(f"riskLevel{lvl}")
-        if el is not None and (el.text or "").strip() == "1":
+        if fields.get(f"riskLevel{lvl}") == "1":
             level = lvl
             break
 
     # --- サマリー ---
-    title = _get_text(root, "riskTitle")
-    lead = _get_text(root, "riskLead")
+    title = fields.get("riskTitle", "")
+    lead = fields.get("riskLead", "")
     parts = []
     if title:
         parts.append(title)
@@ -190,16 +285,15 @@ def _parse_xml(xml_bytes: bytes) -> dict:
     summary = "。".join(parts) if parts else LEVEL_SUMMARIES[level]
 
     # --- 外務省ページURL ---
-    mofa_url = _get_text(root, "riskUrl") or None
+    mofa_url = fields.get("riskUrl") or None
 
     # --- 安全対策ページURL ---
-    safety_measure_url = _get_text(root, "safetyMeasureUrl") or None
+    safety_measure_url = fields.get("safetyMeasureUrl") or None
 
     # --- 感染症レベル ---
     infection_level = 0
     for lvl in [4, 3, 2, 1]:
-        el = root.find(f"infectionLevel{lvl}")
-        if el is not None and (el.text or "").strip() == "1":
+        if fields.get(f"infectionLevel{lvl}") == "1":
             infection_level = lvl
             break
 
@@ -223,16 +317,13 @@ def _parse_xml(xml_bytes: bytes) -> dict:
             "severity": _level_to_severity(infection_level),
         })
 
-    # 広域情報（テロ・感染症等）― タイトル重複を排除
+    # 広域情報（テロ・感染症等）― タイトル重複は走査時に排除済み
     seen_titles: set[str] = set()
-    for spot in root.findall(".//wideareaSpot"):
-        type_cd = _get_text(spot, "typeCd")
-        spot_title = _get_text(spot, "title")
-        spot_lead = _get_text(spot, "lead")
-        if not spot_title or spot_title in seen_titles:
-            continue
+    for spot in spots:
+        spot_title = spot["title"]
+        spot_lead = spot.get("lead", "")
         seen_titles.add(spot_title)
-        category = WIDEAREA_CATEGORIES.get(type_cd, "広域情報")
+        category = WIDEAREA_CATEGORIES.get(spot.get("typeCd", ""), "広域情報")
         desc = spot_title
         if spot_lead:
             # Calculate remaining space for lead text to ensure total <= 1500 chars
@@ -248,11 +339,10 @@ def _parse_xml(xml_bytes: bytes) -> dict:
             break
 
     # 領事メール（最新3件）― タイトル重複を排除
-    mails = root.findall(".//mail")
-    for mail in mails[:6]:
-        mail_title = _get_text(mail, "title")
-        mail_lead = _get_text(mail, "lead")
-        mail_date = _get_text(mail, "leaveDate")
+    for mail in mails:
+        mail_title = mail.get("title", "")
+        mail_lead = mail.get("lead", "")
+        mail_date = mail.get("leaveDate", "")
         if not mail_title or mail_title in seen_titles:
             continue
         seen_titles.add(mail_title)
@@ -282,11 +372,11 @@ def _parse_xml(xml_bytes: bytes) -> dict:
         })
 
     # --- 地域別危険度 ---
-    risk_sub_text = _get_text(root, "riskSubText")
+    risk_sub_text = fields.get("riskSubText", "")
     regional_risks = _parse_regional_risks(risk_sub_text) if risk_sub_text else []
 
     # --- 危険度マップURL ---
-    risk_map_url = _get_text(root, "riskMapUrl") or None
+    risk_map_url = fields.get("riskMapUrl") or None
 
     return {
         "level": level,
@@ -300,16 +390,19 @@ def _parse_xml(xml_bytes: bytes) -> dict:
     }
 
 
-async def _fetch_xml(mofa_code: str) -> bytes | None:
-    """外務省XMLオープンデータを取得する。HTMLが返った場合はNone（安全国）。"""
-    url = MOFA_XML_BASE_URL.format(code=mofa_code)
-    client = get_http_client()
-    resp = await client.get(url)
+async def _parse_response(resp: httpx.Response) -> dict | None:
+    """外務省XMLの応答を解析する。HTMLが返った場合は None（XMLを取得できていない）。"""
     resp.raise_for_status()
     content_type = resp.headers.get("content-type", "")
     if "text/html" in content_type:
         return None  # XMLなし → 安全国
-    return resp.content
+    return await run_parse(_parse_xml, resp.content)
+
+
+async def _fetch_xml(mofa_code: str) -> dict | None:
+    """外務省XMLオープンデータを取得して解析する。未更新（304）なら前回の解析結果を返す。"""
+    url = MOFA_XML_BASE_URL.format(code=mofa_code)
+    return await conditional_get(get_http_client(), url, _parse_response)
 
 
 class MofaSafetyService:
@@ -317,41 +410,65 @@ class MofaSafetyService:
 
     async def get_safety_info(self, country_code: str) -> dict:
         code = country_code.upper()
-        now = time.monotonic()
+        if code in _failures:
+            return _unavailable(code)
+        try:
+            cv = await _cache.fetch_entry(code, lambda: self._fetch(code))
+        except Exception:
+            # 取得失敗かつ前回値なし: 短時間だけ失敗を覚え、取得できていないことを示して返す
+            _failures.set(code, True)
+            return _unavailable(code)
+        return {**cv.value, **cv.meta()}
+
+    async def refresh(self, country_code: str) -> dict:
+        """鮮度に関わらず再取得してキャッシュを更新する（スケジューラ用）。"""
+        code = country_code.upper()
+        return await _cache.refresh(code, lambda: self._fetch(code))
+
+    async def prefetch(self, country_codes: list[str]) -> None:
+        """共有キャッシュ等にある分をまとめてメモリへ読み戻す（上流へはアクセスしない）。"""
+        await _cache.get_many([c.upper() for c in country_codes])
 
-        if code in _cache:
-            cached_data, cached_at = _cache[code]
-            if now - cached_at < CACHE_TTL:
-                return cached_data
+    async def get_cached_levels(self, country_codes: list[str]) -> dict[str, int]:
+        """キャッシュ済みで鮮度内の危険レベルだけを一括で返す（上流へはアクセスしない）。"""
+        found = await _cache.get_many([c.upper() for c in country_codes])
+        return {code: cv.value.get("level") for code, cv in found.items() if not cv.stale}
 
+    async def _fetch(self, code: str) -> dict:
+        """外務省XMLを取得して解析し、前回からの変化を履歴に記録する。
+
+        通信・解析に失敗した場合は例外を送出する（履歴に記録もキャッシュもせず、前回値を残す）。
+        """
         mofa_code = ISO_TO_MOFA_XML.get(code)
         if mofa_code is None:
-            result = _build_response(code, 0, LEVEL_SUMMARIES[0])
-        else:
-            try:
-                xml_bytes = await _fetch_xml(mofa_code)
-                if xml_bytes is None:
-                    result = _build_response(code, 0, LEVEL_SUMMARIES[0])
-                else:
-                    parsed = _parse_xml(xml_bytes)
-                    result = {
-                        "country_code": code,
-                        "level": parsed["level"],
-                        "level_label": LEVEL_LABELS.get(parsed["level"], "不明"),
-                        "summary": parsed["summary"],
-                        "details": parsed["details"],
-                        "last_updated": None,
-                        "mofa_url": parsed["mofa_url"],
-                        "infection_level": parsed["infection_level"],
-                        "safety_measure_url": parsed["safety_measure_url"],
-                    }
-            except Exception:
-                result = _build_response(code, 1, LEVEL_SUMMARIES[1])
-
-        _cache[code] = (result, now)
+            # 外務省の対象外の国（観測値ではないので履歴には記録しない）
+            return _build_response(code, 0, LEVEL_SUMMARIES[0])
+
+        parsed = await _fetch_xml(mofa_code)
+        if parsed is None:
+            raise RuntimeError(f"外務省XMLを取得できませんでした: {code}")
+        result = {
+            "country_code": code,
+            "level": parsed["level"],
+            "level_label": LEVEL_LABELS.get(parsed["level"], "不明"),
+            "summary": parsed["summary"],
+            "details": parsed["details"],
+            "last_updated": None,
+            "mofa_url": parsed["mofa_url"],
+            "infection_level": parsed["infection_level"],
+            "safety_measure_url": parsed["safety_measure_url"],
+            "regional_risks": parsed["regional_risks"],
+            "risk_map_url": parsed["risk_map_url"],
+        }
+        safety_history.observe("mofa", code, mofa_snapshot(result))
         return result
 
 
+def _unavailable(code: str) -> dict:
+    """取得できなかった国の応答（レベルは暫定の 1、available=False）。"""
+    return {**_build_response(code, 1, "外務省の安全情報を取得できませんでした"), "available": False}
+
+
 def _build_response(code: str, level: int, summary: str) -> dict:
     """SafetyInfoレスポンス辞書を構築する（フォールバック用）"""
     details = [
@@ -1,16 +1,25 @@
 """GNews API + Google News RSS フォールバック ニュースサービス"""
 from __future__ import annotations
 import asyncio
-import time
 import xml.etree.ElementTree as ET
-from typing import Any
 from urllib.parse import quote
 
+import httpx
+
+from app.core.cache import get_cache
 from app.core.config import settings
-from app.core.http_client import get_http_client
+from app.core.http_client import conditional_get, get_http_client
+from app.core.parse_pool import run_parse
 
 # インメモリキャッシュ（30分）
-_news_cache: dict[str, tuple[Any, float]] = {}
+_news_cache = get_cache(
+    "news",
+    ttl=settings.news_cache_ttl_minutes * 60,
+    max_entries=512,
+    max_bytes=8 * 1024 * 1024,
+    hard_ttl=6 * 3600,
+    shared=True,
+)
 
 # 安全・治安・犯罪・情勢関連キーワード（クエリ絞り込み + 二次フィルタで使用）
 _SAFETY_KEYWORDS_EN = [
@@ -32,10 +41,6 @@ _SAFETY_KEYWORDS_JA = [
 ]
 
 
-def _is_expired(ts: float) -> bool:
-    return time.time() - ts > settings.news_cache_ttl_minutes * 60
-
-
 class NewsService:
     GNEWS_URL = "https://gnews.io/api/v4/search"
     RSS_URL = "https://news.google.com/rss/search"
@@ -48,16 +53,25 @@ class NewsService:
 
     async def get_news(self, country_code: str, country_name: str, max_results: int = 10) -> dict:
         """国の治安・犯罪・情勢ニュースを取得する。GNews API → Google News RSS の順でフォールバック。"""
-        cache_key = f"news_{country_code.upper()}"
-        if cache_key in _news_cache:
-            data, ts = _news_cache[cache_key]
-            if not _is_expired(ts):
-                return data
-
+        cv = await _news_cache.fetch_entry(
+            f"news_{country_code.upper()}",
+            lambda: self._fetch_news(country_code, country_name, max_results),
+        )
+        if cv is None:
+            # 全ての取得元が失敗し前回値もない: キャッシュせずに空で返す
+            return {"country_code": country_code.upper(), "articles": [], "total": 0}
+        return {**cv.value, **cv.meta()}
+
+    async def _fetch_news(
+        self, country_code: str, country_name: str, max_results: int
+    ) -> dict | None:
+        """全ての取得元が失敗した場合は None（前回のキャッシュを残す）。"""
         articles: list[dict] = []
+        attempted = failed = 0
 
         # GNews API（APIキーあり）: 英語・日本語を並行取得してマージ
         if settings.gnews_api_key:
+            attempted += 1
             try:
                 en_articles, ja_articles = await asyncio.gather(
                     self._fetch_from_gnews(country_name, max_results, lang="en"),
@@ -72,14 +86,17 @@ class NewsService:
                         merged.append(a)
                 articles = merged[:max_results]
             except Exception:
-                articles = []
+                failed += 1
 
         # Google News RSS フォールバック（APIキーなし or GNews失敗時）
         if not articles:
+            attempted += 1
             try:
                 articles = await self._fetch_from_google_rss(country_name, max_results)
             except Exception:
-                articles = []
+                failed += 1
+        if failed == attempted:
+            return None
 
         # 二次フィルタ：治安・犯罪・情勢に無関係な記事を除外
         filtered = [
@@ -89,13 +106,11 @@ class NewsService:
         # フィルタ後0件の場合はフォールバック（記事が表示されなくなるのを防ぐ）
         articles = filtered if filtered else articles
 
-        result = {
+        return {
             "country_code": country_code.upper(),
             "articles": articles,
             "total": len(articles),
         }
-        _news_cache[cache_key] = (result, time.time())
-        return result
 
     async def _fetch_from_gnews(self, country_name: str, max_results: int, lang: str = "en") -> list[dict]:
         """GNews API からニュースを取得する。安全キーワードでクエリを絞り込む。"""
@@ -138,30 +153,38 @@ class NewsService:
         query = quote(f'"{country_name}" ({safety_q})')
         url = f"{self.RSS_URL}?q={query}&hl=en&gl=US&ceid=US:en"
 
-        client = get_http_client()
-        resp = await client.get(url)
-        resp.raise_for_status()
+        # 未更新（304）なら前回の解析結果を使うため、件数で切らずに全件を解析しておく
+        articles = await conditional_get(get_http_client(), url, _parse_rss_response)
+        return articles[:max_results]
 
-        root = ET.fromstring(resp.text)
 
-        articles = []
-        for item in root.findall(".//item")[:max_results]:
-            title_el = item.find("title")
-            link_el = item.find("link")
-            source_el = item.find("source")
-            pub_date_el = item.find("pubDate")
-            desc_el = item.find("description")
-
-            title = title_el.text if title_el is not None else ""
-            if not title:
-                continue
+async def _parse_rss_response(resp: httpx.Response) -> list[dict]:
+    resp.raise_for_status()
+    return await run_parse(_parse_rss, resp.text)
 
-            articles.append({
-                "title": title,
-                "description": desc_el.text if desc_el is not None else None,
-                "url": link_el.text if link_el is not None else "",
-                "source": source_el.text if source_el is not None else "Google News",
-                "published_at": pub_date_el.text if pub_date_el is not None else None,
-            })
 
-        return articles
+def _parse_rss(xml_text: str) -> list[dict]:
+    """Google News RSS XMLを記事リストに変換する。"""
+    root = ET.fromstring(xml_text)
+
+    articles = []
+    for item in root.findall(".//item"):
+        title_el = item.find("title")
+        link_el = item.find("link")
+        source_el = item.find("source")
+        pub_date_el = item.find("pubDate")
+        desc_el = item.find("description")
+
+        title = title_el.text if title_el is not None else ""
+        if not title:
+            continue
+
+        articles.append({
+            "title": title,
+            "description": desc_el.text if desc_el is not None else None,
+            "url": link_el.text if link_el is not None else "",
+            "source": source_el.text if source_el is not None else "Google News",
+            "published_at": pub_date_el.text if pub_date_el is not None else None,
+        })
+
+    return articles
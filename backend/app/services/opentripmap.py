@@ -1,20 +1,21 @@
 """OpenTripMap API 連携サービス"""
 from __future__ import annotations
-import time
-from typing import Any
 
 import httpx
 
+from app.core.cache import get_cache
 from app.core.config import settings
 
 _OTM_BASE = "https://api.opentripmap.com/0.1/en/places"
 
 # インメモリキャッシュ
-_otm_cache: dict[str, tuple[Any, float]] = {}
-
-
-def _is_expired(ts: float) -> bool:
-    return time.time() - ts > settings.cache_ttl_hours * 3600
+_otm_cache = get_cache(
+    "otm_radius",
+    ttl=settings.cache_ttl_hours * 3600,
+    max_entries=512,
+    hard_ttl=7 * 24 * 3600,
+    persist=True,
+)
 
 
 class OpenTripMapService:
@@ -31,17 +32,12 @@ class OpenTripMapService:
         if latitude is None or longitude is None:
             return []
 
-        cache_key = f"otm_{country_code.upper()}"
-        if cache_key in _otm_cache:
-            data, ts = _otm_cache[cache_key]
-            if not _is_expired(ts):
-                return data
+        async def _fetch() -> list[dict]:
+            spots = await self._fetch_radius(latitude, longitude, limit)
+            return await self._enrich_spots(spots[:limit])
 
         try:
-            spots = await self._fetch_radius(latitude, longitude, limit)
-            enriched = await self._enrich_spots(spots[:limit])
-            _otm_cache[cache_key] = (enriched, time.time())
-            return enriched
+            return await _otm_cache.get_or_fetch(f"otm_{country_code.upper()}", _fetch)
         except Exception:
             return []
 
@@ -1,13 +1,18 @@
 """OpenTripMap API 連携サービス"""
 from __future__ import annotations
-import time
-from typing import Any
 
+from app.core.cache import get_cache
 from app.core.config import settings
 from app.core.http_client import get_http_client
 
 # インメモリキャッシュ（24時間）
-_otm_cache: dict[str, tuple[Any, float]] = {}
+_otm_cache = get_cache(
+    "otm",
+    ttl=settings.cache_ttl_hours * 3600,
+    max_entries=512,
+    hard_ttl=7 * 24 * 3600,
+    persist=True,
+)
 
 # 主要国の首都・主要都市座標（国コード → (lat, lon)）
 # RestCountries の国中心座標より著名な観光地に近い都市を優先
@@ -47,10 +52,6 @@ _CAPITAL_COORDS: dict[str, tuple[float, float]] = {
 }
 
 
-def _is_expired(ts: float) -> bool:
-    return time.time() - ts > settings.cache_ttl_hours * 3600
-
-
 class OpenTripMapService:
     BASE_URL = "https://api.opentripmap.com/0.1/en"
 
@@ -61,54 +62,54 @@ class OpenTripMapService:
         if not settings.otm_api_key:
             return []
 
-        cache_key = f"otm_{country_code.upper()}"
-        if cache_key in _otm_cache:
-            data, ts = _otm_cache[cache_key]
-            if not _is_expired(ts):
-                return data
-
         # 首都・主要都市の座標があればそちらを優先
         search_lat, search_lon = _CAPITAL_COORDS.get(country_code.upper(), (lat, lon))
 
         try:
-            client = get_http_client()
-            resp = await client.get(
-                f"{self.BASE_URL}/places/radius",
-                params={
-                    "radius": 300000,  # 300km
-                    "lon": search_lon,
-                    "lat": search_lat,
-                    "kinds": "cultural,historic,natural,architecture,religion",
-                    "format": "json",
-                    "limit": 30,
-                    "rate": "3h",   # 評価3以上（高評価スポットのみ）
-                    "apikey": settings.otm_api_key,
-                },
+            return await _otm_cache.get_or_fetch(
+                f"otm_{country_code.upper()}",
+                lambda: self._fetch_places(search_lat, search_lon),
             )
-            resp.raise_for_status()
-            raw_places = resp.json()
-
-            seen_names: set[str] = set()
-            attractions = []
-            for place in raw_places:
-                name = place.get("name", "").strip()
-                # 名前がない or 空 or 重複スポットは除外
-                if not name or name in seen_names:
-                    continue
-                seen_names.add(name)
-                attractions.append({
-                    "name": name,
-                    "description": place.get("wikipedia_extracts", {}).get("text") if isinstance(place.get("wikipedia_extracts"), dict) else None,
-                    "category": place.get("kinds", "").split(",")[0] if place.get("kinds") else None,
-                    "latitude": place.get("point", {}).get("lat"),
-                    "longitude": place.get("point", {}).get("lon"),
-                    "rating": place.get("rate"),
-                    "wikipedia_url": place.get("wikipedia"),
-                })
-                if len(attractions) >= 10:
-                    break
-
-            _otm_cache[cache_key] = (attractions, time.time())
-            return attractions
         except Exception:
             return []
+
+    async def _fetch_places(self, search_lat: float, search_lon: float) -> list[dict]:
+        """座標周辺の高評価スポットを最大10件取得する。通信エラーは呼び出し元へ送出する。"""
+        client = get_http_client()
+        resp = await client.get(
+            f"{self.BASE_URL}/places/radius",
+            params={
+                "radius": 300000,  # 300km
+                "lon": search_lon,
+                "lat": search_lat,
+                "kinds": "cultural,historic,natural,architecture,religion",
+                "format": "json",
+                "limit": 30,
+                "rate": "3h",   # 評価3以上（高評価スポットのみ）
+                "apikey": settings.otm_api_key,
+            },
+        )
+        resp.raise_for_status()
+        raw_places = resp.json()
+
+        seen_names: set[str] = set()
+        attractions = []
+        for place in raw_places:
+            name = place.get("name", "").strip()
+            # 名前がない or 空 or 重複スポットは除外
+            if not name or name in seen_names:
+                continue
+            seen_names.add(name)
+            attractions.append({
+                "name": name,
+                "description": place.get("wikipedia_extracts", {}).get("text") if isinstance(place.get("wikipedia_extracts"), dict) else None,
+                "category": place.get("kinds", "").split(",")[0] if place.get("kinds") else None,
+                "latitude": place.get("point", {}).get("lat"),
+                "longitude": place.get("point", {}).get("lon"),
+                "rating": place.get("rate"),
+                "wikipedia_url": place.get("wikipedia"),
+            })
+            if len(attractions) >= 10:
+                break
+
+        return attractions
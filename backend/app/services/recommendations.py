@@ -0,0 +1,170 @@
+"""「M月に行くならどこか」のおすすめ国ランキング
+
+全ての国について月別の特徴量（気温の快適さ・雨・安全レベル・物価の目安）を
+国×月の NumPy 配列にまとめておき、リクエストごとに全ての国を一括でスコアリングして並べる。
+
+- 気候はキャッシュ済みの平年値・平年値グリッドだけを使い、上流へはアクセスしない
+- 入力（国一覧・安全レベル・気候・経済指標のキャッシュ）が変わったときだけ配列を作り直す
+- 物価は一人当たりGDPの順位（0: 最も安い〜1: 最も高い）で近似し、データのない国は除いて重み付けする
+"""
+from __future__ import annotations
+
+import time
+
+import numpy as np
+
+# スコアの重み（データのない項目は除き、残りの重みで正規化する）
+WEIGHTS = {"temperature": 0.35, "rain": 0.2, "safety": 0.3, "price": 0.15}
+_COMFORT_LOW, _COMFORT_HIGH = 18.0, 26.0  # 日平均気温の快適な範囲
+_COMFORT_FALLOFF = 12.0  # 快適な範囲からこれだけ離れるとスコア 0
+_HOT_DAY = 32.0  # 最高気温がこれを超えると暑さで減点
+_RAINY_DAYS_MAX = 20.0  # 雨の日がこれ以上ならスコア 0
+_PRECIPITATION_MAX = 250.0  # 雨の日数がない場合の月降水量の上限
+_MAX_LEVEL = 4
+
+
+class RecommendationMatrix:
+    """国×月の特徴量"""
+
+    def __init__(
+        self,
+        countries: list[dict],
+        climate: np.ndarray,
+        levels: dict[str, int | None],
+        gdp: dict[str, float],
+    ) -> None:
+        self.countries = countries
+        self.regions = np.array([c.get("region") or "" for c in countries])
+        self.temp_max = climate[:, :, 0]
+        self.temp_min = climate[:, :, 1]
+        self.precipitation = climate[:, :, 2]
+        self.rainy_days = climate[:, :, 3]
+        self.level = np.array(
+            [np.nan if levels.get(c["code"]) is None else levels[c["code"]] for c in countries],
+            dtype=np.float32,
+        )
+        gdp_values = np.array([gdp.get(c["code"], np.nan) for c in countries], dtype=np.float64)
+        self.price_level = _rank(gdp_values)
+        self.comfort = _comfort(self.temp_max, self.temp_min)
+        self.dryness = _dryness(self.precipitation, self.rainy_days)
+        self.built_at = time.time()
+
+    def __len__(self) -> int:
+        return len(self.countries)
+
+    @property
+    def climate_coverage(self) -> int:
+        """気候データのある国の数"""
+        return int(np.count_nonzero(~np.isnan(self.comfort).all(axis=1)))
+
+    def rank(
+        self,
+        month: int,
+        region: str | None = None,
+        max_level: int | None = None,
+        limit: int = 20,
+    ) -> list[dict]:
+        """month（1〜12）のスコア順に国を返す。気候データのない国は対象外。"""
+        m = month - 1
+        features = np.stack(
+            [
+                self.comfort[:, m],
+                self.dryness[:, m],
+                1.0 - self.level / _MAX_LEVEL,
+                1.0 - self.price_level,
+            ]
+        )
+        weights = np.array(list(WEIGHTS.values()), dtype=np.float64)[:, None]
+        known = ~np.isnan(features)
+        total = np.where(known, features * weights, 0.0).sum(axis=0)
+        weight_sum = np.where(known, weights, 0.0).sum(axis=0)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            score = total / weight_sum * 100
+
+        mask = ~np.isnan(self.comfort[:, m])
+        if region:
+            mask &= np.char.lower(self.regions) == region.lower()
+        if max_level is not None:
+            mask &= self.level <= max_level  # 安全レベル不明の国は除く
+        candidates = np.flatnonzero(mask)
+        order = candidates[np.argsort(-score[candidates], kind="stable")][:limit]
+        return [self._entry(i, m, score[i]) for i in order]
+
+    def _entry(self, i: int, m: int, score: float) -> dict:
+        country = self.countries[i]
+        return {
+            "code": country["code"],
+            "name": country["name"],
+            "name_ja": country.get("name_ja"),
+            "region": country.get("region"),
+            "flag_emoji": country.get("flag_emoji"),
+            "score": round(float(score), 1),
+            "temp_max": _value(self.temp_max[i, m]),
+            "temp_min": _value(self.temp_min[i, m]),
+            "precipitation": _value(self.precipitation[i, m]),
+            "rainy_days": _value(self.rainy_days[i, m]),
+            "safety_level": None if np.isnan(self.level[i]) else int(self.level[i]),
+            "price_level": None if np.isnan(self.price_level[i]) else round(float(self.price_level[i]), 2),
+        }
+
+
+def _comfort(temp_max: np.ndarray, temp_min: np.ndarray) -> np.ndarray:
+    """日平均気温が快適な範囲にあるほど 1 に近い（暑すぎる日中は減点）。"""
+    mean = (temp_max + temp_min) / 2
+    distance = np.maximum(np.maximum(_COMFORT_LOW - mean, mean - _COMFORT_HIGH), 0)
+    heat = np.maximum(temp_max - _HOT_DAY, 0) / 10
+    return np.clip(1 - distance / _COMFORT_FALLOFF - heat, 0, 1)
+
+
+def _dryness(precipitation: np.ndarray, rainy_days: np.ndarray) -> np.ndarray:
+    """雨が少ないほど 1 に近い。雨の日数がなければ月降水量で見る。"""
+    by_days = 1 - np.clip(rainy_days / _RAINY_DAYS_MAX, 0, 1)
+    by_amount = 1 - np.clip(precipitation / _PRECIPITATION_MAX, 0, 1)
+    return np.where(np.isnan(rainy_days), by_amount, by_days)
+
+
+def _rank(values: np.ndarray) -> np.ndarray:
+    """値の順位を 0〜1 に正規化する（NaN は NaN のまま）。"""
+    result = np.full(values.shape, np.nan)
+    known = np.flatnonzero(~np.isnan(values))
+    if len(known) == 1:
+        result[known] = 0.5
+    elif len(known) > 1:
+        result[known[np.argsort(values[known])]] = np.linspace(0, 1, len(known))
+    return result
+
+
+def _value(value: float) -> float | None:
+    return None if np.isnan(value) else round(float(value), 1)
+
+
+class RecommendationIndex:
+    """入力が変わったときだけ国×月の配列を作り直す"""
+
+    def __init__(self) -> None:
+        self._matrix: RecommendationMatrix | None = None
+        self._signature: tuple | None = None
+        self.builds = 0
+
+    async def get(
+        self, countries: list[dict], levels: dict[str, int | None], climate_svc, economic_svc
+    ) -> RecommendationMatrix:
+        signature = (
+            id(countries),
+            len(countries),
+            hash(frozenset(levels.items())),
+            climate_svc.cache_version,
+            economic_svc.cache_version,
+        )
+        if self._matrix is None or signature != self._signature:
+            codes = [c["code"] for c in countries]
+            climate = await climate_svc.monthly_matrix(countries)
+            gdp = await economic_svc.cached_gdp_per_capita(codes)
+            self._matrix = RecommendationMatrix(countries, climate, levels, gdp)
+            # 読み戻しでキャッシュが変わった分は次回の作り直しに含めない
+            self._signature = signature[:3] + (climate_svc.cache_version, economic_svc.cache_version)
+            self.builds += 1
+        return self._matrix
+
+
+recommendation_index = RecommendationIndex()
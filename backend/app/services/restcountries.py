@@ -1,17 +1,36 @@
 """RestCountries API v3.1 連携サービス"""
 from __future__ import annotations
+
+import asyncio
 import time
-from typing import Any
+from typing import Any, Awaitable, Callable
 
-from app.core.config import settings
-from app.core.http_client import get_http_client
+import httpx
 
-# シンプルなインメモリキャッシュ
-_cache: dict[str, tuple[Any, float]] = {}
+from app.core.cache import get_cache
+from app.core.config import settings
+from app.core.http_client import conditional_get, get_http_client
+from app.core.scheduler import recent_countries
+from app.services.country_search import CountrySearchIndex, CountryTrie
 
+# 国一覧 + 国別詳細（約250件）
+_cache = get_cache(
+    "restcountries",
+    ttl=settings.cache_ttl_hours * 3600,
+    max_entries=512,
+    hard_ttl=7 * 24 * 3600,
+    persist=True,
+)
 
-def _is_expired(ts: float) -> bool:
-    return time.time() - ts > settings.cache_ttl_hours * 3600
+# /all は fields を10個までしか指定できないため、一覧用と詳細用の2回に分けて並列取得する
+_ALL_FIELDS = "name,cca2,flags,capital,region,subregion,population,languages,currencies,latlng"
+_ALL_EXTRA_FIELDS = "cca2,cca3,flag,borders,timezones"
+_ALPHA_FIELDS = (
+    "name,cca2,cca3,flags,flag,capital,region,subregion,population,languages,currencies,"
+    "latlng,borders,timezones"
+)
+# 一覧取得に失敗した後、再試行せず /alpha にフォールバックする時間（秒）
+_REPOSITORY_RETRY_SECONDS = 60
 
 
 # RestCountries subregion → 外務省地域区分
@@ -335,6 +354,7 @@ def _parse_country(raw: dict) -> dict:
 
     return {
         "code": code,
+        "cca3": raw.get("cca3"),
         "name": name_common,
         "name_ja": NAME_JA_MAP.get(code),
         "capital": raw.get("capital", [None])[0] if raw.get("capital") else None,
@@ -352,49 +372,152 @@ def _parse_country(raw: dict) -> dict:
     }
 
 
+class _CountryIndex:
+    """国一覧から作る不変のインデックス（差し替えは参照の置き換えのみ）"""
+
+    __slots__ = ("countries", "by_code", "by_name", "complete", "search", "trie")
+
+    def __init__(self, countries: list[dict]) -> None:
+        self.countries = countries
+        self.by_code: dict[str, dict] = {}
+        self.by_name: dict[str, dict] = {}
+        for c in countries:
+            self.by_code[c["code"].upper()] = c
+            if c.get("cca3"):
+                self.by_code.setdefault(c["cca3"].upper(), c)
+            if c.get("name"):
+                self.by_name.setdefault(c["name"].lower(), c)
+            if c.get("name_ja"):
+                self.by_name.setdefault(c["name_ja"], c)
+        # 詳細用フィールドの取得に失敗した一覧では国詳細を返さない
+        self.complete = all(c.get("cca3") for c in countries)
+        self.search = CountrySearchIndex(countries)
+        self.trie = CountryTrie(countries)
+
+    def find(self, key: str) -> dict | None:
+        key = key.strip()
+        return (
+            self.by_code.get(key.upper())
+            or self.by_name.get(key.lower())
+            or self.by_name.get(key)
+        )
+
+
+class CountryRepository:
+    """/all の1回の取得結果から国を O(1) で引くリポジトリ
+
+    一覧はキャッシュ名前空間（all_countries）に保存され、ソフト TTL 切れ後の
+    再取得で一覧が入れ替わるとインデックスも作り直して差し替える。
+    """
+
+    def __init__(self, fetch_all: Callable[[], Awaitable[list[dict]]]) -> None:
+        self._fetch_all = fetch_all
+        self._index: _CountryIndex | None = None
+        self._failed_at = 0.0
+
+    async def load(self) -> _CountryIndex:
+        countries = await _cache.get_or_fetch("all_countries", self._fetch_all)
+        index = self._index
+        if index is None or index.countries is not countries:
+            index = _CountryIndex(countries)
+            self._index = index
+        return index
+
+    async def find(self, code: str) -> dict | None:
+        """国コード（cca2/cca3）・英語名・日本語名で国を返す。
+
+        一覧が使えない場合は LookupError を送出する（呼び出し側で個別取得する）。
+        """
+        if time.time() - self._failed_at < _REPOSITORY_RETRY_SECONDS:
+            raise LookupError("国一覧を取得できません")
+        try:
+            index = await self.load()
+        except Exception as e:
+            self._failed_at = time.time()
+            raise LookupError("国一覧を取得できません") from e
+        if not index.complete:
+            raise LookupError("国一覧に詳細フィールドがありません")
+        return index.find(code)
+
+
 class RestCountriesService:
     def __init__(self) -> None:
         self.base_url = settings.restcountries_base_url
 
-    async def get_all_countries(self, query: str | None = None, region: str | None = None) -> list[dict]:
-        cache_key = f"all_countries"
-        if cache_key in _cache:
-            data, ts = _cache[cache_key]
-            if not _is_expired(ts):
-                countries = data
-            else:
-                countries = await self._fetch_all()
-                _cache[cache_key] = (countries, time.time())
-        else:
-            countries = await self._fetch_all()
-            _cache[cache_key] = (countries, time.time())
+    async def get_all_countries(
+        self, query: str | None = None, region: str | None = None, limit: int | None = None
+    ) -> list[dict]:
+        """国一覧を返す。要素はインデックスと共有なので呼び出し側で書き換えない。"""
+        index = await _repository.load()
 
-        # フィルタリング
+        # フィルタリング（検索語があれば関連度順）
         if query:
-            q = query.lower()
-            countries = [
-                c for c in countries
-                if q in c["name"].lower()
-                or (c["name_ja"] and q in c["name_ja"])
-                or q in c["code"].lower()
-            ]
+            countries = index.search.search(query, limit=None)
+        else:
+            countries = index.countries
         if region:
             countries = [c for c in countries if c["region"].lower() == region.lower()]
+        if limit is not None:
+            countries = countries[:limit]
 
         return countries
 
+    async def suggest(self, prefix: str, limit: int = 10) -> list[dict]:
+        """入力補完用に、接頭辞に一致する国の最小限の情報を返す。"""
+        index = await _repository.load()
+        return [
+            {
+                "code": c["code"],
+                "name": c["name"],
+                "name_ja": c.get("name_ja"),
+                "flag_emoji": c.get("flag_emoji", ""),
+            }
+            for c in index.trie.suggest(prefix, limit)
+        ]
+
+    async def get_countries(self, codes: list[str]) -> dict[str, dict | None]:
+        """複数の国コードを一覧のインデックス1回の参照でまとめて解決する。"""
+        try:
+            index = await _repository.load()
+        except Exception:
+            index = None
+        if index is None or not index.complete:
+            found = await asyncio.gather(*[self.get_country(c) for c in codes])
+            return dict(zip(codes, found))
+        result = {}
+        for code in codes:
+            country = index.by_code.get(code.upper())
+            result[code] = dict(country) if country is not None else None
+        return result
+
     async def get_country(self, code: str) -> dict | None:
-        cache_key = f"country_{code.upper()}"
-        if cache_key in _cache:
-            data, ts = _cache[cache_key]
-            if not _is_expired(ts):
-                return data
+        try:
+            country = await _repository.find(code)
+        except LookupError:
+            return await self._get_country_from_alpha(code)
+        if country is None:
+            return None
+        recent_countries.touch(country["code"])
+        # 呼び出し側が safety_level 等を書き込むため、一覧の要素は複製して返す
+        return dict(country)
+
+    async def _get_country_from_alpha(self, code: str) -> dict | None:
+        """一覧が使えない場合の個別取得（/alpha/{code}）。"""
+        return await _cache.get_or_fetch(
+            f"country_{code.upper()}", lambda: self._fetch_country(code)
+        )
 
+    async def refresh_all(self) -> int:
+        """国一覧を再取得してキャッシュを更新する（スケジューラ用）。件数を返す。"""
+        countries = await _cache.refresh("all_countries", self._fetch_all)
+        return len(countries or [])
+
+    async def _fetch_country(self, code: str) -> dict | None:
         client = get_http_client()
         try:
             resp = await client.get(
                 f"{self.base_url}/alpha/{code}",
-                params={"fields": "name,cca2,flags,flag,capital,region,subregion,population,languages,currencies,latlng,borders,timezones"},
+                params={"fields": _ALPHA_FIELDS},
             )
             if resp.status_code == 404:
                 return None
@@ -403,25 +526,50 @@ class RestCountriesService:
             # APIは単一オブジェクトまたはリストで返すことがある
             if isinstance(raw, list):
                 raw = raw[0]
-            country = _parse_country(raw)
-            _cache[cache_key] = (country, time.time())
-            return country
+            return _parse_country(raw)
         except Exception:
             return None
 
     async def get_coordinates(self, code: str) -> tuple[float, float] | None:
         """国コードから座標(lat, lng)を取得する。エラー時はNone。"""
-        # まずキャッシュされた国情報から取得を試みる
-        country = await self.get_country(code)
+        # 座標は一覧だけで揃うため、詳細フィールドの有無に関わらず一覧から引く
+        try:
+            country = (await _repository.load()).find(code)
+        except Exception:
+            country = await self._get_country_from_alpha(code)
         if country and country.get("latitude") is not None and country.get("longitude") is not None:
             return (country["latitude"], country["longitude"])
         return None
 
     async def _fetch_all(self) -> list[dict]:
         client = get_http_client()
-        resp = await client.get(
-            f"{self.base_url}/all",
-            params={"fields": "name,cca2,flags,capital,region,subregion,population,languages,currencies,latlng"},
+        # 未更新（304）の応答は前回デコードした JSON をそのまま使う
+        raws, extra_raws = await asyncio.gather(
+            conditional_get(
+                client, f"{self.base_url}/all", _json_body, params={"fields": _ALL_FIELDS}
+            ),
+            conditional_get(
+                client, f"{self.base_url}/all", _json_body, params={"fields": _ALL_EXTRA_FIELDS}
+            ),
+            return_exceptions=True,
         )
-        resp.raise_for_status()
-        return [_parse_country(r) for r in resp.json()]
+        if isinstance(raws, BaseException):
+            raise raws
+
+        # 詳細用フィールドは取得できた場合のみ結合する（失敗時は一覧のみ）
+        extras: dict[str, dict] = {}
+        if isinstance(extra_raws, list):
+            extras = {e.get("cca2"): e for e in extra_raws}
+        countries = []
+        for raw in raws:
+            extra = extras.get(raw.get("cca2"))
+            countries.append(_parse_country({**raw, **extra} if extra else raw))
+        return countries
+
+
+def _json_body(resp: httpx.Response) -> Any:
+    resp.raise_for_status()
+    return resp.json()
+
+
+_repository = CountryRepository(RestCountriesService()._fetch_all)
@@ -0,0 +1,222 @@
+"""安全情報の変更検知と履歴ストア
+
+MOFA・State Dept の取得結果を国ごとに前回の内容と比較し、
+変化した項目（危険レベル・感染症レベル・地域別危険度・新着の領事メール）を
+連番付きの変更履歴として SQLite に追記する。
+
+- data_dir 未設定時はメモリ上の SQLite を使う
+- 初回の観測は基準として保存するだけで変更としては記録しない
+- 連番（seq）をカーソルにして、クライアントは前回以降の差分だけを取得できる
+- 履歴は max_changes 件を超えたら古い順に削除する
+- 記録した変更は safety_alerts ハブで国コードごとに購読者へプッシュする
+"""
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any
+
+from app.core.config import settings
+from app.core.pubsub import Hub
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS safety_snapshots (
+    source TEXT NOT NULL,
+    country_code TEXT NOT NULL,
+    data TEXT NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (source, country_code)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS safety_changes (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    changed_at REAL NOT NULL,
+    country_code TEXT NOT NULL,
+    source TEXT NOT NULL,
+    field TEXT NOT NULL,
+    old TEXT,
+    new TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_safety_changes_country ON safety_changes (country_code, seq);
+"""
+
+_MEMORY = ":memory:"
+
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"), sort_keys=True)
+
+
+def mofa_snapshot(result: dict) -> dict:
+    """MOFA の取得結果から変更検知の対象項目を取り出す。"""
+    return {
+        "level": result.get("level", 0),
+        "infection_level": result.get("infection_level", 0),
+        "regional_risks": result.get("regional_risks") or [],
+        "mails": [
+            d["description"] for d in result.get("details", []) if d.get("category") == "領事メール"
+        ],
+    }
+
+
+def diff_snapshots(old: dict, new: dict) -> list[tuple[str, Any, Any]]:
+    """2つのスナップショットの差分を (項目, 旧値, 新値) で返す。領事メールは新着分のみ。"""
+    changes = []
+    for field, value in new.items():
+        before = old.get(field)
+        if field == "mails":
+            added = [m for m in value if m not in (before or [])]
+            if added:
+                changes.append(("mail", None, added))
+        elif before != value:
+            changes.append((field, before, value))
+    return changes
+
+
+class SafetyHistory:
+    """国ごとの最新スナップショットと変更履歴を保持するストア"""
+
+    def __init__(
+        self, path: str = _MEMORY, max_changes: int = 20000, hub: Hub | None = None
+    ) -> None:
+        self.max_changes = max_changes
+        self.hub = hub
+        self._lock = threading.Lock()
+        self._open(path)
+
+    def _open(self, path: str) -> None:
+        if path != _MEMORY:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(_SCHEMA)
+        if path != _MEMORY:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+        # 比較用にスナップショットはメモリにも持つ
+        self._snapshots: dict[tuple[str, str], dict] = {}
+        for source, code, data in self._conn.execute(
+            "SELECT source, country_code, data FROM safety_snapshots"
+        ):
+            try:
+                self._snapshots[(source, code)] = json.loads(data)
+            except ValueError:
+                continue
+
+    def open(self, path: str) -> None:
+        """指定ファイルの履歴に切り替える（lifespan 用）。"""
+        self.close()
+        self._open(path)
+
+    def close(self) -> None:
+        """接続を閉じ、以降はメモリ上の履歴に戻す。"""
+        with self._lock:
+            self._conn.close()
+        self._open(_MEMORY)
+
+    def observe(self, source: str, country_code: str, snapshot: dict) -> list[dict]:
+        """新しいスナップショットを前回と比較し、変化があれば履歴に追記して返す。"""
+        code = country_code.upper()
+        key = (source, code)
+        previous = self._snapshots.get(key)
+        if previous == snapshot:
+            return []
+        self._snapshots[key] = snapshot
+        now = time.time()
+        changes = diff_snapshots(previous, snapshot) if previous is not None else []
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO safety_snapshots (source, country_code, data, updated_at) "
+                "VALUES (?, ?, ?, ?)",
+                (source, code, _dumps(snapshot), now),
+            )
+            recorded = []
+            for field, old, new in changes:
+                cur = self._conn.execute(
+                    "INSERT INTO safety_changes (changed_at, country_code, source, field, old, new) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (now, code, source, field, _dumps(old), _dumps(new)),
+                )
+                recorded.append(_change(cur.lastrowid, now, code, source, field, old, new))
+            if recorded:
+                self._prune()
+        if self.hub is not None:
+            for change in recorded:
+                self.hub.publish(code, change)
+        return recorded
+
+    def _prune(self) -> None:
+        self._conn.execute(
+            "DELETE FROM safety_changes WHERE seq <= "
+            "(SELECT COALESCE(MAX(seq), 0) FROM safety_changes) - ?",
+            (self.max_changes,),
+        )
+
+    def changes(
+        self, since: int = 0, limit: int = 500, country_code: str | None = None
+    ) -> dict:
+        """カーソル since より後の変更を古い順に返す。
+
+        truncated が True の場合、since 以降の一部が削除済みなので全件を取り直す必要がある。
+        """
+        sql = (
+            "SELECT seq, changed_at, country_code, source, field, old, new "
+            "FROM safety_changes WHERE seq > ?"
+        )
+        params: list[Any] = [since]
+        if country_code:
+            sql += " AND country_code = ?"
+            params.append(country_code.upper())
+        sql += " ORDER BY seq LIMIT ?"
+        params.append(limit + 1)
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+            oldest = self._conn.execute("SELECT MIN(seq) FROM safety_changes").fetchone()[0]
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        changes = [
+            _change(seq, at, code, source, field, json.loads(old), json.loads(new))
+            for seq, at, code, source, field, old, new in rows
+        ]
+        return {
+            "cursor": changes[-1]["seq"] if changes else since,
+            "changes": changes,
+            "has_more": has_more,
+            "truncated": since > 0 and oldest is not None and oldest > since + 1,
+        }
+
+    def stats(self) -> dict:
+        with self._lock:
+            count, latest = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(MAX(seq), 0) FROM safety_changes"
+            ).fetchone()
+        return {
+            "path": self.path,
+            "snapshots": len(self._snapshots),
+            "changes": count,
+            "latest_seq": latest,
+        }
+
+
+def _change(
+    seq: int, at: float, code: str, source: str, field: str, old: Any, new: Any
+) -> dict:
+    return {
+        "seq": seq,
+        "changed_at": at,
+        "country_code": code,
+        "source": source,
+        "field": field,
+        "old": old,
+        "new": new,
+    }
+
+
+safety_alerts = Hub(
+    max_subscribers=settings.alert_max_subscribers, queue_size=settings.alert_queue_size
+)
+safety_history = SafetyHistory(hub=safety_alerts)
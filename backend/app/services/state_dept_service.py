@@ -1,73 +1,95 @@
 """US State Department 渡航情報サービス"""
 from __future__ import annotations
-import time
-from typing import Any
 
-from app.core.http_client import get_http_client
+import httpx
+
+from app.core.cache import get_cache
+from app.core.http_client import conditional_get, get_http_client
+from app.services.safety_history import safety_history
 
 # インメモリキャッシュ（6時間）
-_state_cache: dict[str, tuple[Any, float]] = {}
 _STATE_CACHE_TTL_HOURS = 6
+_state_cache = get_cache(
+    "state_dept",
+    ttl=_STATE_CACHE_TTL_HOURS * 3600,
+    max_entries=512,
+    hard_ttl=24 * 3600,
+    persist=True,
+    shared=True,
+)
 
 DATA_URL = "https://travel.state.gov/content/dam/travelData/TravelAdvisoryLatestCountry-en.json"
 
 
-def _is_expired(ts: float) -> bool:
-    return time.time() - ts > _STATE_CACHE_TTL_HOURS * 3600
+# 国コード → 解析済み勧告（level, message, date）の索引を1エントリとして保持する
+_INDEX_KEY = "advisory_index"
+
+_NO_INFO = {"level": 0, "message": "情報なし", "date": None}
+_FETCH_FAILED = {"level": 0, "message": "情報取得失敗", "date": None}
 
 
 class StateDeptService:
     async def get_advisory(self, country_code: str) -> dict:
         """国コードで渡航勧告情報を取得する。"""
-        code = country_code.upper()
-        cache_key = f"state_{code}"
-        if cache_key in _state_cache:
-            data, ts = _state_cache[cache_key]
-            if not _is_expired(ts):
-                return data
+        try:
+            index = await self._get_index()
+        except Exception:
+            return dict(_FETCH_FAILED)
+        return dict(index.get(country_code.upper(), _NO_INFO))
 
+    async def get_advisories(self, country_codes: list[str]) -> dict[str, dict]:
+        """複数国の渡航勧告を索引の1回の参照で返す（地図表示・一括取得用）。"""
+        codes = [c.upper() for c in country_codes]
         try:
-            advisories = await self._fetch_all()
-            # 国コードで検索
-            for advisory in advisories:
-                iso_code = advisory.get("ISO_Code", "").upper()
-                if iso_code == code:
-                    level_str = advisory.get("Advisory_Level", "")
-                    # "Level 1 - Exercise Normal Precautions" のようなフォーマット
-                    level = 0
-                    message = level_str
-                    if "Level" in level_str:
-                        try:
-                            level = int(level_str.split(" ")[1])
-                        except (IndexError, ValueError):
-                            pass
-                        parts = level_str.split(" - ", 1)
-                        if len(parts) > 1:
-                            message = parts[1]
-
-                    result = {"level": level, "message": message}
-                    _state_cache[cache_key] = (result, time.time())
-                    return result
-
-            result = {"level": 0, "message": "情報なし"}
-            _state_cache[cache_key] = (result, time.time())
-            return result
+            index = await self._get_index()
         except Exception:
-            return {"level": 0, "message": "情報取得失敗"}
-
-    async def _fetch_all(self) -> list[dict]:
-        """全渡航勧告データを取得する"""
-        cache_key = "_all_advisories"
-        if cache_key in _state_cache:
-            data, ts = _state_cache[cache_key]
-            if not _is_expired(ts):
-                return data
-
-        client = get_http_client()
-        resp = await client.get(DATA_URL)
-        resp.raise_for_status()
-        raw = resp.json()
-
-        advisories = raw if isinstance(raw, list) else raw.get("data", [])
-        _state_cache[cache_key] = (advisories, time.time())
-        return advisories
+            return {code: dict(_FETCH_FAILED) for code in codes}
+        return {code: dict(index.get(code, _NO_INFO)) for code in codes}
+
+    async def refresh_all(self) -> int:
+        """全渡航勧告を再取得して索引を作り直す（スケジューラ用）。"""
+        index = await _state_cache.refresh(_INDEX_KEY, self._download_index)
+        return len(index or {})
+
+    async def _get_index(self) -> dict[str, dict]:
+        """索引を返す（同時ミスは1回の取得に合流）"""
+        return await _state_cache.get_or_fetch(_INDEX_KEY, self._download_index)
+
+    async def _download_index(self) -> dict[str, dict]:
+        """全渡航勧告 JSON を取得し、国コード別の索引を1回の走査で作る。
+
+        未更新（304）なら前回作った索引をそのまま返す。
+        """
+        index = await conditional_get(get_http_client(), DATA_URL, _parse_index)
+        # 国別レベルの変化を履歴に記録する
+        for code, advisory in index.items():
+            safety_history.observe("state_dept", code, {"level": advisory["level"]})
+        return index
+
+
+def _parse_index(resp: httpx.Response) -> dict[str, dict]:
+    resp.raise_for_status()
+    raw = resp.json()
+    advisories = raw if isinstance(raw, list) else raw.get("data", [])
+    index: dict[str, dict] = {}
+    for advisory in advisories:
+        code = (advisory.get("ISO_Code") or "").upper()
+        if code and code not in index:
+            index[code] = _parse_advisory(advisory)
+    return index
+
+
+def _parse_advisory(advisory: dict) -> dict:
+    level_str = advisory.get("Advisory_Level", "")
+    # "Level 1 - Exercise Normal Precautions" のようなフォーマット
+    level = 0
+    message = level_str
+    if "Level" in level_str:
+        try:
+            level = int(level_str.split(" ")[1])
+        except (IndexError, ValueError):
+            pass
+        parts = level_str.split(" - ", 1)
+        if len(parts) > 1:
+            message = parts[1]
+    return {"level": level, "message": message, "date": advisory.get("Date_Updated") or None}
@@ -1,12 +1,32 @@
-"""Wikipedia API を使った国概要サービス（キー不要）"""
+"""Wikipedia API を使った国概要サービス（キー不要）
+
+個別の取得では ja と en を並行して問い合わせ、ja に概要があればそれを使う。
+prefetch では複数の国名を1回の action=query にまとめ、全ての国を数回のリクエストで取り込む。
+"""
 from __future__ import annotations
-import time
-from typing import Any
 
+import asyncio
+
+from app.core.cache import get_cache
 from app.core.http_client import get_http_client
 
-_cache: dict[str, tuple[Any, float]] = {}
 _TTL = 7 * 24 * 3600  # 7日間
+_cache = get_cache(
+    "wikipedia",
+    ttl=_TTL,
+    max_entries=512,
+    hard_ttl=30 * 24 * 3600,
+    persist=True,
+)
+
+_HEADERS = {"User-Agent": "KantaTravelApp/1.0 (educational travel info app)"}
+# TextExtracts が導入部の抜粋を返せるのは1リクエストあたり20ページまで
+_BATCH_TITLES = 20
+_MAX_CONTINUES = 10
+
+
+def _unavailable(country_code: str, title: str) -> dict:
+    return {"country_code": country_code, "title": title, "summary": "", "url": None, "available": False}
 
 
 class WikipediaService:
@@ -14,52 +34,102 @@ class WikipediaService:
     EN_API = "https://en.wikipedia.org/w/api.php"
 
     async def get_summary(self, country_code: str, name_ja: str, name_en: str) -> dict:
-        cache_key = f"wiki_{country_code}"
-        if cache_key in _cache:
-            data, ts = _cache[cache_key]
-            if time.time() - ts < _TTL:
-                return data
+        cv = await _cache.fetch_entry(
+            f"wiki_{country_code}", lambda: self._fetch_summary(country_code, name_ja, name_en)
+        )
+        return {**cv.value, **cv.meta()}
+
+    async def prefetch(self, countries: list[tuple[str, str, str]]) -> int:
+        """(国コード, 日本語名, 英語名) のうち未取得・期限切れの国をまとめて取り込み、件数を返す。"""
+        found = await _cache.get_many([f"wiki_{code}" for code, _, _ in countries])
+        missing = [c for c in countries if (cv := found.get(f"wiki_{c[0]}")) is None or cv.stale]
+        results = await self._fetch_many(missing, self.JA_API, 1)
+        no_ja = [c for c in missing if c[0] in results and not results[c[0]]["available"]]
+        results.update(await self._fetch_many(no_ja, self.EN_API, 2))
+        for code, result in results.items():
+            _cache.set(f"wiki_{code}", result)
+        return len(results)
 
-        result = await self._fetch(country_code, name_ja, self.JA_API)
-        if not result["available"]:
-            result = await self._fetch(country_code, name_en, self.EN_API)
+    async def _fetch_many(
+        self, countries: list[tuple[str, str, str]], api_url: str, name_index: int
+    ) -> dict[str, dict]:
+        """国名をまとめて問い合わせる。失敗したまとまりの国は結果に含めない。"""
+        by_title: dict[str, list[str]] = {}
+        for country in countries:
+            by_title.setdefault(country[name_index], []).append(country[0])
+        titles = list(by_title)
+        batches = [titles[i:i + _BATCH_TITLES] for i in range(0, len(titles), _BATCH_TITLES)]
+        pages = await asyncio.gather(
+            *[self._query(batch, api_url) for batch in batches], return_exceptions=True
+        )
+        results = {}
+        for batch, found in zip(batches, pages):
+            if isinstance(found, BaseException):
+                continue
+            for title in batch:
+                for code in by_title[title]:
+                    results[code] = self._result(code, title, found.get(title), api_url)
+        return results
 
-        _cache[cache_key] = (result, time.time())
-        return result
+    async def _fetch_summary(self, country_code: str, name_ja: str, name_en: str) -> dict:
+        ja, en = await asyncio.gather(
+            self._fetch(country_code, name_ja, self.JA_API),
+            self._fetch(country_code, name_en, self.EN_API),
+        )
+        return ja if ja["available"] else en
 
     async def _fetch(self, country_code: str, title: str, api_url: str) -> dict:
+        try:
+            pages = await self._query([title], api_url)
+        except Exception:
+            return _unavailable(country_code, title)
+        return self._result(country_code, title, pages.get(title), api_url)
+
+    async def _query(self, titles: list[str], api_url: str) -> dict[str, dict]:
+        """タイトルごとの page（extract を含む）を返す。正規化・リダイレクト後のページを元のタイトルに対応付ける。"""
         params = {
             "action": "query",
-            "titles": title,
+            "titles": "|".join(titles),
             "prop": "extracts",
             "exintro": 1,
             "explaintext": 1,
             "exchars": 600,
+            "exlimit": "max",
             "format": "json",
             "redirects": 1,
         }
-        headers = {"User-Agent": "KantaTravelApp/1.0 (educational travel info app)"}
-        try:
-            client = get_http_client()
-            resp = await client.get(api_url, params=params, headers=headers)
+        resolved = {title: title for title in titles}
+        pages: dict[str, dict] = {}
+        client = get_http_client()
+        cont: dict = {}
+        for _ in range(_MAX_CONTINUES):
+            resp = await client.get(api_url, params={**params, **cont}, headers=_HEADERS)
             resp.raise_for_status()
             data = resp.json()
+            query = data.get("query", {})
+            # normalized → redirects の順に辿る
+            for step in query.get("normalized", []) + query.get("redirects", []):
+                for title, current in resolved.items():
+                    if current == step.get("from"):
+                        resolved[title] = step.get("to")
+            for page in query.get("pages", {}).values():
+                if page.get("extract") or page.get("title") not in pages:
+                    pages[page.get("title")] = page
+            # 抜粋の上限で返しきれなかった分は continue で続きを取る
+            if "continue" not in data:
+                break
+            cont = data["continue"]
+        return {title: pages.get(resolved[title], {}) for title in titles}
 
-            pages = data.get("query", {}).get("pages", {})
-            page = next(iter(pages.values()), {})
-            if page.get("pageid") == -1 or not page.get("extract"):
-                return {"country_code": country_code, "title": title, "summary": "", "url": None, "available": False}
-
-            extract: str = page["extract"].strip()
-            resolved_title: str = page.get("title", title)
-            lang = "ja" if api_url == self.JA_API else "en"
-            wiki_url = f"https://{lang}.wikipedia.org/wiki/{resolved_title.replace(' ', '_')}"
-            return {
-                "country_code": country_code,
-                "title": resolved_title,
-                "summary": extract,
-                "url": wiki_url,
-                "available": True,
-            }
-        except Exception:
-            return {"country_code": country_code, "title": title, "summary": "", "url": None, "available": False}
+    def _result(self, country_code: str, title: str, page: dict | None, api_url: str) -> dict:
+        if not page or "missing" in page or page.get("pageid") == -1 or not page.get("extract"):
+            return _unavailable(country_code, title)
+        resolved_title: str = page.get("title", title)
+        lang = "ja" if api_url == self.JA_API else "en"
+        return {
+            "country_code": country_code,
+            "title": resolved_title,
+            "summary": page["extract"].strip(),
+            "url": f"https://{lang}.wikipedia.org/wiki/{resolved_title.replace(' ', '_')}",
+            "available": True,
+        }
@@ -1,55 +1,309 @@
-"""World Bank API を使った経済指標サービス（キー不要）"""
+"""World Bank API を使った経済指標サービス（キー不要）
+
+設定した指標（worldbank_indicators）ごとに country/all をページ単位で取得し、
+国×年×指標の float64 配列（IndicatorStore）にまとめて保持する。
+国別の経済指標・時系列・国同士の比較はすべてこの配列から答え、リクエストごとに上流へは行かない。
+
+- 取り込みは指標数×ページ数のリクエストで済む（1ページ最大 _PER_PAGE 件）
+- 欠損は NaN。「最新値」は国・指標ごとに値のある最も新しい年
+- data_dir 設定時は .npz に保存し、再起動直後から応答できる
+- 取り込みはスケジューラの worldbank ジョブだけが行い、取り込み前のリクエストは available: False を返す
+"""
 from __future__ import annotations
+
+import asyncio
+import os
 import time
-from typing import Any
+from datetime import date, datetime, timezone
 
+import numpy as np
+
+from app.core.config import settings
 from app.core.http_client import get_http_client
 
-_cache: dict[str, tuple[Any, float]] = {}
-_TTL = 7 * 24 * 3600  # 7日間
+_TTL = 7 * 24 * 3600  # 7日間（年次の指標なので更新はまれ）
+_PER_PAGE = 20000
+
+GDP_PER_CAPITA = "NY.GDP.PCAP.CD"
+INDICATOR_LABELS = {
+    GDP_PER_CAPITA: "一人当たりGDP（USD）",
+    "FP.CPI.TOTL.ZG": "消費者物価上昇率（%）",
+    "PA.NUS.PPP": "購買力平価換算係数（現地通貨/国際ドル）",
+    "PA.NUS.PPPC.RF": "物価水準（購買力平価/為替レート）",
+    "ST.INT.ARVL": "海外からの旅行者数",
+}
+
+
+def _unavailable(country_code: str) -> dict:
+    return {"country_code": country_code, "gdp_per_capita": None, "gdp_year": None, "available": False}
+
+
+class IndicatorStore:
+    """国×年×指標の値を1つの配列で保持する"""
+
+    def __init__(self) -> None:
+        self.indicators: list[str] = []
+        self.countries: list[str] = []
+        self.first_year = 0
+        self.values = np.empty((0, 0, 0))
+        self.updated_at: float | None = None
+        self.path: str | None = None
+        self.version = 0  # 差し替えのたびに増える（派生データの再計算の判定用）
+        self._country_index: dict[str, int] = {}
+        self._indicator_index: dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.countries)
+
+    @property
+    def stale(self) -> bool:
+        return self.updated_at is None or time.time() - self.updated_at >= _TTL
+
+    def replace(
+        self,
+        indicators: list[str],
+        countries: list[str],
+        first_year: int,
+        values: np.ndarray,
+        updated_at: float | None = None,
+    ) -> None:
+        self.indicators = list(indicators)
+        self.countries = list(countries)
+        self.first_year = first_year
+        self.values = values
+        self.updated_at = updated_at or time.time()
+        self._country_index = {c: i for i, c in enumerate(self.countries)}
+        self._indicator_index = {ind: k for k, ind in enumerate(self.indicators)}
+        self.version += 1
+
+    def ingest(self, rows: dict[str, list[dict]], first_year: int, last_year: int) -> None:
+        """指標ごとの World Bank の行（country.id / date / value）で全体を差し替える。"""
+        indicators = list(rows)
+        countries = sorted({r["country"]["id"].upper() for entries in rows.values() for r in entries})
+        index = {c: i for i, c in enumerate(countries)}
+        values = np.full((len(countries), last_year - first_year + 1, len(indicators)), np.nan)
+        for k, indicator in enumerate(indicators):
+            for row in rows[indicator]:
+                value = row.get("value")
+                try:
+                    j = int(row.get("date") or 0) - first_year
+                except ValueError:
+                    continue
+                if value is not None and 0 <= j < values.shape[1]:
+                    values[index[row["country"]["id"].upper()], j, k] = value
+        self.replace(indicators, countries, first_year, values)
+
+    def _column(self, country_code: str, indicator: str) -> np.ndarray | None:
+        i = self._country_index.get(country_code.upper())
+        k = self._indicator_index.get(indicator)
+        if i is None or k is None:
+            return None
+        return self.values[i, :, k]
+
+    def latest(self, country_code: str, indicator: str) -> tuple[float, int] | None:
+        """値のある最も新しい年の (値, 年)。"""
+        column = self._column(country_code, indicator)
+        if column is None:
+            return None
+        known = np.flatnonzero(~np.isnan(column))
+        if len(known) == 0:
+            return None
+        return float(column[known[-1]]), self.first_year + int(known[-1])
+
+    def series(self, country_code: str, indicator: str) -> list[dict]:
+        column = self._column(country_code, indicator)
+        if column is None:
+            return []
+        return [
+            {"year": self.first_year + int(j), "value": float(column[j])}
+            for j in np.flatnonzero(~np.isnan(column))
+        ]
+
+    def compare(self, country_codes: list[str], indicator: str, year: int | None = None) -> list[dict]:
+        """国ごとの値を大きい順に返す。year 省略時は国ごとの最新値。"""
+        k = self._indicator_index.get(indicator)
+        codes = dict.fromkeys(c.upper() for c in country_codes)
+        rows = [self._country_index[c] for c in codes if c in self._country_index]
+        if k is None or not rows:
+            return []
+        block = self.values[rows, :, k]
+        if year is not None:
+            j = year - self.first_year
+            if not 0 <= j < block.shape[1]:
+                return []
+            picked = block[:, j]
+            years = np.full(len(rows), year)
+        else:
+            # 国ごとに値のある最後の年を選ぶ
+            last = block.shape[1] - 1 - np.argmax(~np.isnan(block[:, ::-1]), axis=1)
+            picked = block[np.arange(len(rows)), last]
+            years = self.first_year + last
+        order = [j for j in np.argsort(-picked, kind="stable") if not np.isnan(picked[j])]
+        return [
+            {"country_code": self.countries[rows[j]], "value": float(picked[j]), "year": int(years[j])}
+            for j in order
+        ]
+
+    def save(self, path: str) -> None:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp = f"{path}.tmp.npz"
+        np.savez_compressed(
+            tmp,
+            indicators=np.array(self.indicators),
+            countries=np.array(self.countries),
+            first_year=np.array(self.first_year),
+            updated_at=np.array(self.updated_at or 0.0),
+            values=self.values,
+        )
+        os.replace(tmp, path)
+
+    def load(self, path: str) -> None:
+        """保存済みの配列を読み込み、以降の保存先にする（ファイルがなければ空のまま）。"""
+        self.path = path
+        if not os.path.exists(path):
+            return
+        with np.load(path) as data:
+            self.replace(
+                [str(i) for i in data["indicators"]],
+                [str(c) for c in data["countries"]],
+                int(data["first_year"]),
+                data["values"].astype(np.float64),
+                float(data["updated_at"]) or None,
+            )
 
 
 class WorldBankService:
     BASE_URL = "https://api.worldbank.org/v2/country"
 
+    def __init__(self, store: IndicatorStore | None = None) -> None:
+        self.store = store if store is not None else worldbank_store
+        self._lock: asyncio.Lock | None = None
+
+    @property
+    def indicators(self) -> list[str]:
+        return [i.strip() for i in settings.worldbank_indicators.split(",") if i.strip()]
+
+    @property
+    def cache_version(self) -> int:
+        return self.store.version
+
     async def get_economic_info(self, country_code: str) -> dict:
-        cache_key = f"wb_{country_code}"
-        if cache_key in _cache:
-            data, ts = _cache[cache_key]
-            if time.time() - ts < _TTL:
-                return data
-
-        indicator = "NY.GDP.PCAP.CD"  # 一人当たりGDP（USD）
-        url = f"{self.BASE_URL}/{country_code}/indicator/{indicator}"
-        params = {"format": "json", "mrv": 5, "per_page": 5}
-
-        try:
-            client = get_http_client()
-            resp = await client.get(url, params=params)
-            resp.raise_for_status()
-            raw = resp.json()
-        except Exception:
-            return {"country_code": country_code, "gdp_per_capita": None, "gdp_year": None, "available": False}
-
-        # World Bank は [metadata, data] の配列を返す
-        if not isinstance(raw, list) or len(raw) < 2:
-            return {"country_code": country_code, "gdp_per_capita": None, "gdp_year": None, "available": False}
-
-        entries = raw[1] or []
-        # 最新の非Nullエントリを探す
-        gdp_value = None
-        gdp_year = None
-        for entry in entries:
-            if entry.get("value") is not None:
-                gdp_value = entry["value"]
-                gdp_year = int(entry["date"]) if entry.get("date") else None
-                break
-
-        result = {
+        if len(self.store) == 0:
+            return _unavailable(country_code)
+        gdp = self.store.latest(country_code, GDP_PER_CAPITA)
+        indicators = []
+        for indicator in self.store.indicators:
+            found = self.store.latest(country_code, indicator)
+            if found is not None:
+                indicators.append({
+                    "indicator": indicator,
+                    "label": INDICATOR_LABELS.get(indicator),
+                    "value": found[0],
+                    "year": found[1],
+                })
+        return {
             "country_code": country_code,
-            "gdp_per_capita": gdp_value,
-            "gdp_year": gdp_year,
-            "available": gdp_value is not None,
+            "gdp_per_capita": gdp[0] if gdp else None,
+            "gdp_year": gdp[1] if gdp else None,
+            "available": gdp is not None,
+            "indicators": indicators,
+            **self._meta(),
+        }
+
+    async def get_series(self, country_code: str, indicator: str) -> dict:
+        """1国・1指標の年次の推移。"""
+        points = self.store.series(country_code, indicator)
+        return {
+            "country_code": country_code,
+            "indicator": indicator,
+            "label": INDICATOR_LABELS.get(indicator),
+            "points": points,
+            "available": bool(points),
+            **self._meta(),
+        }
+
+    async def compare(self, country_codes: list[str], indicator: str, year: int | None = None) -> dict:
+        """複数国の1指標を比較する（大きい順）。"""
+        return {
+            "indicator": indicator,
+            "label": INDICATOR_LABELS.get(indicator),
+            "year": year,
+            "results": self.store.compare(country_codes, indicator, year),
+            **self._meta(),
         }
-        _cache[cache_key] = (result, time.time())
+
+    async def cached_gdp_per_capita(self, country_codes: list[str]) -> dict[str, float]:
+        """取り込み済みの一人当たりGDPだけを返す（上流へはアクセスしない）。"""
+        result = {}
+        for code in country_codes:
+            found = self.store.latest(code, GDP_PER_CAPITA)
+            if found is not None:
+                result[code] = found[0]
         return result
+
+    async def refresh_all(self) -> int:
+        """全指標を取り込み直す（スケジューラ用）。取り込んだ国・地域の数を返す。"""
+        if not await self._ingest():
+            raise RuntimeError("World Bank の指標を取得できませんでした")
+        return len(self.store)
+
+    def _meta(self) -> dict:
+        updated_at = self.store.updated_at
+        return {
+            "fetched_at": datetime.fromtimestamp(updated_at, tz=timezone.utc) if updated_at else None,
+            "stale": self.store.stale,
+        }
+
+    async def _ingest(self) -> bool:
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        version = self.store.version
+        async with self._lock:
+            if self.store.version != version:
+                return True  # 待っている間に他の取り込みが終わった
+            last_year = date.today().year
+            first_year = last_year - settings.worldbank_years + 1
+            indicators = self.indicators
+            fetched = await asyncio.gather(
+                *[self._fetch_indicator(ind, first_year, last_year) for ind in indicators]
+            )
+            if any(rows is None for rows in fetched):
+                return False
+            self.store.ingest(dict(zip(indicators, fetched)), first_year, last_year)
+            if self.store.path:
+                await asyncio.to_thread(self.store.save, self.store.path)
+            return True
+
+    async def _fetch_indicator(
+        self, indicator: str, first_year: int, last_year: int
+    ) -> list[dict] | None:
+        """1指標の全ての国・年の値をページを辿って取得する。失敗時は None。"""
+        url = f"{self.BASE_URL}/all/indicator/{indicator}"
+        client = get_http_client()
+        rows: list[dict] = []
+        page, pages = 1, 1
+        while page <= pages:
+            params = {
+                "format": "json",
+                "date": f"{first_year}:{last_year}",
+                "per_page": _PER_PAGE,
+                "page": page,
+            }
+            try:
+                resp = await client.get(url, params=params)
+                resp.raise_for_status()
+                raw = resp.json()
+            except Exception:
+                return None
+            # World Bank は [metadata, data] の配列を返す
+            if not isinstance(raw, list) or len(raw) < 2:
+                return None
+            pages = int(raw[0].get("pages") or 1)
+            rows.extend(r for r in raw[1] or [] if (r.get("country") or {}).get("id"))
+            page += 1
+        return rows
+
+
+worldbank_store = IndicatorStore()
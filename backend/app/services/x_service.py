@@ -1,13 +1,13 @@
 """X（Twitter）API v2 を使った投稿取得サービス"""
 from __future__ import annotations
 import os
-import time
-from typing import Any
 
+from app.core.cache import get_cache
 from app.core.http_client import get_http_client
 
-_cache: dict[str, tuple[Any, float]] = {}
 _TTL = 1800  # 30分
+# キーはクエリパラメータ（username/limit）由来のため件数を小さく制限する
+_cache = get_cache("x_posts", ttl=_TTL, max_entries=64, hard_ttl=6 * 3600)
 
 
 class XService:
@@ -18,12 +18,14 @@ class XService:
         if not bearer_token:
             return []
 
-        cache_key = f"x_posts_{username}_{limit}"
-        if cache_key in _cache:
-            data, ts = _cache[cache_key]
-            if time.time() - ts < _TTL:
-                return data
+        posts = await _cache.get_or_fetch(
+            f"x_posts_{username}_{limit}",
+            lambda: self._fetch_posts(bearer_token, username, limit),
+        )
+        return posts if posts is not None else []
 
+    async def _fetch_posts(self, bearer_token: str, username: str, limit: int) -> list[dict] | None:
+        """ユーザーの最新投稿を取得する。失敗時は None。"""
         try:
             client = get_http_client()
             headers = {"Authorization": f"Bearer {bearer_token}"}
@@ -51,7 +53,7 @@ class XService:
             tweets_resp.raise_for_status()
             raw = tweets_resp.json()
         except Exception:
-            return []
+            return None
 
         tweets = raw.get("data", [])
         media_map: dict[str, str] = {}
@@ -76,5 +78,4 @@ class XService:
                 "retweet_count": metrics.get("retweet_count", 0),
             })
 
-        _cache[cache_key] = (result, time.time())
         return result
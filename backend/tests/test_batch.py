@@ -0,0 +1,160 @@
+"""複数国一括取得 API のテスト"""
+from unittest.mock import AsyncMock, Mock, patch
+
+from fastapi.testclient import TestClient
+
+from tests.conftest import MOCK_COUNTRY, MOCK_SAFETY
+
+FR = {**MOCK_COUNTRY, "code": "FR", "name": "France",
+      "currencies": [{"code": "EUR", "name": "Euro", "symbol": "€"}]}
+DE = {**MOCK_COUNTRY, "code": "DE", "name": "Germany",
+      "currencies": [{"code": "EUR", "name": "Euro", "symbol": "€"}]}
+US = {**MOCK_COUNTRY, "code": "US", "name": "United States",
+      "currencies": [{"code": "USD", "name": "Dollar", "symbol": "$"}]}
+_BY_CODE = {"JP": MOCK_COUNTRY, "FR": FR, "DE": DE, "US": US}
+
+
+def _get_countries():
+    async def get_countries(self, codes):
+        return {c: _BY_CODE.get(c) for c in codes}
+
+    return patch("app.services.restcountries.RestCountriesService.get_countries", get_countries)
+
+
+def _client_returning(payload):
+    resp = Mock()
+    resp.raise_for_status.return_value = None
+    resp.json.return_value = payload
+    client = Mock()
+    client.get = AsyncMock(return_value=resp)
+    return client
+
+
+def test_batch_economic_served_from_ingested_store(client: TestClient):
+    import numpy as np
+
+    from app.api import countries
+    from app.services.worldbank_service import IndicatorStore
+
+    store = IndicatorStore()
+    values = np.array([[[48000.0], [np.nan]], [[np.nan], [44000.0]]])
+    store.replace(["NY.GDP.PCAP.CD"], ["DE", "FR"], 2022, values)
+    http = Mock()
+    http.get = AsyncMock(side_effect=AssertionError("リクエスト中に取り込まない"))
+    with (
+        _get_countries(),
+        patch("app.services.worldbank_service.get_http_client", return_value=http),
+        patch.object(countries._wb_svc, "store", store),
+    ):
+        response = client.get("/api/batch/economic?codes=fr,DE,XX,FR")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["not_found"] == ["XX"]
+    assert data["results"]["FR"]["gdp_per_capita"] == 44000.0
+    assert data["results"]["DE"]["gdp_year"] == 2022
+    assert data["results"]["FR"]["fetched_at"] is not None
+    http.get.assert_not_awaited()
+
+
+def test_batch_exchange_served_from_one_rate_matrix(client: TestClient):
+    from app.services import exchange_service as ex
+
+    ex._cache.clear()
+    http = _client_returning(
+        {"base": "EUR", "date": "2024-01-02", "rates": {"JPY": 160.0, "USD": 1.1}}
+    )
+    with _get_countries(), patch("app.services.exchange_service.get_http_client", return_value=http):
+        response = client.get("/api/batch/exchange?codes=FR,DE,US")
+    data = response.json()
+    assert http.get.await_count == 1
+    assert data["results"]["FR"]["rates"] == [{"currency_code": "EUR", "rate": 0.00625}]
+    assert data["results"]["US"]["rates"] == [{"currency_code": "USD", "rate": 0.006875}]
+    ex._cache.clear()
+
+
+def test_batch_safety_keyed_results(client: TestClient):
+    async def safety_info(self, code):
+        return {**MOCK_SAFETY, "country_code": code.upper()}
+
+    with _get_countries(), patch(
+        "app.services.mofa_service.MofaSafetyService.get_safety_info", safety_info
+    ), patch(
+        "app.services.state_dept_service.StateDeptService.get_advisories",
+        AsyncMock(return_value={"JP": {"level": 0, "message": "情報なし"},
+                                "FR": {"level": 2, "message": "Exercise Increased Caution"}}),
+    ) as get_advisories:
+        response = client.get("/api/batch/safety?codes=JP,FR")
+    data = response.json()
+    assert set(data["results"]) == {"JP", "FR"}
+    assert data["results"]["FR"]["country_code"] == "FR"
+    # State Dept は索引の1回の参照でまとめて引く
+    assert get_advisories.await_count == 1
+    assert data["results"]["FR"]["level"] == 2
+
+
+def test_batch_safety_resolves_cca3_codes(client: TestClient):
+    async def get_countries(self, codes):
+        return {c: {"JPN": MOCK_COUNTRY, "FRA": FR}.get(c) for c in codes}
+
+    async def safety_info(self, code):
+        return {**MOCK_SAFETY, "country_code": code.upper(), "level": 3 if code == "FR" else 1}
+
+    with patch(
+        "app.services.restcountries.RestCountriesService.get_countries", get_countries
+    ), patch(
+        "app.services.mofa_service.MofaSafetyService.get_safety_info", safety_info
+    ), patch(
+        "app.services.state_dept_service.StateDeptService.get_advisories",
+        AsyncMock(return_value={"JP": {"level": 0, "message": "情報なし"},
+                                "FR": {"level": 2, "message": "Exercise Increased Caution"}}),
+    ) as get_advisories:
+        response = client.get("/api/batch/safety?codes=JPN,FRA,XXX")
+    data = response.json()
+    # 応答は指定されたコードで返し、上流へは解決後の ISO2 コードで問い合わせる
+    assert set(data["results"]) == {"JPN", "FRA"}
+    assert data["not_found"] == ["XXX"]
+    assert get_advisories.await_args.args[0] == ["JP", "FR"]
+    assert data["results"]["FRA"]["country_code"] == "FR"
+    assert data["results"]["FRA"]["level"] == 3
+    assert data["results"]["JPN"]["level"] == 1
+
+
+def test_batch_isolates_per_country_failures(client: TestClient):
+    async def get_exchange_info(self, code, currencies):
+        if code == "FR":
+            raise RuntimeError("boom")
+        return {"country_code": code, "base": "JPY", "rates": [], "available": True}
+
+    with _get_countries(), patch(
+        "app.services.exchange_service.ExchangeService.prefetch", AsyncMock()
+    ), patch(
+        "app.services.exchange_service.ExchangeService.get_exchange_info", get_exchange_info
+    ):
+        response = client.get("/api/batch/exchange?codes=JP,FR")
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert results["FR"] == {"country_code": "FR", "available": False, "error": "RuntimeError"}
+    assert results["JP"]["available"] is True
+
+
+def test_batch_climate_never_fetches_upstream(client: TestClient):
+    from app.services import climate_service as cs
+
+    cs._cache.clear()
+    fetch = AsyncMock(side_effect=AssertionError("リクエスト中に上流へ行かない"))
+    located = {**MOCK_COUNTRY, "latitude": 36.0, "longitude": 138.0}
+    with patch(
+        "app.services.restcountries.RestCountriesService.get_countries",
+        AsyncMock(return_value={"JP": located}),
+    ), patch.object(cs.ClimateService, "_fetch", fetch), patch.object(
+        cs.settings, "climate_refine_upstream", False
+    ):
+        data = client.get("/api/batch/climate?codes=JP").json()
+    assert data["results"]["JP"]["available"] is False
+    fetch.assert_not_awaited()
+
+
+def test_batch_rejects_empty_and_too_many_codes(client: TestClient):
+    assert client.get("/api/batch/safety?codes=,").status_code == 400
+    codes = ",".join(f"C{i}" for i in range(101))
+    assert client.get(f"/api/batch/climate?codes={codes}").status_code == 400
@@ -0,0 +1,126 @@
+"""国詳細 bundle API のテスト"""
+from unittest.mock import AsyncMock, patch
+
+from fastapi.testclient import TestClient
+
+from tests.conftest import MOCK_COUNTRY, MOCK_SAFETY
+
+MOCK_ADVISORY = {"country_code": "JP", "level": 1, "message": "情報なし"}
+
+
+def _patches(mofa: AsyncMock, get_country: AsyncMock | None = None):
+    return [
+        patch(
+            "app.services.restcountries.RestCountriesService.get_country",
+            get_country or AsyncMock(return_value=MOCK_COUNTRY),
+        ),
+        patch("app.services.mofa_service.MofaSafetyService.get_safety_info", mofa),
+        patch(
+            "app.services.state_dept_service.StateDeptService.get_advisory",
+            AsyncMock(return_value=MOCK_ADVISORY),
+        ),
+    ]
+
+
+def _get(client: TestClient, url: str, mofa: AsyncMock, get_country: AsyncMock | None = None):
+    patches = _patches(mofa, get_country)
+    for p in patches:
+        p.start()
+    try:
+        return client.get(url)
+    finally:
+        for p in patches:
+            p.stop()
+
+
+def test_bundle_returns_requested_sections(client: TestClient):
+    mofa = AsyncMock(return_value=MOCK_SAFETY)
+    get_country = AsyncMock(return_value=MOCK_COUNTRY)
+    response = _get(
+        client, "/api/countries/JP/bundle?sections=country,safety,entry", mofa, get_country
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert data["country_code"] == "JP"
+    assert list(data["sections"]) == ["country", "safety", "entry"]
+    for sec in data["sections"].values():
+        assert sec["status"] == "ok"
+        assert sec["elapsed_ms"] >= 0
+    assert data["sections"]["country"]["data"]["safety_level"] == 0
+    # State Dept の方が高いレベルなので統合結果は 1
+    assert data["sections"]["safety"]["data"]["level"] == 1
+    assert data["sections"]["entry"]["data"]["country_code"] == "JP"
+    # 国の解決と MOFA 取得はリクエスト内で1回だけ
+    assert get_country.await_count == 1
+    assert mofa.await_count == 1
+
+
+def test_bundle_mofa_failure_is_shared_by_sections(client: TestClient):
+    mofa = AsyncMock(side_effect=RuntimeError("down"))
+    response = _get(client, "/api/countries/JP/bundle?sections=country,safety", mofa)
+    sections = response.json()["sections"]
+    assert sections["country"]["data"]["safety_level"] is None
+    # 失敗した取得結果をそのまま渡し、安全セクションで取り直さない
+    assert sections["safety"]["status"] == "ok"
+    assert sections["safety"]["data"]["level"] == 1
+    assert mofa.await_count == 1
+
+
+def test_bundle_section_failure_is_isolated(client: TestClient):
+    mofa = AsyncMock(return_value=MOCK_SAFETY)
+    with patch(
+        "app.services.worldbank_service.WorldBankService.get_economic_info",
+        AsyncMock(side_effect=RuntimeError("down")),
+    ):
+        response = _get(client, "/api/countries/JP/bundle?sections=economic,entry", mofa)
+    data = response.json()
+    assert data["sections"]["economic"]["status"] == "error"
+    assert data["sections"]["economic"]["error"] == "RuntimeError"
+    assert data["sections"]["entry"]["status"] == "ok"
+
+
+def test_bundle_unknown_section_returns_400(client: TestClient):
+    response = _get(client, "/api/countries/JP/bundle?sections=safety,weather", AsyncMock())
+    assert response.status_code == 400
+
+
+def test_bundle_country_not_found(client: TestClient):
+    response = _get(
+        client, "/api/countries/XX/bundle", AsyncMock(), AsyncMock(return_value=None)
+    )
+    assert response.status_code == 404
+
+
+# ── ストリーミング ─────────────────────────────────────────────
+
+def test_stream_ndjson_emits_sections_as_they_complete(client: TestClient):
+    import asyncio
+    import json
+
+    async def slow_ai(self, code, name):
+        await asyncio.sleep(0.05)
+        return {"attractions": [], "best_season": "春", "travel_tips": []}
+
+    mofa = AsyncMock(return_value=MOCK_SAFETY)
+    with patch("app.services.ai_service.AIService.generate_attractions", slow_ai):
+        response = _get(client, "/api/countries/JP/stream?sections=ai,entry,safety", mofa)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    events = [json.loads(line) for line in response.text.splitlines()]
+    assert [e["section"] for e in events][-2:] == ["ai", "done"]
+    assert {e["section"] for e in events[:2]} == {"entry", "safety"}
+    assert events[-2]["data"]["best_season"] == "春"
+    assert all(e["status"] == "ok" for e in events[:-1])
+
+
+def test_stream_sse_format(client: TestClient):
+    mofa = AsyncMock(return_value=MOCK_SAFETY)
+    response = _get(client, "/api/countries/JP/stream?sections=entry&format=sse", mofa)
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert response.text.startswith("event: entry\ndata: {")
+    assert "event: done\n" in response.text
+
+
+def test_stream_rejects_bundle_only_section(client: TestClient):
+    response = _get(client, "/api/countries/JP/stream?sections=attractions", AsyncMock())
+    assert response.status_code == 400
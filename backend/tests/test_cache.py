@@ -0,0 +1,215 @@
+"""共通キャッシュ層のテスト"""
+import asyncio
+import time
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.cache import CacheNamespace, _background_tasks, cached, get_cache
+
+
+def test_get_returns_stored_value():
+    ns = CacheNamespace("t_basic", ttl=60)
+    ns.set("a", {"x": 1})
+    assert ns.get("a") == {"x": 1}
+    assert ns.hits == 1
+
+
+def test_get_miss_returns_default():
+    ns = CacheNamespace("t_miss", ttl=60)
+    assert ns.get("nope") is None
+    assert ns.get("nope", "d") == "d"
+    assert ns.misses == 2
+
+
+def test_version_changes_on_store_and_remove():
+    ns = CacheNamespace("t_version", ttl=60, max_entries=1)
+    ns.set("a", 1)
+    v = ns.version
+    ns.get("a")
+    assert ns.version == v
+    ns.set("b", 2)  # a は追い出される
+    assert ns.version == v + 2
+    ns.pop("b")
+    ns.clear()
+    assert ns.version == v + 4
+
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_share_one_tier_read():
+    ns = CacheNamespace("t_tier_flight", ttl=60, persist=True)
+
+    async def tier_get(namespace, key):
+        await asyncio.sleep(0.01)
+        return ({"v": 1}, time.time())
+
+    tier = AsyncMock()
+    tier.get = AsyncMock(side_effect=tier_get)
+    fetcher = AsyncMock(side_effect=AssertionError("上流へアクセスしてはいけない"))
+    with patch("app.core.cache._persistent_tier", tier):
+        results = await asyncio.gather(*[ns.fetch_entry("k", fetcher) for _ in range(5)])
+    assert [cv.value for cv in results] == [{"v": 1}] * 5
+    assert tier.get.await_count == 1
+    assert ns.misses == 5 and ns.hits == 0 and ns.tier_hits == 1
+
+
+@pytest.mark.asyncio
+async def test_fetch_on_miss_false_does_not_call_fetcher():
+    ns = CacheNamespace("t_no_fetch", ttl=60)
+    fetcher = AsyncMock(return_value={"v": 1})
+    assert await ns.fetch_entry("k", fetcher, fetch_on_miss=False) is None
+    fetcher.assert_not_awaited()
+    assert ns.misses == 1
+    assert (await ns.fetch_entry("k", fetcher)).value == {"v": 1}
+    assert (await ns.fetch_entry("k", fetcher, fetch_on_miss=False)).value == {"v": 1}
+    assert ns.hits == 1 and ns.misses == 2
+
+
+def test_expired_entry_is_miss():
+    ns = CacheNamespace("t_expire", ttl=10)
+    with patch("app.core.cache.time.time", return_value=1000.0):
+        ns.set("a", 1)
+    with patch("app.core.cache.time.time", return_value=1011.0):
+        assert ns.get("a") is None
+    assert ns.expirations == 1
+    assert len(ns) == 0
+
+
+def test_lru_eviction_by_entry_count():
+    ns = CacheNamespace("t_lru", ttl=60, max_entries=2)
+    ns.set("a", 1)
+    ns.set("b", 2)
+    ns.get("a")  # a を最近使用に
+    ns.set("c", 3)
+    assert "a" in ns
+    assert "b" not in ns
+    assert "c" in ns
+    assert ns.evictions == 1
+
+
+def test_eviction_by_bytes():
+    ns = CacheNamespace("t_bytes", ttl=60, max_bytes=2000)
+    ns.set("a", "x" * 800)
+    ns.set("b", "y" * 800)
+    ns.set("c", "z" * 800)
+    assert "a" not in ns
+    assert ns.stats()["bytes"] <= 2000
+
+
+def test_get_cache_returns_same_namespace():
+    assert get_cache("t_registry", ttl=5) is get_cache("t_registry", ttl=99)
+
+
+@pytest.mark.asyncio
+async def test_cached_decorator():
+    ns = CacheNamespace("t_decorator", ttl=60)
+    calls = []
+
+    @cached(ns, key=lambda code: code.upper())
+    async def fetch(code: str) -> dict:
+        calls.append(code)
+        return {"code": code}
+
+    assert await fetch("jp") == {"code": "jp"}
+    assert await fetch("JP") == {"code": "jp"}
+    assert calls == ["jp"]
+
+
+def test_cache_stats_endpoint(client: TestClient):
+    get_cache("t_endpoint", ttl=60).set("k", 1)
+    response = client.get("/api/system/cache")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["namespaces"]["t_endpoint"]["entries"] == 1
+    assert "restcountries" in data["namespaces"]
+    assert data["persistent"] is None  # DATA_DIR 未設定時は永続層なし
+
+
+# ── stale-while-revalidate ─────────────────────────────────────
+
+@pytest.mark.asyncio
+async def test_stale_value_returned_and_refreshed_in_background():
+    import asyncio
+
+    ns = CacheNamespace("t_swr", ttl=10, hard_ttl=100)
+    with patch("app.core.cache.time.time", return_value=1000.0):
+        ns.set("k", "old")
+
+    refreshed = asyncio.Event()
+
+    async def fetch():
+        refreshed.set()
+        return "new"
+
+    with patch("app.core.cache.time.time", return_value=1050.0):
+        cv = await ns.fetch_entry("k", fetch)
+        assert cv.value == "old"
+        assert cv.stale is True
+        assert cv.fetched_at == 1000.0
+        await asyncio.wait_for(refreshed.wait(), 1)
+        await asyncio.sleep(0)
+        cv = await ns.fetch_entry("k", fetch)
+    assert cv.value == "new"
+    assert cv.stale is False
+    assert ns.stale_hits == 1
+
+
+@pytest.mark.asyncio
+async def test_stale_refresh_failure_keeps_old_value():
+    import asyncio
+
+    ns = CacheNamespace("t_swr_fail", ttl=10, hard_ttl=100)
+    with patch("app.core.cache.time.time", return_value=1000.0):
+        ns.set("k", "old")
+
+    async def boom():
+        raise RuntimeError("upstream down")
+
+    with patch("app.core.cache.time.time", return_value=1050.0):
+        cv = await ns.fetch_entry("k", boom)
+        await asyncio.gather(*_background_tasks)
+        assert ns.refresh_failures == 1
+        cv = await ns.fetch_entry("k", boom)
+    assert cv.value == "old"
+
+
+@pytest.mark.asyncio
+async def test_hard_expired_value_blocks_on_fetch():
+    ns = CacheNamespace("t_swr_hard", ttl=10, hard_ttl=100)
+    with patch("app.core.cache.time.time", return_value=1000.0):
+        ns.set("k", "old")
+
+    async def fetch():
+        return "new"
+
+    with patch("app.core.cache.time.time", return_value=1200.0):
+        cv = await ns.fetch_entry("k", fetch)
+    assert cv.value == "new"
+    assert cv.stale is False
+    assert ns.expirations == 1
+
+
+def test_get_does_not_return_stale_value():
+    ns = CacheNamespace("t_swr_get", ttl=10, hard_ttl=100)
+    with patch("app.core.cache.time.time", return_value=1000.0):
+        ns.set("k", "old")
+    with patch("app.core.cache.time.time", return_value=1050.0):
+        assert ns.get("k") is None
+    assert len(ns) == 1
+
+
+@pytest.mark.asyncio
+async def test_service_response_carries_freshness_metadata():
+    from datetime import datetime, timezone
+
+    import numpy as np
+
+    from app.services.worldbank_service import IndicatorStore, WorldBankService
+
+    store = IndicatorStore()
+    store.replace(["NY.GDP.PCAP.CD"], ["ZZ"], 2023, np.array([[[1.0]]]), updated_at=1000.0)
+    result = await WorldBankService(store).get_economic_info("ZZ")
+    # キャッシュ由来の応答と同じく UTC の datetime
+    assert result["fetched_at"] == datetime.fromtimestamp(1000.0, tz=timezone.utc)
+    assert result["stale"] is True
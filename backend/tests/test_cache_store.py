@@ -0,0 +1,93 @@
+"""SQLite 永続キャッシュ層のテスト"""
+import array
+import time
+from unittest.mock import patch
+
+import pytest
+
+from app.core import cache
+from app.core.cache import CacheNamespace
+from app.core.cache_store import (
+    SqliteCacheStore,
+    decode_value,
+    encode_value,
+    warm_from_store,
+)
+
+
+def test_encode_roundtrip_with_array():
+    value = {"name": "日本", "rates": array.array("d", [1.5, 2.5]), "tags": ["a"]}
+    decoded = decode_value(encode_value(value))
+    assert decoded["name"] == "日本"
+    assert decoded["rates"] == array.array("d", [1.5, 2.5])
+    assert decoded["tags"] == ["a"]
+
+
+@pytest.mark.asyncio
+async def test_write_behind_flush_and_reload(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    store = SqliteCacheStore(path)
+    store.put("t_store_ns", "JP", {"level": 1}, 1000.0)
+    assert store.stats()["rows"] == 0  # flush 前は未書き込み
+    assert await store.flush() == 1
+    store.close()
+
+    reopened = SqliteCacheStore(path)
+    assert reopened.load_all() == [("t_store_ns", "JP", {"level": 1}, 1000.0)]
+    reopened.close()
+
+
+@pytest.mark.asyncio
+async def test_get_returns_pending_write_before_flush(tmp_path):
+    store = SqliteCacheStore(str(tmp_path / "c.sqlite3"))
+    store.put("ns", "k", [1, 2], 5.0)
+    assert await store.get("ns", "k") == ([1, 2], 5.0)
+    store.close()
+
+
+@pytest.mark.asyncio
+async def test_prune_drops_oldest_rows_over_cap(tmp_path):
+    store = SqliteCacheStore(str(tmp_path / "c.sqlite3"), max_bytes=300)
+    for i in range(20):
+        store.put("ns", f"k{i}", {"payload": str(i) * 40 + "x" * i}, float(i))
+    await store.flush()
+    stats = store.stats()
+    assert stats["bytes"] <= 300
+    assert stats["pruned"] > 0
+    keys = {row[1] for row in store.load_all()}
+    assert "k19" in keys and "k0" not in keys
+    store.close()
+
+
+def test_warm_from_store_restores_fresh_entries_only(tmp_path):
+    ns = cache.get_cache("t_store_warm", ttl=60, hard_ttl=120, persist=True)
+    ns.clear()
+    store = SqliteCacheStore(str(tmp_path / "c.sqlite3"))
+    now = time.time()
+    store._write({
+        ("t_store_warm", "fresh"): ("a", now - 10),
+        ("t_store_warm", "stale"): ("b", now - 90),
+        ("t_store_warm", "dead"): ("c", now - 500),
+    })
+    assert warm_from_store(store) >= 2
+    assert ns.get("fresh") == "a"
+    assert ns.get("stale") is None  # ソフト TTL 切れ（stale 配信対象）
+    assert len(ns) == 2
+    store.close()
+
+
+@pytest.mark.asyncio
+async def test_namespace_reads_through_and_writes_to_store(tmp_path):
+    store = SqliteCacheStore(str(tmp_path / "c.sqlite3"))
+    ns = CacheNamespace("t_store_rt", ttl=60, persist=True)
+    with patch("app.core.cache._persistent_tier", store):
+        ns.set("k", {"v": 1})
+        await store.flush()
+        ns.clear()
+
+        async def never():
+            raise AssertionError("上流へアクセスしてはいけない")
+
+        assert await ns.get_or_fetch("k", never) == {"v": 1}
+    assert ns.tier_hits == 1
+    store.close()
@@ -0,0 +1,117 @@
+"""気候の平年値計算のテスト"""
+import math
+from array import array
+from datetime import date, timedelta
+from unittest.mock import AsyncMock, Mock, patch
+
+import numpy as np
+import pytest
+
+from app.services import climate_service as cs
+from app.services.climate_service import FIELDS, ClimateService, compute_normals, expand_normals
+
+
+def _daily(start: date, end: date, tmax, tmin, precip) -> dict:
+    """日付ごとに関数で値を決めた Open-Meteo 形式の daily を作る。"""
+    days = [start + timedelta(days=i) for i in range((end - start).days + 1)]
+    return {
+        "time": [d.isoformat() for d in days],
+        "temperature_2m_max": [tmax(d) for d in days],
+        "temperature_2m_min": [tmin(d) for d in days],
+        "precipitation_sum": [precip(d) for d in days],
+    }
+
+
+def _month(normals: np.ndarray, month: int) -> dict:
+    return dict(zip(FIELDS, normals[month - 1]))
+
+
+def test_normals_average_across_years():
+    # 最高気温は年ごとに 20, 22, 24 度、1月は毎日 2mm・それ以外は奇数日だけ 1mm
+    daily = _daily(
+        date(2021, 1, 1), date(2023, 12, 31),
+        tmax=lambda d: 20.0 + 2 * (d.year - 2021),
+        tmin=lambda d: 10.0,
+        precip=lambda d: 2.0 if d.month == 1 else (1.0 if d.day % 2 else 0.0),
+    )
+    normals, years = compute_normals(daily["time"], daily)
+    assert years == 3
+    jan = _month(normals, 1)
+    assert jan["temp_max"] == pytest.approx(22.0)
+    assert jan["temp_min"] == pytest.approx(10.0)
+    assert jan["precipitation"] == pytest.approx(62.0)
+    assert jan["rainy_days"] == pytest.approx(31.0)
+    assert jan["temp_max_p90"] == pytest.approx(24.0)
+    assert jan["temp_min_p10"] == pytest.approx(10.0)
+    apr = _month(normals, 4)
+    assert apr["rainy_days"] == pytest.approx(15.0)
+    assert apr["precipitation"] == pytest.approx(15.0)
+
+
+def test_missing_year_and_sparse_months_are_skipped():
+    def tmax(d):
+        if d.year == 2022:
+            return None  # 1年まるごと欠測
+        if d.year == 2023 and d.month == 3 and d.day > 10:
+            return None  # 3月は3分の1しかない → その年の3月は除外
+        return 30.0 if d.year == 2021 else 20.0
+
+    daily = _daily(date(2021, 1, 1), date(2023, 12, 31), tmax, lambda d: 5.0, lambda d: 0.0)
+    normals, years = compute_normals(daily["time"], daily)
+    assert years == 2
+    assert _month(normals, 1)["temp_max"] == pytest.approx(25.0)
+    assert _month(normals, 3)["temp_max"] == pytest.approx(30.0)
+    assert _month(normals, 3)["rainy_days"] == 0.0
+
+
+def test_precipitation_is_scaled_for_missing_days():
+    # 30日中27日分だけ 1mm（欠測は 10% なので集計に使い、月合計は 30mm に補正）
+    daily = _daily(
+        date(2023, 1, 1), date(2023, 12, 31),
+        tmax=lambda d: 25.0, tmin=lambda d: 15.0,
+        precip=lambda d: None if (d.month == 6 and d.day > 27) else 1.0,
+    )
+    normals, _ = compute_normals(daily["time"], daily)
+    assert _month(normals, 6)["precipitation"] == pytest.approx(30.0)
+    assert _month(normals, 6)["rainy_days"] == pytest.approx(30.0)
+
+
+def test_no_temperature_data_returns_none():
+    daily = _daily(date(2023, 1, 1), date(2023, 12, 31), lambda d: None, lambda d: None, lambda d: None)
+    assert compute_normals(daily["time"], daily) is None
+    assert compute_normals([], {}) is None
+
+
+def test_expand_normals_rounds_and_maps_nan_to_none():
+    normals = np.arange(12 * len(FIELDS), dtype=np.float32) + 0.04
+    normals[len(FIELDS)] = np.nan
+    monthly = expand_normals(array("f", normals.tobytes()))
+    assert [m["month"] for m in monthly] == list(range(1, 13))
+    assert monthly[0]["temp_max"] == 0.0
+    assert monthly[0]["temp_min"] == 1.0
+    assert monthly[1]["temp_max"] is None
+    assert not any(isinstance(v, float) and math.isnan(v) for m in monthly for v in m.values())
+
+
+@pytest.mark.asyncio
+async def test_get_climate_requests_ten_years_and_caches_array():
+    cs._cache.clear()
+    end = date.today().year - 1
+    daily = _daily(date(end - 9, 1, 1), date(end, 12, 31), lambda d: 28.0, lambda d: 20.0, lambda d: 3.0)
+    resp = Mock()
+    resp.raise_for_status.return_value = None
+    resp.json.return_value = {"daily": daily}
+    client = Mock()
+    client.get = AsyncMock(return_value=resp)
+    with patch("app.services.climate_service.get_http_client", return_value=client):
+        result = await ClimateService().get_climate("TH", 13.7, 100.5)
+        await ClimateService().get_climate("TH", 13.7, 100.5)
+    params = client.get.await_args.kwargs["params"]
+    assert (params["start_date"], params["end_date"]) == (f"{end - 9}-01-01", f"{end}-12-31")
+    assert client.get.await_count == 1
+    assert result["available"] is True
+    assert (result["period_start"], result["period_end"], result["years"]) == (end - 9, end, 10)
+    assert result["monthly"][0]["precipitation"] == 93.0
+    assert result["monthly"][0]["rainy_days"] == 31.0
+    assert cs._cache.get("climate_normals_TH")["normals"].typecode == "f"
+    cs._cache.clear()
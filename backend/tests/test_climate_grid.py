@@ -0,0 +1,182 @@
+"""気候平年値グリッドのテスト"""
+import asyncio
+import time
+from array import array
+from unittest.mock import AsyncMock, patch
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from app.services import climate_service as cs
+from app.services.climate_grid import ClimateGrid, build_grid, climate_grid, main
+from app.services.climate_service import ClimateService
+
+
+def _rows():
+    # バンコク付近（10° グリッドのセル (10..20N, 100..110E)）と、経度 175E のセル
+    for month in range(1, 13):
+        yield (13.75, 100.5, month, 30.0 + month / 10, 24.0, 10.0 * month, 3.0)
+        yield (16.0, 104.0, month, 32.0 + month / 10, 24.0, 10.0 * month, None)
+        yield (-40.0, 175.0, month, 15.0, 8.0, 100.0, 12.0)
+
+
+@pytest.fixture
+def grid_path(tmp_path):
+    path = str(tmp_path / "grid" / "climate.npy")
+    assert build_grid(_rows(), path, resolution=10.0) == 2
+    return path
+
+
+def test_build_and_lookup(grid_path):
+    grid = ClimateGrid(grid_path)
+    assert grid.available and grid.resolution == 10.0
+    data = np.load(grid_path, mmap_mode="r")
+    assert data.shape == (18, 36, 12, 4) and data.dtype == np.float16
+    values = grid.lookup(13.0, 101.0)
+    # 同じセルの2点は平均し、片方にしかない項目はある方の値になる
+    assert values[0, 0] == pytest.approx(31.1, abs=0.05)
+    assert values[11, 2] == pytest.approx(120.0)
+    assert values[0, 3] == pytest.approx(3.0)
+    monthly = grid.monthly(13.0, 101.0)
+    assert monthly[6] == {"month": 7, "temp_max": 31.7, "temp_min": 24.0, "precipitation": 70.0, "rainy_days": 3.0}
+
+
+def test_lookup_uses_nearby_cell_and_wraps_longitude(grid_path):
+    grid = ClimateGrid(grid_path)
+    # 隣のセル（海上）からは近くのデータのあるセルを使う
+    assert grid.lookup(22.0, 95.0)[0, 0] == pytest.approx(31.1, abs=0.05)
+    # 日付変更線をまたいだ -175° からも 175E のセルが見つかる
+    assert grid.lookup(-40.0, -175.0)[0, 1] == pytest.approx(8.0)
+    # 周囲にもデータがなければ None
+    assert grid.lookup(60.0, -40.0) is None
+    assert grid.stats()["misses"] == 1
+
+
+def test_missing_or_invalid_file_is_unavailable(tmp_path):
+    assert ClimateGrid("").lookup(0, 0) is None
+    assert ClimateGrid(str(tmp_path / "none.npy")).available is False
+    bad = tmp_path / "bad.npy"
+    np.save(bad, np.zeros((3, 3)))
+    assert ClimateGrid(str(bad)).available is False
+
+
+def test_cli_builds_from_csv(tmp_path, capsys):
+    csv_path = tmp_path / "normals.csv"
+    lines = ["lat,lon,month,temp_max,temp_min,precipitation,rainy_days"]
+    lines += [f"35.7,139.7,{m},{10 + m},{m},100,8" for m in range(1, 13)]
+    lines.append("35.7,139.7,1,,,,")
+    csv_path.write_text("\n".join(lines) + "\n")
+    out = tmp_path / "grid.npy"
+    main([str(csv_path), str(out), "--resolution", "0.5"])
+    assert "1 cells" in capsys.readouterr().out
+    assert ClimateGrid(str(out)).lookup(35.7, 139.7)[7, 0] == pytest.approx(18.0)
+
+
+@pytest.mark.asyncio
+async def test_service_answers_from_grid_and_refines_in_background(grid_path):
+    cs._cache.clear()
+    climate_grid.open(grid_path)
+    fetch = AsyncMock(return_value=None)
+    try:
+        with patch.object(ClimateService, "_fetch", fetch):
+            result = await ClimateService().get_climate("TH", 13.75, 100.5)
+            assert result["source"] == "grid"
+            assert result["monthly"][0]["temp_max"] == 31.1
+            await asyncio.gather(*cs._refine_tasks)
+            fetch.assert_awaited_once_with(13.75, 100.5)
+            # グリッドにない国は従来どおり上流に取りに行く
+            assert (await ClimateService().get_climate("GL", 60.0, -40.0))["available"] is False
+            assert fetch.await_count == 2
+    finally:
+        climate_grid.open("")
+        cs._cache.clear()
+
+
+@pytest.mark.asyncio
+async def test_points_never_fetch_on_request_and_use_own_namespace():
+    cs._cache.clear()
+    cs._point_cache.clear()
+    value = {"normals": array("f", [20.0] * 12 * len(cs.FIELDS)),
+             "period_start": "2014-01-01", "period_end": "2023-12-31", "years": 10}
+    fetch = AsyncMock(return_value=value)
+    try:
+        with patch.object(ClimateService, "_fetch", fetch):
+            svc = ClimateService()
+            # グリッドがなく精緻化も無効なら、上流へは行かずに available: False
+            assert (await svc.get_point_climate(60.0, -40.0))["available"] is False
+            fetch.assert_not_awaited()
+            # 精緻化を有効にすると裏で取得し、次回から地点用の名前空間から返す
+            with patch.object(cs.settings, "climate_refine_points", True):
+                assert (await svc.get_point_climate(60.0, -40.0))["available"] is False
+                await asyncio.gather(*cs._refine_tasks)
+            result = await svc.get_point_climate(60.1, -40.1)
+        assert result["source"] == "archive"
+        fetch.assert_awaited_once_with(60.0, -40.0)
+        assert len(cs._cache) == 0 and len(cs._point_cache) == 1
+        assert cs._point_cache.max_entries < cs._cache.max_entries
+    finally:
+        cs._point_cache.clear()
+
+
+@pytest.mark.asyncio
+async def test_stale_upstream_normals_win_over_grid_and_revalidate(grid_path):
+    cs._cache.clear()
+    climate_grid.open(grid_path)
+    value = {"normals": array("f", [20.0] * 12 * len(cs.FIELDS)),
+             "period_start": "2014-01-01", "period_end": "2023-12-31", "years": 10}
+    cs._cache.restore(cs._key("TH"), value, time.time() - cs._TTL - 60)
+    fetch = AsyncMock(return_value=value)
+    try:
+        stale_hits, misses = cs._cache.stale_hits, cs._cache.misses
+        with patch.object(ClimateService, "_fetch", fetch):
+            result = await ClimateService().get_climate("TH", 13.75, 100.5)
+            assert result["source"] == "archive" and result["stale"] is True
+            # 1回の参照は統計にも1回だけ数える
+            assert (cs._cache.stale_hits, cs._cache.misses) == (stale_hits + 1, misses)
+            await asyncio.sleep(0)
+            await asyncio.sleep(0)
+        fetch.assert_awaited_once_with(13.75, 100.5)
+    finally:
+        climate_grid.open("")
+        cs._cache.clear()
+
+
+@pytest.mark.asyncio
+async def test_refinement_is_bounded_and_off_for_points(grid_path):
+    cs._cache.clear()
+    climate_grid.open(grid_path)
+    release = asyncio.Event()
+
+    async def fetch(self, lat, lon):
+        await release.wait()
+        return None
+
+    try:
+        with patch.object(ClimateService, "_fetch", fetch), \
+                patch.object(cs.settings, "climate_refine_concurrency", 2):
+            svc = ClimateService()
+            # 任意の地点は既定では精緻化しない
+            assert (await svc.get_point_climate(13.75, 100.5))["source"] == "grid"
+            assert not cs._refine_tasks
+            for code in ("TH", "LA", "KH", "MM"):
+                await svc.get_climate(code, 13.75, 100.5)
+            assert len(cs._refine_tasks) == 2
+            release.set()
+            await asyncio.gather(*cs._refine_tasks)
+        assert not cs._refining
+    finally:
+        climate_grid.open("")
+        cs._cache.clear()
+
+
+def test_point_endpoint(client: TestClient, grid_path):
+    climate_grid.open(grid_path)
+    try:
+        data = client.get("/api/climate?lat=13.75&lon=100.5").json()
+        assert data["latitude"] == 13.75 and data["source"] == "grid"
+        assert len(data["monthly"]) == 12
+        assert client.get("/api/climate?lat=91&lon=0").status_code == 422
+        assert client.get("/api/climate/grid").json()["resolution"] == 10.0
+    finally:
+        climate_grid.open("")
@@ -156,3 +156,35 @@ def test_get_countries_with_region_and_safety_level_filter(client: TestClient):
         assert len(data) == 1
         assert data[0]["code"] == "JP"
 
+
+def test_list_does_not_write_levels_into_shared_index(client: TestClient):
+    from app.services import restcountries as rc_module
+    import app.api.countries as countries_module
+
+    shared = [{**MOCK_COUNTRY, "cca3": "JPN"}]
+    rc_module._cache.set("all_countries", shared)
+    try:
+        with patch.object(countries_module, "_safety_cache", {"JP": 2}):
+            assert client.get("/api/countries").json()[0]["safety_level"] == 2
+        assert "safety_level" not in shared[0]
+    finally:
+        rc_module._cache.pop("all_countries")
+
+
+def test_suggest_endpoint_returns_slim_payload(client: TestClient):
+    from app.services import restcountries as rc_module
+
+    rc_module._cache.set("all_countries", [{**MOCK_COUNTRY, "cca3": "JPN"}])
+    response = client.get("/api/countries/suggest?prefix=jap")
+    rc_module._cache.pop("all_countries")
+    assert response.status_code == 200
+    data = response.json()
+    assert data == [
+        {"code": "JP", "name": "Japan", "name_ja": "日本", "flag_emoji": MOCK_COUNTRY["flag_emoji"]}
+    ]
+
+
+def test_suggest_endpoint_empty_prefix(client: TestClient):
+    response = client.get("/api/countries/suggest?prefix=")
+    assert response.status_code == 200
+    assert response.json() == []
@@ -0,0 +1,112 @@
+"""国名検索インデックスのテスト"""
+import time
+
+from app.services.country_search import CountrySearchIndex, CountryTrie, normalize
+from app.services.restcountries import NAME_JA_MAP
+
+COUNTRIES = [
+    {"code": "JP", "cca3": "JPN", "name": "Japan", "name_ja": "日本", "capital": "Tokyo",
+     "population": 125_000_000},
+    {"code": "FR", "cca3": "FRA", "name": "France", "name_ja": "フランス", "capital": "Paris",
+     "population": 67_000_000},
+    {"code": "US", "cca3": "USA", "name": "United States", "name_ja": "アメリカ合衆国",
+     "capital": "Washington, D.C.", "population": 330_000_000},
+    {"code": "GB", "cca3": "GBR", "name": "United Kingdom", "name_ja": "イギリス",
+     "capital": "London", "population": 67_000_000},
+    {"code": "CI", "cca3": "CIV", "name": "Ivory Coast", "name_ja": "コートジボワール",
+     "capital": "Yamoussoukro", "population": 26_000_000},
+    {"code": "CW", "cca3": "CUW", "name": "Curaçao", "name_ja": "キュラソー",
+     "capital": "Willemstad", "population": 155_000},
+    {"code": "PA", "cca3": "PAN", "name": "Panama", "name_ja": "パナマ",
+     "capital": "Panama City", "population": 4_300_000},
+]
+
+
+def _codes(results):
+    return [c["code"] for c in results]
+
+
+def test_normalize_folds_width_kana_and_accents():
+    assert normalize("ＪＡＰＡＮ") == "japan"
+    assert normalize("ふらんす") == "フランス"
+    assert normalize("ﾌﾗﾝｽ") == "フランス"
+    assert normalize("Curaçao") == "curacao"
+    assert normalize("コート・ジボワール") == "コート ジボワール"
+
+
+def test_exact_code_ranks_first():
+    index = CountrySearchIndex(COUNTRIES)
+    assert _codes(index.search("jp"))[0] == "JP"
+    assert _codes(index.search("FRA"))[0] == "FR"
+
+
+def test_prefix_beats_substring():
+    index = CountrySearchIndex(COUNTRIES)
+    # "pan" は Panama の前方一致、Japan の部分一致
+    assert _codes(index.search("pan")) == ["PA", "JP"]
+
+
+def test_japanese_and_hiragana_queries():
+    index = CountrySearchIndex(COUNTRIES)
+    assert _codes(index.search("日本")) == ["JP"]
+    assert _codes(index.search("ふらん"))[0] == "FR"
+    assert _codes(index.search("ジボワール")) == ["CI"]
+
+
+def test_word_prefix_and_capital():
+    index = CountrySearchIndex(COUNTRIES)
+    assert _codes(index.search("united")) == ["US", "GB"]  # 同点は人口順
+    assert _codes(index.search("king"))[0] == "GB"
+    assert _codes(index.search("tokyo")) == ["JP"]
+
+
+def test_fuzzy_match_tolerates_typos():
+    index = CountrySearchIndex(COUNTRIES)
+    assert _codes(index.search("frnace"))[0] == "FR"
+    assert _codes(index.search("curacao")) == ["CW"]
+
+
+def test_limit_and_empty_query():
+    index = CountrySearchIndex(COUNTRIES)
+    assert len(index.search("an", limit=2)) == 2
+    assert index.search("   ") == []
+    assert index.search("zzzz") == []
+
+
+def test_search_is_fast_on_full_country_list():
+    countries = [
+        {"code": code, "cca3": code + "X", "name": f"Country {code} {name}",
+         "name_ja": name, "capital": f"Capital {code}", "population": i}
+        for i, (code, name) in enumerate(NAME_JA_MAP.items())
+    ]
+    index = CountrySearchIndex(countries)
+    queries = ["ja", "フラ", "country", "capital z", "xyzw", "あめりか"]
+    start = time.perf_counter()
+    for _ in range(50):
+        for q in queries:
+            index.search(q)
+    per_query = (time.perf_counter() - start) / (50 * len(queries))
+    assert per_query < 0.001
+
+
+# ── 入力補完トライ ─────────────────────────────────────────────
+
+def test_trie_suggest_prefix_ranked_by_population():
+    trie = CountryTrie(COUNTRIES)
+    assert _codes(trie.suggest("uni")) == ["US", "GB"]
+    assert _codes(trie.suggest("ｊａ")) == ["JP"]
+    assert _codes(trie.suggest("ふら")) == ["FR"]
+
+
+def test_trie_suggest_prefers_exact_term_and_matches_words():
+    trie = CountryTrie(COUNTRIES)
+    assert _codes(trie.suggest("pa"))[0] == "PA"
+    assert _codes(trie.suggest("coast")) == ["CI"]
+    assert _codes(trie.suggest("usa")) == ["US"]
+
+
+def test_trie_suggest_limit_and_no_match():
+    trie = CountryTrie(COUNTRIES)
+    assert len(trie.suggest("u", limit=1)) == 1
+    assert trie.suggest("xyz") == []
+    assert trie.suggest("") == []
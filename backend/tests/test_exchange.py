@@ -0,0 +1,80 @@
+"""為替レート表・換算 API のテスト"""
+from unittest.mock import AsyncMock, Mock, patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.services import exchange_service as ex
+from app.services.exchange_service import ExchangeMatrix, ExchangeService
+
+PAYLOAD = {"amount": 1.0, "base": "EUR", "date": "2024-01-02",
+           "rates": {"JPY": 160.0, "USD": 1.1, "THB": 38.0}}
+
+
+def _http(payload=PAYLOAD):
+    resp = Mock()
+    resp.raise_for_status.return_value = None
+    resp.json.return_value = payload
+    client = Mock()
+    client.get = AsyncMock(return_value=resp)
+    return patch("app.services.exchange_service.get_http_client", return_value=client), client
+
+
+def test_matrix_derives_any_pair():
+    matrix = ExchangeMatrix.from_payload(PAYLOAD)
+    assert matrix.currencies == ["EUR", "JPY", "THB", "USD"]
+    assert matrix.rate("EUR", "JPY") == 160.0
+    assert matrix.rate("JPY", "EUR") == 0.00625
+    assert matrix.rate("USD", "THB") == 34.5455
+    assert matrix.rate("JPY", "XXX") is None
+    assert matrix.convert(1000, "JPY", "USD") == 6.875
+    # キャッシュ保存形式から戻しても同じ
+    assert ExchangeMatrix.from_value(matrix.to_value()).rate("THB", "JPY") == matrix.rate("THB", "JPY")
+
+
+@pytest.mark.asyncio
+async def test_every_country_uses_one_upstream_call():
+    ex._cache.clear()
+    patcher, client = _http()
+    with patcher:
+        svc = ExchangeService()
+        th = await svc.get_exchange_info("TH", ["THB"])
+        jp = await svc.get_exchange_info("JP", ["JPY"])
+        pa = await svc.get_exchange_info("PA", ["PAB", "USD"])
+    assert client.get.await_count == 1
+    assert th["rates"] == [{"currency_code": "THB", "rate": 0.2375}]
+    assert jp["base"] == "USD" and jp["rates"] == [{"currency_code": "JPY", "rate": 145.455}]
+    # 未対応の通貨は除外する
+    assert pa["rates"] == [{"currency_code": "USD", "rate": 0.006875}]
+    ex._cache.clear()
+
+
+@pytest.mark.asyncio
+async def test_fetch_failure_is_unavailable():
+    ex._cache.clear()
+    client = Mock()
+    client.get = AsyncMock(side_effect=RuntimeError("down"))
+    with patch("app.services.exchange_service.get_http_client", return_value=client):
+        info = await ExchangeService().get_exchange_info("TH", ["THB"])
+    assert info["available"] is False
+
+
+def test_convert_endpoint(client: TestClient):
+    ex._cache.clear()
+    patcher, _ = _http()
+    body = {"conversions": [
+        {"amount": 1000, "from": "jpy", "to": "THB"},
+        {"amount": 5, "from": "USD", "to": "XXX"},
+    ]}
+    with patcher:
+        response = client.post("/api/exchange/convert", json=body)
+    assert response.status_code == 200
+    data = response.json()
+    assert data["date"] == "2024-01-02"
+    assert data["results"][0] == {
+        "amount": 1000.0, "from": "JPY", "to": "THB", "rate": 0.2375, "result": 237.5, "error": None
+    }
+    assert data["results"][1]["result"] is None
+    assert "XXX" in data["results"][1]["error"]
+    assert client.post("/api/exchange/convert", json={"conversions": []}).status_code == 422
+    ex._cache.clear()
@@ -0,0 +1,137 @@
+"""為替レート日次履歴ストアのテスト"""
+import math
+from datetime import date
+from unittest.mock import AsyncMock, Mock, patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.services.fx_history import FxHistory
+from tests.conftest import MOCK_COUNTRY
+
+SERIES = {
+    "base": "EUR",
+    "start_date": "2024-01-01",
+    "end_date": "2024-01-05",
+    "rates": {
+        "2024-01-02": {"JPY": 160.0, "THB": 38.0, "USD": 1.10},
+        "2024-01-03": {"JPY": 150.0, "THB": 38.0, "USD": 1.20},
+        "2024-01-04": {"JPY": 155.0, "THB": 38.0, "USD": 1.00},
+        "2024-01-05": {"JPY": 158.0, "THB": 38.0, "USD": 1.05},
+    },
+}
+
+
+def _store() -> FxHistory:
+    store = FxHistory(max_days=30)
+    store.append(SERIES)
+    return store
+
+
+def test_append_skips_known_days_and_backfills_new_currency():
+    store = _store()
+    assert len(store) == 4
+    assert store.append(SERIES) == 0
+    added = store.append({"rates": {
+        "2024-01-05": {"JPY": 999.0},
+        "2024-01-08": {"JPY": 157.0, "THB": 38.5, "USD": 1.05, "VND": 27000.0},
+    }})
+    assert added == 1
+    assert store.last_day.isoformat() == "2024-01-08"
+    assert len(store.rates["VND"]) == len(store.days) == 5
+    assert math.isnan(store.rates["VND"][0])
+    assert store.rates["JPY"][3] == 158.0
+    assert store.rates["EUR"][-1] == 1.0
+
+
+def test_trim_keeps_only_max_days():
+    store = FxHistory(max_days=3)
+    store.append(SERIES)
+    assert list(store.days) == [date(2024, 1, d).toordinal() for d in (3, 4, 5)]
+    assert all(len(v) == 3 for v in store.rates.values())
+
+
+def test_summary_derives_pair_from_eur_rates():
+    store = _store()
+    # 1 JPY あたりの THB: 38/160, 38/150, 38/155, 38/158
+    trend = store.summary("JPY", "THB", 365)
+    assert trend["latest"] == pytest.approx(38 / 158, rel=1e-5)
+    assert trend["min"] == pytest.approx(38 / 160, rel=1e-5)
+    assert trend["max"] == pytest.approx(38 / 150, rel=1e-5)
+    assert trend["percentile"] == 50.0
+    assert trend["change_pct"] == round((160 / 158 - 1) * 100, 2)
+    assert trend["samples"] == 4
+    assert (trend["start_date"], trend["end_date"]) == ("2024-01-02", "2024-01-05")
+    # 期間を絞ると直近の日だけを見る
+    assert store.summary("JPY", "THB", 2)["samples"] == 2
+    assert store.summary("JPY", "XXX", 365) is None
+
+
+def test_save_and_load_round_trip(tmp_path):
+    path = str(tmp_path / "fx" / "history.npz")
+    _store().save(path)
+    loaded = FxHistory(max_days=30)
+    loaded.load(path)
+    assert loaded.path == path
+    assert list(loaded.days) == list(_store().days)
+    assert loaded.summary("USD", "JPY", 365) == _store().summary("USD", "JPY", 365)
+    # 続きから追記できる
+    assert loaded.append({"rates": {"2024-01-08": {"JPY": 157.0, "THB": 38.0, "USD": 1.0}}}) == 1
+
+
+def test_load_missing_file_keeps_store_empty(tmp_path):
+    store = FxHistory()
+    store.load(str(tmp_path / "missing.npz"))
+    assert len(store) == 0
+
+
+@pytest.mark.asyncio
+async def test_update_requests_only_days_after_last(tmp_path):
+    store = _store()
+    store.path = str(tmp_path / "history.npz")
+    resp = Mock(status_code=200)
+    resp.raise_for_status.return_value = None
+    resp.json.return_value = {"rates": {"2024-01-08": {"JPY": 157.0, "THB": 38.0, "USD": 1.0}}}
+    client = Mock()
+    client.get = AsyncMock(return_value=resp)
+    with patch("app.services.fx_history.get_http_client", return_value=client):
+        assert await store.update() == 1
+    assert client.get.await_args.args[0].endswith("/2024-01-06..")
+    assert (tmp_path / "history.npz").exists()
+
+
+def test_history_endpoint(client: TestClient):
+    thailand = {**MOCK_COUNTRY, "code": "TH", "currencies": [{"code": "THB", "name": "Thai baht"}]}
+    with (
+        patch("app.api.countries.fx_history", _store()),
+        patch("app.services.restcountries.RestCountriesService.get_country",
+              new_callable=AsyncMock, return_value=thailand),
+    ):
+        data = client.get("/api/countries/TH/exchange/history?days=30").json()
+        assert data["base"] == "JPY"
+        assert data["trends"][0]["currency_code"] == "THB"
+        assert data["trends"][0]["samples"] == 4
+
+    with (
+        patch("app.api.countries.fx_history", _store()),
+        patch("app.services.restcountries.RestCountriesService.get_country",
+              new_callable=AsyncMock, return_value=MOCK_COUNTRY),
+    ):
+        data = client.get("/api/countries/JP/exchange/history").json()
+        assert data["base"] == "USD"
+        assert data["trends"][0]["currency_code"] == "JPY"
+        assert client.get("/api/countries/JP/exchange/history?days=1").status_code == 422
+
+
+def test_history_endpoint_does_not_backfill_on_request(client: TestClient):
+    http = Mock()
+    http.get = AsyncMock(side_effect=AssertionError("リクエスト中に取り込まない"))
+    with (
+        patch("app.api.countries.fx_history", FxHistory()),
+        patch("app.services.fx_history.get_http_client", return_value=http),
+        patch("app.services.restcountries.RestCountriesService.get_country",
+              new_callable=AsyncMock, return_value=MOCK_COUNTRY),
+    ):
+        data = client.get("/api/countries/JP/exchange/history").json()
+    assert data["available"] is False and data["trends"] == []
+    http.get.assert_not_awaited()
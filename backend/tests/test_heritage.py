@@ -30,20 +30,19 @@ async def test_get_heritage_sites_returns_empty_without_country_name():
 @pytest.mark.asyncio
 async def test_get_heritage_sites_uses_cache():
     """キャッシュヒット時は HTTP リクエストを発行しないこと"""
-    import time
     from app.services import heritage_service as hm
 
     svc = HeritageService()
     cached_data = [{"name": "Test Site", "description": None,
                     "registered_year": None, "latitude": None,
                     "longitude": None, "image_url": None, "wikipedia_url": None}]
-    hm._heritage_cache["heritage_TEST"] = (cached_data, time.time())
+    hm._heritage_cache.set("heritage_TEST", cached_data)
 
     result = await svc.get_heritage_sites("TEST", "TestCountry")
     assert result == cached_data
 
     # クリーンアップ
-    del hm._heritage_cache["heritage_TEST"]
+    hm._heritage_cache.pop("heritage_TEST")
 
 
 def test_category_member_filter_excludes_list_pages():
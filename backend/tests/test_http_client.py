@@ -0,0 +1,108 @@
+"""条件付き GET（ETag / Last-Modified）のテスト"""
+from unittest.mock import AsyncMock, Mock, patch
+
+import pytest
+
+from app.core import http_client
+from app.core.http_client import conditional_get
+
+
+def _response(status: int, body: str = "", headers: dict | None = None):
+    resp = Mock()
+    resp.status_code = status
+    resp.text = body
+    resp.headers = headers or {}
+    resp.raise_for_status.return_value = None
+    return resp
+
+
+@pytest.fixture(autouse=True)
+def _clear_validators():
+    http_client.clear_validators()
+    yield
+    http_client.clear_validators()
+
+
+@pytest.mark.asyncio
+async def test_not_modified_reuses_parsed_result_without_reparsing():
+    client = Mock()
+    client.get = AsyncMock(side_effect=[
+        _response(200, "v1", {"etag": '"abc"', "last-modified": "Mon, 01 Jan 2024 00:00:00 GMT"}),
+        _response(304),
+    ])
+    parse = Mock(side_effect=lambda resp: {"body": resp.text})
+
+    first = await conditional_get(client, "https://example.com/a.xml", parse)
+    second = await conditional_get(client, "https://example.com/a.xml", parse)
+
+    assert second is first
+    assert parse.call_count == 1
+    assert "headers" not in client.get.call_args_list[0].kwargs
+    assert client.get.call_args_list[1].kwargs["headers"] == {
+        "If-None-Match": '"abc"',
+        "If-Modified-Since": "Mon, 01 Jan 2024 00:00:00 GMT",
+    }
+    assert http_client.conditional_stats()["not_modified"] == 1
+
+
+@pytest.mark.asyncio
+async def test_validators_are_keyed_by_params_and_replaced_on_change():
+    client = Mock()
+    client.get = AsyncMock(side_effect=[
+        _response(200, "a", {"etag": '"a"'}),
+        _response(200, "b", {"etag": '"b"'}),
+        _response(200, "a2", {"etag": '"a2"'}),
+    ])
+    parse = lambda resp: resp.text  # noqa: E731
+
+    await conditional_get(client, "https://example.com/rss", parse, params={"q": "fr"})
+    await conditional_get(client, "https://example.com/rss", parse, params={"q": "de"})
+    changed = await conditional_get(
+        client, "https://example.com/rss", parse, params={"q": "fr"}, headers={"User-Agent": "x"}
+    )
+
+    assert changed == "a2"
+    headers = client.get.call_args_list[2].kwargs["headers"]
+    assert headers == {"User-Agent": "x", "If-None-Match": '"a"'}
+    assert http_client.conditional_stats()["validators"] == 2
+
+
+@pytest.mark.asyncio
+async def test_parse_failure_and_missing_validators_are_not_stored():
+    client = Mock()
+    client.get = AsyncMock(side_effect=[
+        _response(200, "ok"),  # 検証子なし
+        _response(200, "bad", {"etag": '"x"'}),
+    ])
+
+    def parse(resp):
+        if resp.text == "bad":
+            raise ValueError("broken")
+        return resp.text
+
+    await conditional_get(client, "https://example.com/j.json", parse)
+    with pytest.raises(ValueError):
+        await conditional_get(client, "https://example.com/j.json", parse)
+    assert http_client.conditional_stats()["validators"] == 0
+
+
+@pytest.mark.asyncio
+async def test_mofa_fetch_skips_reparse_on_304():
+    from app.services import mofa_service
+
+    xml = (
+        "<opendata><riskLevel1>1</riskLevel1><riskLevel2>0</riskLevel2>"
+        "<riskLevel3>0</riskLevel3><riskLevel4>0</riskLevel4></opendata>"
+    ).encode()
+    first = _response(200, headers={"content-type": "application/xml", "etag": '"m1"'})
+    first.content = xml
+    client = Mock()
+    client.get = AsyncMock(side_effect=[first, _response(304)])
+
+    with patch("app.services.mofa_service.get_http_client", return_value=client), patch(
+        "app.services.mofa_service._parse_xml", wraps=mofa_service._parse_xml
+    ) as parse_xml:
+        a = await mofa_service._fetch_xml("0082")
+        b = await mofa_service._fetch_xml("0082")
+    assert b is a
+    assert parse_xml.call_count == 1
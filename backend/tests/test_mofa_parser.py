@@ -0,0 +1,99 @@
+"""外務省XMLパーサーのテスト（記録済みフィクスチャとの一致）"""
+import asyncio
+import json
+import time
+import xml.etree.ElementTree as ET
+from pathlib import Path
+from unittest.mock import Mock, patch
+
+import pytest
+
+from app.core.cache import _background_tasks
+from app.services import mofa_service
+from app.services.mofa_service import _parse_xml
+
+FIXTURES = Path(__file__).parent / "fixtures" / "mofa"
+
+
+@pytest.mark.parametrize("name", ["cn", "us", "th", "empty"])
+def test_parse_matches_recorded_fixture(name):
+    xml = (FIXTURES / f"{name}.xml").read_bytes()
+    expected = json.loads((FIXTURES / f"{name}.json").read_text(encoding="utf-8"))
+    assert _parse_xml(xml) == expected
+
+
+def test_scan_stops_once_capped_lists_and_fields_are_complete():
+    xml = (FIXTURES / "cn.xml").read_bytes()
+    seen = []
+    real_child_texts = mofa_service._child_texts
+
+    def spy(elem, tags):
+        seen.append(elem.tag)
+        return real_child_texts(elem, tags)
+
+    with patch.object(mofa_service, "_child_texts", spy):
+        fields, spots, mails = mofa_service._scan_xml(xml)
+    assert len(fields) == len(mofa_service._ROOT_TAGS)
+    assert len(spots) == 8
+    # 40件ある領事メールは先頭6件だけ読んで打ち切る
+    assert seen.count("mail") == 6
+
+
+def test_scan_reads_to_end_when_root_fields_are_missing():
+    xml = (FIXTURES / "th.xml").read_bytes()
+    fields, spots, mails = mofa_service._scan_xml(xml)
+    # 入れ子の riskLevel4 はルート直下ではないので使わない
+    assert fields["riskLevel1"] == "0"
+    assert "riskLevel4" in fields and fields["riskLevel4"] == "0"
+    assert len(mails) == 1 and spots == []
+
+
+def test_parse_error_is_raised():
+    with pytest.raises(ET.ParseError):
+        _parse_xml(b"<opendata><riskLevel1>1</riskLevel1>")
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("failure", ["truncated", "html"])
+async def test_failed_download_is_not_observed_or_cached(failure):
+    async def fetch_xml(mofa_code):
+        if failure == "truncated":
+            raise ET.ParseError("no element found")
+        return None
+
+    previous = {**mofa_service._build_response("TH", 2, "前回の値"), "level": 2}
+    mofa_service._cache.clear()
+    mofa_service._cache.restore("TH", previous, time.time() - 7 * 3600)
+    observe = Mock()
+    with patch.object(mofa_service, "_fetch_xml", fetch_xml), \
+            patch.object(mofa_service.safety_history, "observe", observe):
+        result = await mofa_service.MofaSafetyService().get_safety_info("TH")
+        await asyncio.gather(*_background_tasks)
+        with pytest.raises(Exception):
+            await mofa_service.MofaSafetyService().refresh("TH")
+    assert result["level"] == 2 and result["stale"] is True
+    observe.assert_not_called()
+    assert mofa_service._cache.items()[0][1]["level"] == 2
+    mofa_service._cache.clear()
+
+
+@pytest.mark.asyncio
+async def test_failure_without_previous_value_is_briefly_remembered():
+    calls = []
+
+    async def fetch_xml(mofa_code):
+        calls.append(mofa_code)
+        raise ConnectionError("down")
+
+    mofa_service._cache.clear()
+    mofa_service._failures.clear()
+    svc = mofa_service.MofaSafetyService()
+    try:
+        with patch.object(mofa_service, "_fetch_xml", fetch_xml):
+            first = await svc.get_safety_info("TH")
+            second = await svc.get_safety_info("th")
+        assert first["available"] is False and second["available"] is False
+        assert len(calls) == 1  # 失敗は短時間キャッシュされる
+        assert "TH" not in mofa_service._cache
+    finally:
+        mofa_service._failures.clear()
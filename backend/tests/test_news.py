@@ -150,3 +150,37 @@ def test_safety_filter_fallback_on_all_filtered(client: TestClient):
     data = response.json()
     # フォールバックにより記事が返ること（0件にはならない）
     assert data["total"] >= 0
+
+
+@pytest.mark.asyncio
+async def test_failed_refresh_keeps_previous_articles():
+    import asyncio
+    import time
+
+    from app.core.cache import _background_tasks
+    from app.services import news_service as ns_module
+
+    ns_module._news_cache.clear()
+    ns_module._news_cache.restore("news_JP", MOCK_NEWS_RESPONSE, time.time() - 3600)
+    svc = NewsService()
+    with patch.object(ns_module.settings, "gnews_api_key", ""), patch.object(
+        NewsService, "_fetch_from_google_rss", AsyncMock(side_effect=RuntimeError("down"))
+    ):
+        result = await svc.get_news("JP", "Japan")
+        assert result["stale"] is True and result["total"] == 1
+        await asyncio.gather(*_background_tasks)
+    assert ns_module._news_cache.get("news_JP") is None  # 鮮度は戻らない
+    assert ns_module._news_cache.items()[0][1]["total"] == 1
+    ns_module._news_cache.clear()
+
+
+@pytest.mark.asyncio
+async def test_gnews_service_distinguishes_failure_from_empty_feed():
+    from app.services.gnews import GNewsService
+
+    svc = GNewsService()
+    with patch("app.services.gnews.settings.gnews_api_key", ""):
+        with patch.object(GNewsService, "_fetch_rss", AsyncMock(side_effect=RuntimeError("down"))):
+            assert await svc._fetch_news("JP", "Japan", 10) is None
+        with patch.object(GNewsService, "_fetch_rss", AsyncMock(return_value=[])):
+            assert (await svc._fetch_news("JP", "Japan", 10))["total"] == 0
@@ -0,0 +1,64 @@
+"""解析プールのテスト"""
+import asyncio
+import threading
+import time
+
+import pytest
+
+from app.core import parse_pool
+from app.core.config import settings
+
+
+def _thread_name(payload: str) -> str:
+    return threading.current_thread().name
+
+
+def _slow_parse(payload: str) -> int:
+    time.sleep(0.1)
+    return len(payload)
+
+
+@pytest.mark.asyncio
+async def test_small_payload_is_parsed_inline_and_large_is_offloaded(monkeypatch):
+    monkeypatch.setattr(settings, "parse_inline_max_bytes", 100)
+    before = parse_pool.parse_stats()
+    assert await parse_pool.run_parse(_thread_name, "x" * 10) == threading.current_thread().name
+    assert (await parse_pool.run_parse(_thread_name, "x" * 200)).startswith("parse")
+    after = parse_pool.parse_stats()
+    assert after["inline"] == before["inline"] + 1
+    assert after["offloaded"] == before["offloaded"] + 1
+    assert after["in_flight"] == 0
+
+
+@pytest.mark.asyncio
+async def test_offloaded_parse_does_not_block_event_loop(monkeypatch):
+    monkeypatch.setattr(settings, "parse_inline_max_bytes", 100)
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+        while True:
+            ticks += 1
+            await asyncio.sleep(0.005)
+
+    task = asyncio.ensure_future(ticker())
+    results = await asyncio.gather(*[parse_pool.run_parse(_slow_parse, "x" * 200) for _ in range(2)])
+    task.cancel()
+    assert results == [200, 200]
+    # 解析中もループは回り続ける（インラインなら 0.2 秒間ほぼ止まる）
+    assert ticks >= 5
+
+
+@pytest.mark.asyncio
+async def test_mofa_response_is_parsed_in_pool(monkeypatch):
+    from unittest.mock import Mock
+
+    from app.services import mofa_service
+
+    monkeypatch.setattr(settings, "parse_inline_max_bytes", 10)
+    resp = Mock()
+    resp.raise_for_status.return_value = None
+    resp.headers = {"content-type": "application/xml"}
+    resp.content = b"<opendata><riskLevel2>1</riskLevel2></opendata>"
+    parsed = await mofa_service._parse_response(resp)
+    assert parsed["level"] == 2
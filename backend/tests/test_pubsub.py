@@ -0,0 +1,140 @@
+"""publish/subscribe ハブと安全情報プッシュのテスト"""
+import asyncio
+from unittest.mock import patch
+
+import pytest
+
+from app.core.pubsub import Hub, SubscriberLimitError
+
+
+@pytest.mark.asyncio
+async def test_publish_fans_out_by_topic_and_wildcard():
+    hub = Hub()
+    jp = hub.subscribe({"JP"})
+    every = hub.subscribe({"*"})
+    assert hub.publish("JP", 1) == 2
+    assert hub.publish("FR", 2) == 1
+    assert await jp.get(timeout=0.01) == 1
+    assert await jp.get(timeout=0.01) is None
+    assert [await every.get(timeout=0.01) for _ in range(2)] == [1, 2]
+    jp.close()
+    every.close()
+    assert hub.stats()["subscribers"] == 0
+    assert hub.stats()["topics"] == 0
+
+
+@pytest.mark.asyncio
+async def test_full_queue_drops_oldest_and_disconnects_slow_subscriber():
+    hub = Hub(queue_size=2, max_dropped=3)
+    sub = hub.subscribe({"JP"})
+    for i in range(4):
+        hub.publish("JP", i)
+    assert sub.take_gap() is True
+    assert sub.take_gap() is False
+    assert [await sub.get(timeout=0.01) for _ in range(2)] == [2, 3]
+
+    for i in range(6):
+        hub.publish("JP", i)
+    # 取りこぼしが上限を超えたら切断する
+    assert sub.closed is True
+    assert await sub.get(timeout=0.01) is None
+    assert hub.stats()["disconnected_slow"] == 1
+
+
+@pytest.mark.asyncio
+async def test_close_wakes_pending_get():
+    hub = Hub()
+    sub = hub.subscribe({"JP"})
+    waiter = asyncio.ensure_future(sub.get())
+    await asyncio.sleep(0)
+    sub.close()
+    assert await asyncio.wait_for(waiter, 1) is None
+
+
+def test_subscriber_limit():
+    hub = Hub(max_subscribers=1)
+    hub.subscribe({"JP"})
+    with pytest.raises(SubscriberLimitError):
+        hub.subscribe({"FR"})
+
+
+@pytest.mark.asyncio
+async def test_alert_events_replays_backlog_then_pushes_changes():
+    from app.api.safety import alert_events
+    from app.services.safety_history import SafetyHistory
+
+    hub = Hub()
+    history = SafetyHistory(hub=hub)
+    history.observe("state_dept", "TH", {"level": 1})
+    history.observe("state_dept", "TH", {"level": 2})
+
+    sub = hub.subscribe({"TH"})
+    page = history.changes()
+    stream = alert_events(sub, page["changes"], heartbeat=0.01, cursor=page["cursor"])
+    first = await stream.__anext__()
+    assert first.startswith(b"id: 1\nevent: change\n")
+    assert await stream.__anext__() == b": ping\n\n"
+
+    history.observe("state_dept", "TH", {"level": 3})
+    history.observe("state_dept", "JP", {"level": 1})  # 購読外
+    pushed = await stream.__anext__()
+    assert pushed.startswith(b"id: 2\nevent: change\n")
+    assert b'"new": 3' in pushed
+    await stream.aclose()
+    assert sub.closed is True
+    assert hub.stats()["subscribers"] == 0
+
+
+@pytest.mark.asyncio
+async def test_resync_on_fresh_connection_starts_from_latest_seq():
+    from app.api import safety
+    from app.services.safety_history import SafetyHistory
+
+    hub = Hub(queue_size=1)
+    history = SafetyHistory(hub=hub)
+    for level in (1, 2, 3):
+        history.observe("state_dept", "TH", {"level": level})
+
+    with patch.object(safety, "safety_history", history):
+        backlog, cursor = safety.alert_backlog({"TH"}, None)
+        assert (backlog, cursor) == ([], 2)
+        # since 指定時は購読外の変更も含めて読み終えた位置から続ける
+        history.observe("state_dept", "JP", {"level": 1})
+        history.observe("state_dept", "JP", {"level": 2})
+        replay, replay_cursor = safety.alert_backlog({"TH"}, 1)
+        assert [c["seq"] for c in replay] == [2] and replay_cursor == 3
+
+    sub = hub.subscribe({"TH"})
+    stream = safety.alert_events(sub, backlog, heartbeat=0.01, cursor=cursor)
+    history.observe("state_dept", "TH", {"level": 4})
+    history.observe("state_dept", "TH", {"level": 1})  # キュー溢れで1件目を捨てる
+    assert await stream.__anext__() == b'event: resync\ndata: {"cursor": 2}\n\n'
+    assert (await stream.__anext__()).startswith(b"id: 5\nevent: change\n")
+    await stream.aclose()
+
+
+@pytest.mark.asyncio
+async def test_streamed_change_matches_changes_endpoint_format():
+    import json
+    from datetime import datetime
+
+    from app.api.safety import alert_events
+    from app.models.schemas import SafetyChange
+    from app.services.safety_history import SafetyHistory
+
+    hub = Hub()
+    history = SafetyHistory(hub=hub)
+    history.observe("state_dept", "TH", {"level": 1})
+    history.observe("state_dept", "TH", {"level": 2})
+
+    sub = hub.subscribe({"TH"})
+    page = history.changes()
+    stream = alert_events(sub, page["changes"], heartbeat=0.01, cursor=page["cursor"])
+    event = await stream.__anext__()
+    await stream.aclose()
+
+    data = json.loads(event.split(b"data: ", 1)[1])
+    # /api/safety/changes と同じく ISO 形式の文字列で届く
+    assert isinstance(data["changed_at"], str)
+    assert datetime.fromisoformat(data["changed_at"]).tzinfo is not None
+    assert data == SafetyChange.model_validate(page["changes"][0]).model_dump(mode="json")
@@ -0,0 +1,130 @@
+"""おすすめ国ランキングのテスト"""
+from array import array
+from unittest.mock import AsyncMock, patch
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from app.api import countries
+from app.services import climate_service as cs
+from app.services.recommendations import RecommendationIndex, RecommendationMatrix
+
+COUNTRIES = [
+    {"code": "TH", "name": "Thailand", "region": "アジア"},
+    {"code": "FR", "name": "France", "region": "ヨーロッパ"},
+    {"code": "IS", "name": "Iceland", "region": "ヨーロッパ"},
+    {"code": "XX", "name": "Nowhere", "region": "アジア"},
+]
+
+
+def _climate() -> np.ndarray:
+    climate = np.full((4, 12, 4), np.nan, dtype=np.float32)
+    climate[0] = (32.0, 24.0, 50.0, 5.0)  # 暑め・雨少なめ
+    climate[1] = (25.0, 15.0, 60.0, 8.0)  # 快適
+    climate[2] = (5.0, -2.0, 80.0, 15.0)  # 寒い
+    climate[0, 6] = (33.0, 26.0, 300.0, 22.0)  # タイの7月は雨季
+    return climate  # XX は気候データなし
+
+
+def _matrix(levels=None, gdp=None) -> RecommendationMatrix:
+    levels = {"TH": 1, "FR": 1, "IS": 0, "XX": 0} if levels is None else levels
+    gdp = {"TH": 7000.0, "FR": 45000.0, "IS": 70000.0} if gdp is None else gdp
+    return RecommendationMatrix(COUNTRIES, _climate(), levels, gdp)
+
+
+def test_rank_scores_all_countries_for_month():
+    matrix = _matrix()
+    assert matrix.climate_coverage == 3
+    ranked = matrix.rank(1)
+    # 気温だけならフランスだが、物価の安さでタイが上に来る
+    assert [r["code"] for r in ranked] == ["TH", "FR", "IS"]
+    assert ranked[0]["price_level"] == 0.0 and ranked[0]["safety_level"] == 1
+    assert ranked[1]["temp_max"] == 25.0 and ranked[1]["rainy_days"] == 8.0
+    assert all(0 <= r["score"] <= 100 for r in ranked)
+    # 雨季の月はタイのスコアが下がる
+    july = {r["code"]: r["score"] for r in matrix.rank(7)}
+    assert july["TH"] < {r["code"]: r["score"] for r in ranked}["TH"]
+
+
+def test_rank_filters_region_and_level():
+    matrix = _matrix(levels={"TH": 1, "FR": None, "IS": 0})
+    assert [r["code"] for r in matrix.rank(1, region="ヨーロッパ")] == ["FR", "IS"]
+    # 安全レベル不明の国は上限指定時に除く
+    assert [r["code"] for r in matrix.rank(1, max_level=1)] == ["TH", "IS"]
+    assert [r["code"] for r in matrix.rank(1, max_level=0)] == ["IS"]
+    assert len(matrix.rank(1, limit=1)) == 1
+
+
+def test_missing_price_and_safety_use_remaining_weights():
+    matrix = _matrix(levels={}, gdp={})
+    ranked = matrix.rank(1)
+    assert ranked[0]["safety_level"] is None and ranked[0]["price_level"] is None
+    assert ranked[0]["code"] == "FR"
+    assert ranked[0]["score"] == pytest.approx(100 * (0.35 * 1.0 + 0.2 * 0.6) / 0.55, abs=0.1)
+
+
+class _Svc:
+    def __init__(self):
+        self.cache_version = 0
+        self.monthly_matrix = AsyncMock(side_effect=lambda c: _climate())
+        self.cached_gdp_per_capita = AsyncMock(return_value={})
+
+
+@pytest.mark.asyncio
+async def test_index_rebuilds_only_when_inputs_change():
+    index = RecommendationIndex()
+    climate, economic = _Svc(), _Svc()
+    levels = {"TH": 1}
+    first = await index.get(COUNTRIES, levels, climate, economic)
+    assert await index.get(COUNTRIES, dict(levels), climate, economic) is first
+    climate.cache_version += 1
+    second = await index.get(COUNTRIES, levels, climate, economic)
+    assert second is not first
+    third = await index.get(COUNTRIES, {"TH": 2}, climate, economic)
+    assert third is not second
+    assert index.builds == 3
+    assert climate.monthly_matrix.await_count == 3
+
+
+def test_recommendations_endpoint(client: TestClient):
+    with (
+        patch.object(countries._svc, "get_all_countries", AsyncMock(return_value=COUNTRIES)),
+        patch.object(countries._climate_svc, "monthly_matrix", AsyncMock(return_value=_climate())),
+        patch.object(countries._wb_svc, "cached_gdp_per_capita", AsyncMock(return_value={})),
+        patch.object(countries, "_safety_cache", {"TH": 1, "FR": 2, "IS": 0}),
+    ):
+        data = client.get("/api/recommendations?month=1&max_level=1").json()
+        assert data["month"] == 1
+        assert [r["code"] for r in data["results"]] == ["TH", "IS"]
+        assert data["countries"] == 4 and data["climate_coverage"] == 3
+        default = client.get("/api/recommendations").json()
+        assert 1 <= default["month"] <= 12
+        assert client.get("/api/recommendations?month=13").status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_climate_job_fills_missing_countries_in_batches():
+    from app import jobs
+
+    located = [{**c, "latitude": 10.0 + i, "longitude": 100.0} for i, c in enumerate(COUNTRIES)]
+    located[3] = COUNTRIES[3]  # 座標のない国は対象外
+    normals = {"normals": array("f", [20.0] * 12 * len(cs.FIELDS)),
+               "period_start": 2014, "period_end": 2023, "years": 10}
+
+    async def fetch(self, lat, lon):
+        return None if lat == 12.0 else normals  # IS は取得に失敗
+
+    cs._cache.clear()
+    try:
+        with (
+            patch.object(countries._svc, "get_all_countries", AsyncMock(return_value=located)),
+            patch.object(cs.ClimateService, "_fetch", fetch),
+            patch.object(jobs.settings, "climate_refresh_batch", 2),
+        ):
+            assert await jobs.refresh_climate() == {"refreshed": 2, "failed": 0, "remaining": 1}
+            assert await jobs.refresh_climate() == {"refreshed": 0, "failed": 1, "remaining": 1}
+            matrix = await countries._climate_svc.monthly_matrix(located)
+        assert [bool(np.isfinite(row).all()) for row in matrix] == [True, True, False, False]
+    finally:
+        cs._cache.clear()
@@ -39,7 +39,113 @@ async def test_fetch_all_uses_supported_fields_only():
         countries = await service._fetch_all()
 
     assert countries[0]["code"] == "JP"
-    _, kwargs = mock_client.get.call_args
-    assert kwargs["params"]["fields"] == (
-        "name,cca2,flags,capital,region,subregion,population,languages,currencies,latlng"
-    )
+    fields = [kwargs["params"]["fields"] for _, kwargs in mock_client.get.call_args_list]
+    assert fields == [
+        "name,cca2,flags,capital,region,subregion,population,languages,currencies,latlng",
+        "cca2,cca3,flag,borders,timezones",
+    ]
+    # /all は fields 10個までの制限がある
+    assert all(len(f.split(",")) <= 10 for f in fields)
+
+
+def _response(payload):
+    resp = Mock()
+    resp.status_code = 200
+    resp.raise_for_status.return_value = None
+    resp.json.return_value = payload
+    return resp
+
+
+_BASE = [
+    {
+        "name": {"common": "Japan"},
+        "cca2": "JP",
+        "flags": {"svg": "https://flagcdn.com/jp.svg"},
+        "capital": ["Tokyo"],
+        "subregion": "Eastern Asia",
+        "latlng": [36.0, 138.0],
+    },
+    {"name": {"common": "France"}, "cca2": "FR", "latlng": [46.0, 2.0]},
+]
+_EXTRA = [
+    {"cca2": "JP", "cca3": "JPN", "flag": "🇯🇵", "borders": [], "timezones": ["UTC+09:00"]},
+    {"cca2": "FR", "cca3": "FRA", "flag": "🇫🇷", "borders": ["ESP"], "timezones": ["UTC+01:00"]},
+]
+
+
+def _all_client(extra=_EXTRA):
+    async def get(url, params=None):
+        if url.endswith("/all"):
+            if "borders" in params["fields"]:
+                if isinstance(extra, Exception):
+                    raise extra
+                return _response(extra)
+            return _response(_BASE)
+        raise AssertionError(f"想定外のリクエスト: {url}")
+
+    client = Mock()
+    client.get = AsyncMock(side_effect=get)
+    return client
+
+
+@pytest.mark.asyncio
+async def test_get_country_served_from_repository_without_alpha_call():
+    rc_module._cache.clear()
+    client = _all_client()
+    service = RestCountriesService()
+    with patch("app.services.restcountries.get_http_client", return_value=client):
+        jp = await service.get_country("jp")
+        assert jp["borders"] == [] and jp["flag_emoji"] == "🇯🇵"
+        assert (await service.get_country("FRA"))["code"] == "FR"
+        assert (await service.get_country("france"))["code"] == "FR"
+        assert (await service.get_country("日本"))["code"] == "JP"
+        assert await service.get_country("XX") is None
+        assert await service.get_coordinates("FR") == (46.0, 2.0)
+    # /all の2回（一覧用・詳細用）のみ
+    assert client.get.await_count == 2
+    rc_module._cache.clear()
+
+
+@pytest.mark.asyncio
+async def test_get_country_returns_copy():
+    rc_module._cache.clear()
+    service = RestCountriesService()
+    with patch("app.services.restcountries.get_http_client", return_value=_all_client()):
+        jp = await service.get_country("JP")
+        jp["safety_level"] = 3
+        assert "safety_level" not in await service.get_country("JP")
+    rc_module._cache.clear()
+
+
+@pytest.mark.asyncio
+async def test_repository_index_is_rebuilt_when_list_changes():
+    rc_module._cache.clear()
+    service = RestCountriesService()
+    with patch("app.services.restcountries.get_http_client", return_value=_all_client()):
+        assert (await service.get_country("JP"))["name"] == "Japan"
+        rc_module._cache.set("all_countries", [
+            {**c, "name": c["name"].upper()} for c in rc_module._cache.get("all_countries")
+        ])
+        assert (await service.get_country("JP"))["name"] == "JAPAN"
+    rc_module._cache.clear()
+
+
+@pytest.mark.asyncio
+async def test_get_country_falls_back_to_alpha_without_detail_fields():
+    rc_module._cache.clear()
+    client = _all_client(extra=RuntimeError("timeout"))
+    alpha = _response({"cca2": "JP", "cca3": "JPN", "name": {"common": "Japan"}, "borders": []})
+    base_get = client.get.side_effect
+
+    async def get(url, params=None):
+        if "/alpha/" in url:
+            return alpha
+        return await base_get(url, params)
+
+    client.get = AsyncMock(side_effect=get)
+    service = RestCountriesService()
+    with patch("app.services.restcountries.get_http_client", return_value=client):
+        assert len(await service.get_all_countries()) == 2  # 一覧は詳細なしでも返せる
+        assert (await service.get_country("JP"))["code"] == "JP"
+    assert any("/alpha/JP" in call.args[0] for call in client.get.call_args_list)
+    rc_module._cache.clear()
@@ -413,3 +413,54 @@ class TestRiskMapUrl:
             response = client.get("/api/countries/IN/safety")
         data = response.json()
         assert data["risk_map_url"] == "https://www.anzen.mofa.go.jp/info/map/2025T030_1_Detail.html"
+
+
+# ── State Dept 索引 ─────────────────────────────────────────────
+
+class TestStateDeptIndex:
+    def test_index_is_built_once_and_parsed(self):
+        from unittest.mock import Mock
+
+        from app.services.state_dept_service import _parse_index
+
+        resp = Mock()
+        resp.raise_for_status.return_value = None
+        resp.json.return_value = {"data": [
+            {"ISO_Code": "fr", "Advisory_Level": "Level 2 - Exercise Increased Caution",
+             "Date_Updated": "2024-05-01"},
+            {"ISO_Code": "RU", "Advisory_Level": "Level 4 - Do Not Travel"},
+            {"ISO_Code": "", "Advisory_Level": "Level 1 - Exercise Normal Precautions"},
+        ]}
+        index = _parse_index(resp)
+        assert index == {
+            "FR": {"level": 2, "message": "Exercise Increased Caution", "date": "2024-05-01"},
+            "RU": {"level": 4, "message": "Do Not Travel", "date": None},
+        }
+
+    @pytest.mark.asyncio
+    async def test_lookups_share_one_download(self):
+        from app.services import state_dept_service
+        from app.services.state_dept_service import StateDeptService
+
+        state_dept_service._state_cache.clear()
+        download = AsyncMock(return_value={"FR": {"level": 2, "message": "x", "date": None}})
+        with patch.object(StateDeptService, "_download_index", download):
+            svc = StateDeptService()
+            single = await svc.get_advisory("fr")
+            many = await svc.get_advisories(["FR", "jp"])
+        assert single["level"] == 2
+        assert many["JP"] == {"level": 0, "message": "情報なし", "date": None}
+        assert download.await_count == 1
+        state_dept_service._state_cache.clear()
+
+    @pytest.mark.asyncio
+    async def test_fetch_failure_returns_placeholder(self):
+        from app.services import state_dept_service
+        from app.services.state_dept_service import StateDeptService
+
+        state_dept_service._state_cache.clear()
+        with patch.object(
+            StateDeptService, "_download_index", AsyncMock(side_effect=RuntimeError("down"))
+        ):
+            result = await StateDeptService().get_advisories(["FR"])
+        assert result["FR"]["message"] == "情報取得失敗"
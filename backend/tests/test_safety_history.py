@@ -0,0 +1,96 @@
+"""安全情報の変更検知・差分フィードのテスト"""
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.services.safety_history import SafetyHistory, mofa_snapshot
+
+
+def _mofa(level: int, mails: list[str] = (), risks: list[dict] = ()) -> dict:
+    details = [{"category": "領事メール", "description": m, "severity": "low"} for m in mails]
+    return {"level": level, "infection_level": 0, "details": details, "regional_risks": list(risks)}
+
+
+def test_first_observation_is_baseline_and_changes_are_recorded():
+    history = SafetyHistory()
+    assert history.observe("mofa", "fr", mofa_snapshot(_mofa(1, ["a"]))) == []
+    assert history.observe("mofa", "FR", mofa_snapshot(_mofa(1, ["a"]))) == []
+
+    changes = history.observe("mofa", "FR", mofa_snapshot(_mofa(2, ["b", "a"])))
+    assert [(c["field"], c["old"], c["new"]) for c in changes] == [
+        ("level", 1, 2),
+        ("mail", None, ["b"]),
+    ]
+    # メールが消えただけでは変更として扱わない
+    assert history.observe("mofa", "FR", mofa_snapshot(_mofa(2, ["b"]))) == []
+
+
+def test_changes_since_cursor_with_paging_and_country_filter():
+    history = SafetyHistory()
+    for code in ("JP", "TH"):
+        history.observe("state_dept", code, {"level": 1})
+    history.observe("state_dept", "JP", {"level": 2})
+    history.observe("state_dept", "TH", {"level": 3})
+    history.observe("state_dept", "JP", {"level": 4})
+
+    page = history.changes(since=0, limit=2)
+    assert [c["new"] for c in page["changes"]] == [2, 3]
+    assert page["has_more"] is True
+    rest = history.changes(since=page["cursor"])
+    assert [c["new"] for c in rest["changes"]] == [4]
+    assert rest["has_more"] is False
+    assert history.changes(since=rest["cursor"])["changes"] == []
+    assert [c["new"] for c in history.changes(country_code="th")["changes"]] == [3]
+
+
+def test_history_survives_reopen_and_reports_truncation(tmp_path):
+    path = str(tmp_path / "history.sqlite3")
+    history = SafetyHistory(path, max_changes=1)
+    history.observe("state_dept", "JP", {"level": 1})
+    for level in (2, 3, 4):
+        history.observe("state_dept", "JP", {"level": level})
+    history.close()
+
+    reopened = SafetyHistory(path)
+    # 保存済みのスナップショットと比較されるので基準扱いにならない
+    assert reopened.observe("state_dept", "JP", {"level": 4}) == []
+    result = reopened.changes(since=1)
+    assert result["truncated"] is True
+    assert [c["new"] for c in result["changes"]] == [4]
+
+
+@pytest.mark.asyncio
+async def test_state_dept_download_feeds_history():
+    from app.services import state_dept_service
+
+    history = SafetyHistory()
+    payloads = [
+        {"FR": {"level": 2, "message": "Exercise Increased Caution", "date": None}},
+        {"FR": {"level": 3, "message": "Reconsider Travel", "date": None}},
+    ]
+    with patch.object(state_dept_service, "safety_history", history), patch(
+        "app.services.state_dept_service.conditional_get", AsyncMock(side_effect=payloads)
+    ):
+        await state_dept_service.StateDeptService()._download_index()
+        await state_dept_service.StateDeptService()._download_index()
+    changes = history.changes()["changes"]
+    assert [(c["country_code"], c["source"], c["old"], c["new"]) for c in changes] == [
+        ("FR", "state_dept", 2, 3)
+    ]
+
+
+def test_changes_endpoint(client: TestClient):
+    from app.api import safety
+
+    history = SafetyHistory()
+    history.observe("mofa", "TH", mofa_snapshot(_mofa(1)))
+    history.observe("mofa", "TH", mofa_snapshot(_mofa(2)))
+    with patch.object(safety, "safety_history", history):
+        response = client.get("/api/safety/changes?since=0")
+        assert client.get("/api/safety/changes?since=-1").status_code == 422
+    assert response.status_code == 200
+    data = response.json()
+    assert data["cursor"] == 1
+    assert data["changes"][0]["country_code"] == "TH"
+    assert data["changes"][0]["field"] == "level"
@@ -0,0 +1,81 @@
+"""定期リフレッシュのスケジューラとジョブのテスト"""
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from app.core.scheduler import Job, RecentCountries, Scheduler
+
+
+def test_recent_countries_prioritize():
+    recent = RecentCountries(max_size=3)
+    for code in ["jp", "fr", "th", "us"]:
+        recent.touch(code)
+    recent.touch("FR")
+    assert recent.recent() == ["FR", "US", "TH"]  # JP は上限で追い出し
+    assert recent.prioritize(["JP", "TH", "DE", "FR"]) == ["FR", "TH", "JP", "DE"]
+
+
+def test_job_schedule_next_applies_jitter():
+    job = Job("j", AsyncMock(), interval=100, jitter=0.1)
+    for _ in range(20):
+        job.schedule_next(1000.0)
+        assert 1090.0 <= job.next_run <= 1110.0
+
+
+@pytest.mark.asyncio
+async def test_run_job_records_status_and_failures():
+    scheduler = Scheduler()
+    ok = scheduler.add_job("ok", AsyncMock(return_value={"refreshed": 3}), interval=60)
+    ng = scheduler.add_job("ng", AsyncMock(side_effect=RuntimeError("upstream")), interval=60)
+    await scheduler.run_job("ok")
+    await scheduler.run_job("ng")
+    assert ok.runs == 1 and ok.failures == 0
+    assert ok.last_result == {"refreshed": 3}
+    assert ng.failures == 1 and ng.last_error == "RuntimeError: upstream"
+    assert ng.next_run > ng.last_started
+    assert set(scheduler.stats()) == {"ng", "ok"}
+
+
+@pytest.mark.asyncio
+async def test_due_jobs_run_with_bounded_concurrency_and_no_overlap():
+    scheduler = Scheduler(max_concurrent=1)
+    active = []
+    peak = []
+
+    async def work():
+        active.append(1)
+        peak.append(len(active))
+        await asyncio.sleep(0.01)
+        active.pop()
+
+    scheduler.add_job("a", work, interval=60)
+    scheduler.add_job("b", work, interval=60)
+    scheduler.run_due()
+    scheduler.run_due()  # 実行中のジョブは重ねて起動しない
+    await asyncio.gather(*scheduler._running)
+    assert max(peak) == 1
+    assert scheduler.get_job("a").runs == 1
+    assert scheduler.get_job("b").runs == 1
+
+
+@pytest.mark.asyncio
+async def test_refresh_mofa_job_updates_country_list_levels():
+    from app import jobs
+    from app.api import countries as countries_module
+    from tests.conftest import MOCK_COUNTRY
+
+    async def refresh(self, code):
+        if code == "XX":
+            raise RuntimeError("down")
+        return {"level": 2}
+
+    countries_module.update_safety_levels({})
+    with patch(
+        "app.services.restcountries.RestCountriesService.get_all_countries",
+        AsyncMock(return_value=[MOCK_COUNTRY, {**MOCK_COUNTRY, "code": "XX"}]),
+    ), patch("app.services.mofa_service.MofaSafetyService.refresh", refresh):
+        result = await jobs.refresh_mofa()
+    assert result == {"refreshed": 1, "failed": 1}
+    assert countries_module._safety_cache == {"JP": 2}
+    countries_module.update_safety_levels({})
@@ -0,0 +1,90 @@
+"""共有キャッシュ層（RESP クライアント・ローカル代替サーバー）のテスト"""
+from unittest.mock import patch
+
+import pytest
+
+from app.core.cache import CacheNamespace
+from app.core.resp import LocalRespServer, RespClient
+from app.core.shared_cache import CircuitBreaker, SharedCacheBackend
+
+
+@pytest.mark.asyncio
+async def test_resp_client_basic_commands():
+    async with LocalRespServer() as server:
+        client = RespClient.from_url(server.url)
+        assert await client.ping()
+        await client.set("a", b"\x00bin\r\n", ex=60)
+        assert await client.get("a") == b"\x00bin\r\n"
+        assert await client.get("missing") is None
+        assert await client.mget(["a", "missing"]) == [b"\x00bin\r\n", None]
+        replies = await client.pipeline([("SET", "b", "1"), ("GET", "b"), ("DEL", "b")])
+        assert replies == ["OK", b"1", 1]
+        await client.close()
+
+
+@pytest.mark.asyncio
+async def test_value_is_shared_between_instances():
+    async with LocalRespServer() as server:
+        backend = SharedCacheBackend(RespClient.from_url(server.url))
+        # 同名の名前空間を2つ作り、別インスタンスを模擬する
+        ns_a = CacheNamespace("t_shared", ttl=60, shared=True)
+        ns_b = CacheNamespace("t_shared", ttl=60, shared=True)
+        with patch("app.core.cache._shared_tier", backend):
+            ns_a.set("JP", {"level": 1, "summary": "日本" * 50})
+            await backend.flush()
+
+            async def never():
+                raise AssertionError("上流へアクセスしてはいけない")
+
+            assert await ns_b.get_or_fetch("JP", never) == {"level": 1, "summary": "日本" * 50}
+        assert ns_b.tier_hits == 1
+        assert backend.writes == 1
+        await backend.close()
+
+
+@pytest.mark.asyncio
+async def test_get_many_uses_single_mget():
+    async with LocalRespServer() as server:
+        backend = SharedCacheBackend(RespClient.from_url(server.url))
+        writer = CacheNamespace("t_shared_many", ttl=60, shared=True)
+        reader = CacheNamespace("t_shared_many", ttl=60, shared=True)
+        with patch("app.core.cache._shared_tier", backend):
+            for code in ["JP", "US", "FR"]:
+                writer.set(code, {"code": code})
+            await backend.flush()
+            reader.set("JP", {"code": "JP"})
+            before = server.commands
+            found = await reader.get_many(["JP", "US", "FR", "XX"])
+        assert server.commands - before == 1
+        assert {k: cv.value["code"] for k, cv in found.items()} == {
+            "JP": "JP", "US": "US", "FR": "FR",
+        }
+        assert reader.misses == 1
+        await backend.close()
+
+
+@pytest.mark.asyncio
+async def test_unreachable_backend_falls_back_to_local_cache():
+    server = await LocalRespServer().start()
+    url = server.url
+    await server.stop()
+
+    backend = SharedCacheBackend(
+        RespClient.from_url(url, timeout=0.2), breaker=CircuitBreaker(threshold=2, cooldown=60)
+    )
+    ns = CacheNamespace("t_shared_down", ttl=60, shared=True)
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        return "v"
+
+    with patch("app.core.cache._shared_tier", backend):
+        assert await ns.get_or_fetch("a", fetch) == "v"
+        assert await ns.get_or_fetch("b", fetch) == "v"
+        assert await ns.get_or_fetch("a", fetch) == "v"  # ローカルにヒット
+        await backend.flush()
+    assert len(calls) == 2
+    assert backend.breaker.state == "open"
+    assert backend.skipped >= 1
+    await backend.close()
@@ -0,0 +1,101 @@
+"""Wikipedia 概要の取得・一括取り込みのテスト"""
+from unittest.mock import AsyncMock, Mock, patch
+
+import pytest
+
+from app.services import wikipedia_service as wiki
+from app.services.wikipedia_service import WikipediaService
+
+
+def _page(title: str, extract: str | None, pageid: int = 1) -> dict:
+    if extract is None:
+        return {"ns": 0, "title": title, "missing": ""}
+    return {"pageid": pageid, "ns": 0, "title": title, "extract": extract}
+
+
+def _http(handler) -> Mock:
+    """handler(api_url, params) が返す dict を JSON 応答にするクライアント。"""
+    async def get(url, params=None, headers=None):
+        resp = Mock()
+        resp.raise_for_status.return_value = None
+        resp.json.return_value = handler(url, params)
+        return resp
+
+    client = Mock()
+    client.get = AsyncMock(side_effect=get)
+    return client
+
+
+@pytest.fixture(autouse=True)
+def _clear():
+    wiki._cache.clear()
+    yield
+    wiki._cache.clear()
+
+
+@pytest.mark.asyncio
+async def test_single_lookup_queries_ja_and_en_concurrently():
+    def handler(url, params):
+        if url == WikipediaService.JA_API:
+            return {"query": {"pages": {"-1": _page(params["titles"], None)}}}
+        return {"query": {"pages": {"5": _page("Thailand", "Thailand is a country.")}}}
+
+    http = _http(handler)
+    with patch("app.services.wikipedia_service.get_http_client", return_value=http):
+        result = await WikipediaService().get_summary("TH", "タイ王国", "Thailand")
+    assert http.get.await_count == 2
+    assert result["summary"] == "Thailand is a country."
+    assert result["url"] == "https://en.wikipedia.org/wiki/Thailand"
+
+
+@pytest.mark.asyncio
+async def test_prefetch_batches_titles_and_follows_redirects_and_continue():
+    countries = [(f"C{i}", f"国{i}", f"Country {i}") for i in range(25)]
+    countries.append(("US", "アメリカ", "United States"))
+    calls = []
+
+    def handler(url, params):
+        titles = params["titles"].split("|")
+        calls.append((url, len(titles), params.get("excontinue")))
+        if url == WikipediaService.EN_API:
+            return {"query": {"pages": {"9": _page("Country 3", "Country three.")}}}
+        query = {"pages": {}}
+        if "アメリカ" in titles:
+            query["redirects"] = [{"from": "アメリカ", "to": "アメリカ合衆国"}]
+        # 1回目は先頭の10件だけ抜粋を返し、残りは continue で返す
+        first = "excontinue" not in params
+        for i, title in enumerate(titles):
+            target = "アメリカ合衆国" if title == "アメリカ" else title
+            if title == "国3":
+                query["pages"][f"-{i}"] = _page(title, None)
+            elif (i < 10) == first:
+                query["pages"][str(i + 100)] = _page(target, f"{target}の概要")
+        data = {"query": query}
+        if len(titles) > 10 and first:
+            data["continue"] = {"excontinue": 10, "continue": "||"}
+        return data
+
+    http = _http(handler)
+    with patch("app.services.wikipedia_service.get_http_client", return_value=http):
+        svc = WikipediaService()
+        assert await svc.prefetch(countries) == 26
+        # 取り込み済みの国は再取得しない
+        assert await svc.prefetch(countries) == 0
+        us = await svc.get_summary("US", "アメリカ", "United States")
+        c3 = await svc.get_summary("C3", "国3", "Country 3")
+
+    ja_calls = [c for c in calls if c[0] == WikipediaService.JA_API]
+    assert [n for _, n, _ in ja_calls] == [20, 20, 6]
+    assert len(calls) == 4  # ja 2まとまり（1つは continue あり）+ en 1回
+    assert us["title"] == "アメリカ合衆国" and us["summary"] == "アメリカ合衆国の概要"
+    assert c3["url"] == "https://en.wikipedia.org/wiki/Country_3"
+    assert wiki._cache.get("wiki_C24")["available"] is True
+
+
+@pytest.mark.asyncio
+async def test_prefetch_skips_failed_batches():
+    http = Mock()
+    http.get = AsyncMock(side_effect=RuntimeError("down"))
+    with patch("app.services.wikipedia_service.get_http_client", return_value=http):
+        assert await WikipediaService().prefetch([("JP", "日本", "Japan")]) == 0
+    assert "wiki_JP" not in wiki._cache
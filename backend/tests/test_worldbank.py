@@ -0,0 +1,129 @@
+"""World Bank 指標の一括取り込みと列指向ストアのテスト"""
+from unittest.mock import AsyncMock, Mock, patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.api import countries
+from app.services.worldbank_service import IndicatorStore, WorldBankService
+from tests.conftest import MOCK_COUNTRY
+
+GDP, CPI = "NY.GDP.PCAP.CD", "FP.CPI.TOTL.ZG"
+
+
+def _row(code: str, year: int, value: float | None) -> dict:
+    return {"country": {"id": code}, "date": str(year), "value": value}
+
+
+ROWS = {
+    GDP: [_row("JP", 2023, 33800.0), _row("JP", 2022, 34000.0), _row("TH", 2022, 7000.0),
+          _row("TH", 2023, None), _row("VN", 2021, 3700.0), _row("ZZ", 1990, 1.0)],
+    CPI: [_row("JP", 2023, 3.3), _row("TH", 2023, 1.2)],
+}
+
+
+def _store() -> IndicatorStore:
+    store = IndicatorStore()
+    store.ingest(ROWS, 2020, 2024)
+    return store
+
+
+def test_store_latest_series_and_compare():
+    store = _store()
+    assert store.values.shape == (4, 5, 2)
+    assert store.latest("jp", GDP) == (33800.0, 2023)
+    assert store.latest("TH", GDP) == (7000.0, 2022)
+    assert store.latest("ZZ", GDP) is None  # 期間外の年は取り込まない
+    assert store.latest("XX", GDP) is None
+    assert store.series("JP", GDP) == [{"year": 2022, "value": 34000.0}, {"year": 2023, "value": 33800.0}]
+    latest = store.compare(["TH", "VN", "JP", "XX", "jp"], GDP)
+    assert [(r["country_code"], r["year"]) for r in latest] == [("JP", 2023), ("TH", 2022), ("VN", 2021)]
+    in_2023 = store.compare(["TH", "JP"], GDP, year=2023)
+    assert [r["country_code"] for r in in_2023] == ["JP"]
+    assert store.compare(["JP"], GDP, year=1999) == []
+    assert store.compare(["JP"], "UNKNOWN") == []
+
+
+def test_store_save_and_load(tmp_path):
+    path = str(tmp_path / "wb" / "worldbank.npz")
+    store = _store()
+    store.save(path)
+    loaded = IndicatorStore()
+    loaded.load(path)
+    assert loaded.path == path
+    assert loaded.indicators == [GDP, CPI]
+    assert loaded.updated_at == pytest.approx(store.updated_at)
+    assert loaded.latest("TH", CPI) == (1.2, 2023)
+
+
+def _http(pages: dict[tuple[str, int], list]) -> Mock:
+    async def get(url, params=None):
+        indicator = url.rsplit("/", 1)[1]
+        resp = Mock()
+        resp.raise_for_status.return_value = None
+        resp.json.return_value = pages[(indicator, params["page"])]
+        return resp
+
+    client = Mock()
+    client.get = AsyncMock(side_effect=get)
+    return client
+
+
+@pytest.mark.asyncio
+async def test_ingest_follows_pages_per_indicator(tmp_path):
+    http = _http({
+        (GDP, 1): [{"page": 1, "pages": 2}, ROWS[GDP][:3]],
+        (GDP, 2): [{"page": 2, "pages": 2}, ROWS[GDP][3:]],
+        (CPI, 1): [{"page": 1, "pages": 1}, ROWS[CPI]],
+    })
+    store = IndicatorStore()
+    store.path = str(tmp_path / "worldbank.npz")
+    svc = WorldBankService(store)
+    with (
+        patch("app.services.worldbank_service.get_http_client", return_value=http),
+        patch("app.services.worldbank_service.settings.worldbank_indicators", f"{GDP},{CPI}"),
+    ):
+        assert (await svc.get_economic_info("TH"))["available"] is False
+        assert await svc.refresh_all() == 4
+        info = await svc.get_economic_info("TH")
+        await svc.get_economic_info("JP")
+    assert http.get.await_count == 3
+    assert info["gdp_per_capita"] == 7000.0 and info["gdp_year"] == 2022
+    assert info["indicators"][1] == {"indicator": CPI, "label": "消費者物価上昇率（%）", "value": 1.2, "year": 2023}
+    assert (tmp_path / "worldbank.npz").exists()
+    assert await svc.cached_gdp_per_capita(["JP", "XX"]) == {"JP": 33800.0}
+
+
+@pytest.mark.asyncio
+async def test_failed_ingest_keeps_previous_data_and_requests_never_ingest():
+    store = _store()
+    svc = WorldBankService(store)
+    http = Mock()
+    http.get = AsyncMock(side_effect=RuntimeError("down"))
+    with patch("app.services.worldbank_service.get_http_client", return_value=http):
+        with pytest.raises(RuntimeError):
+            await svc.refresh_all()
+        assert store.latest("JP", GDP) == (33800.0, 2023)
+        empty = WorldBankService(IndicatorStore())
+        info = await empty.get_economic_info("JP")
+        assert info["available"] is False
+        assert (await empty.compare(["JP"], GDP))["results"] == []
+    # 取り込みはスケジューラだけが行い、リクエストは上流へ行かない
+    assert http.get.await_count == len(svc.indicators)
+
+
+def test_history_and_compare_endpoints(client: TestClient):
+    with (
+        patch.object(countries._wb_svc, "store", _store()),
+        patch("app.services.worldbank_service.settings.worldbank_indicators", f"{GDP},{CPI}"),
+        patch("app.services.restcountries.RestCountriesService.get_country",
+              new_callable=AsyncMock, return_value=MOCK_COUNTRY),
+        patch("app.services.restcountries.RestCountriesService.get_all_countries",
+              new_callable=AsyncMock, return_value=[{"code": "JP"}, {"code": "TH"}]),
+    ):
+        history = client.get(f"/api/countries/JP/economic/history?indicator={GDP}").json()
+        assert [p["year"] for p in history["points"]] == [2022, 2023]
+        assert client.get("/api/countries/JP/economic/history?indicator=BAD").status_code == 400
+        compared = client.get(f"/api/economic/compare?indicator={CPI}").json()
+        assert [r["country_code"] for r in compared["results"]] == ["JP", "TH"]
+        assert compared["label"] == "消費者物価上昇率（%）"